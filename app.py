@@ -109,22 +109,23 @@ elif menu == "🌱 Fase 1: Plantio":
     st.header("🌱 Planejamento de Plantio")
     st.markdown("---")
     
-    presets = {
-        "Soja": {"qtd": 0.50, "insumo": "Fertilizante NPK"},
-        "Milho": {"qtd": 0.80, "insumo": "Ureia"},
-        "Feijão": {"qtd": 0.40, "insumo": "Adubo Orgânico"},
-        "Cana-de-Açúcar": {"qtd": 1.20, "insumo": "Calcário"},
-        "Algodão": {"qtd": 0.65, "insumo": "Defensivo X"}
-    }
+    presets = fase1_calc.carregar_presets()
+    if not presets:
+        st.error("❌ Arquivo de presets (fases/presets_culturas.json) não encontrado.")
+        st.stop()
     
     col1, col2 = st.columns(2)
     with col1:
         cultura_selecionada = st.selectbox("Selecione a Cultura", list(presets.keys()))
         dados_cultura = presets[cultura_selecionada]
         
-        forma = st.selectbox("Formato do Terreno", ["Retângulo", "Quadrado", "Círculo"])
-        dim1 = st.number_input("Dimensão 1 (m)", value=100.0)
-        dim2 = st.number_input("Dimensão 2 (m)", value=50.0) if forma == "Retângulo" else 0.0
+        forma = st.selectbox("Formato do Terreno", ["Retângulo", "Quadrado", "Círculo", "Polígono"])
+        if forma == "Polígono":
+            arquivo_geo = st.file_uploader("Talhão (GeoJSON do levantamento GPS)", type=["geojson", "json"])
+            dim1, dim2 = None, 0.0
+        else:
+            dim1 = st.number_input("Dimensão 1 (m)", value=100.0)
+            dim2 = st.number_input("Dimensão 2 (m)", value=50.0) if forma == "Retângulo" else 0.0
         
     with col2:
         st.subheader("Configuração de Insumos")
@@ -133,7 +134,14 @@ elif menu == "🌱 Fase 1: Plantio":
         st.caption(f"💡 Dica: {cultura_selecionada} geralmente requer {dados_cultura['qtd']} kg/m².")
         
     if st.button("Calcular Planejamento"):
-        area = fase1_calc.calcular_area_plantio(forma, dim1, dim2)
+        if forma == "Polígono":
+            if arquivo_geo is None:
+                st.warning("⚠️ Envie o arquivo GeoJSON do talhão.")
+                st.stop()
+            # Soma de todos os polígonos do arquivo (coordenadas lon/lat)
+            area = float(fase1_calc.carregar_geojson(arquivo_geo.getvalue().decode('utf-8'))['area'].sum())
+        else:
+            area = fase1_calc.calcular_area_plantio(forma, dim1, dim2)
         total = fase1_calc.calcular_qtd_insumos(area, qtd, 1)
         
         st.markdown("### 📊 Resultados Estimados")
@@ -141,19 +149,81 @@ elif menu == "🌱 Fase 1: Plantio":
         c1.metric("Área Total", f"{area:,.2f} m²")
         c2.metric(f"Total de {insumo}", f"{total:,.2f} kg/L")
 
+    with st.expander("📋 Planejamento em Lote (vários talhões)"):
+        st.caption("CSV com as colunas: forma, dimensao1, dimensao2, cultura, num_linhas")
+        arquivo_talhoes = st.file_uploader("Cadastro de talhões", type=["csv"])
+        if arquivo_talhoes is not None:
+            try:
+                talhoes = pd.read_csv(arquivo_talhoes)
+            except (ValueError, UnicodeDecodeError) as e:
+                st.error(f"❌ Não foi possível ler o CSV: {e}")
+                st.stop()
+            # Valida antes de calcular: coluna faltando ou texto em coluna numérica
+            # viraria KeyError ou área/insumo zerados sem aviso
+            faltando = [c for c in ("forma", "cultura") if c not in talhoes.columns]
+            if not {"dimensao1", "area", "coordenadas"} & set(talhoes.columns):
+                faltando.append("dimensao1")
+            if faltando:
+                st.error(f"❌ Colunas obrigatórias ausentes no CSV: {', '.join(faltando)}")
+                st.stop()
+            invalidas = []
+            for coluna in ("dimensao1", "dimensao2", "num_linhas", "qtd_por_m2", "area"):
+                if coluna in talhoes.columns:
+                    valores = talhoes[coluna]
+                    ruins = valores.notna() & pd.to_numeric(valores, errors='coerce').isna()
+                    if ruins.any():
+                        # Linha como no arquivo (cabeçalho = linha 1)
+                        linhas = ", ".join(str(i + 2) for i in talhoes.index[ruins][:5])
+                        invalidas.append(f"{coluna} (linha(s) {linhas})")
+            if invalidas:
+                st.error(f"❌ Valores não numéricos no CSV: {'; '.join(invalidas)}")
+                st.stop()
+            try:
+                por_talhao, por_cultura = fase1_calc.calcular_plantio_lote(talhoes, presets)
+            except (KeyError, ValueError) as e:
+                st.error(f"❌ Erro ao calcular o lote de talhões: {e}")
+                st.stop()
+            st.markdown("#### Totais por Cultura")
+            st.dataframe(por_cultura, use_container_width=True)
+            st.markdown("#### Por Talhão")
+            st.dataframe(por_talhao, use_container_width=True)
+
 # --- FASE 2 ---
 elif menu == "🗄️ Fase 2: Banco de Dados":
     st.header("🗄️ Gestão de Insumos")
     st.markdown("---")
     
-    df, msg = fase2_db.obter_dados_insumos()
+    f1, f2, f3 = st.columns([2, 2, 1])
+    with f1:
+        filtro_nome = st.text_input("🔎 Buscar por nome")
+    with f2:
+        filtro_tipo = st.selectbox("Filtrar categoria", ["Todas", "Grão", "Fertilizante", "Defensivo", "Maquinário"])
+    with f3:
+        por_pagina = st.selectbox("Itens por página", [10, 25, 50, 100], index=1)
+    filtro_tipo = None if filtro_tipo == "Todas" else filtro_tipo
+
+    total_itens = fase2_db.contar_insumos(filtro_nome, filtro_tipo)
+    total_paginas = max(1, -(-total_itens // por_pagina))
+    pagina = st.number_input(f"Página (de {total_paginas})", min_value=1, max_value=total_paginas, step=1)
+
+    df, msg = fase2_db.obter_dados_insumos(filtro_nome, filtro_tipo, pagina, por_pagina)
     
     if "Offline" in msg:
         st.warning(f"⚠️ Status: {msg}")
     else:
         st.success(f"✅ Status: {msg}")
+
+    sinc = fase2_db.status_sincronizacao()
+    if sinc['erro_esquema']:
+        st.warning(f"⚠️ Sincronização: {sinc['erro_esquema']}")
+    if sinc['pendentes'] and sinc['falhas_seguidas']:
+        st.warning(f"⚠️ {sinc['pendentes']} item(ns) aguardando envio ao Oracle. "
+                   f"Último erro: {sinc['ultimo_erro']}")
         
     st.dataframe(df, use_container_width=True)
+    cache = fase2_db.estatisticas_cache()
+    st.caption(f"{total_itens} itens • cache: {cache['acertos']} acertos / {cache['faltas']} faltas "
+               f"(TTL {cache['ttl_s']:.0f}s)")
     
     st.markdown("### ➕ Cadastrar Novo Item")
     with st.form("db_form"):
@@ -189,7 +259,7 @@ elif menu == "📡 Fase 3: IoT & Monitoramento":
             st.rerun()
             
     # 1. Obter Dados
-    dados = fase3_iot.get_dados_sensores()
+    dados = fase3_iot.get_dados_sensores(mais_recente=True)
     
     # 2. Exibir Métricas Formatadas
     temp = float(dados.get('maquina_temp', 0))
@@ -214,7 +284,9 @@ elif menu == "📡 Fase 3: IoT & Monitoramento":
         st.error(f"### {analise['acao']}")
         st.markdown(f"**Motivo:** {analise['mensagem']}")
         with st.expander("☁️ Ver Log AWS (Fase 5)"):
-            st.write(fase5_cloud.enviar_alerta_aws("Alerta Crítico", analise['mensagem']))
+            st.write(fase5_cloud.enfileirar_alerta("Alerta Crítico", analise['mensagem'],
+                                                   chave="bomba_principal"))
+            st.caption(f"Despachante: {fase5_cloud.obter_despachante().estatisticas()}")
     else:
         st.success(f"### {analise['acao']}")
         st.write(f"**Status:** {analise['mensagem']}")
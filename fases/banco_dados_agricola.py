@@ -2,17 +2,280 @@ import sqlite3
 import datetime
 import random
 import csv
+import gzip
 import os
-from typing import List, Dict, Any, Tuple, Optional
+import time
+import tempfile
+import itertools
+import threading
+import queue
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple, Optional, Iterable, Iterator
+
+# Exportação colunar (Parquet / Arrow IPC) é opcional
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    ARROW_AVAILABLE = True
+except ImportError:
+    ARROW_AVAILABLE = False
+
+SQL_INSERIR_LEITURA = '''
+        INSERT INTO leituras_sensores
+        (data_hora, umidade, ph, fosforo, potassio, status_bomba,
+         previsao_irrigacao, confianca_previsao, observacoes)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        '''
+
+# Migrações do esquema: (versão, comandos). Sempre acrescente no fim da lista.
+MIGRACOES = [
+    (1, [
+        # Consultas por período / últimas N sem ordenar a tabela inteira
+        'CREATE INDEX IF NOT EXISTS idx_leituras_data_hora ON leituras_sensores (data_hora)',
+        # Filtro por estado da bomba dentro de um período
+        'CREATE INDEX IF NOT EXISTS idx_leituras_status_data ON leituras_sensores (status_bomba, data_hora)',
+    ]),
+    (2, [
+        # Agregados por hora/dia (rollups) mantidos de forma incremental
+        '''CREATE TABLE IF NOT EXISTS rollup_leituras (
+            resolucao TEXT NOT NULL,
+            inicio TEXT NOT NULL,
+            quantidade INTEGER NOT NULL DEFAULT 0,
+            umidade_n INTEGER NOT NULL DEFAULT 0,
+            umidade_soma REAL NOT NULL DEFAULT 0,
+            umidade_min REAL,
+            umidade_max REAL,
+            ph_n INTEGER NOT NULL DEFAULT 0,
+            ph_soma REAL NOT NULL DEFAULT 0,
+            ph_min REAL,
+            ph_max REAL,
+            bomba_ligada_s REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (resolucao, inicio)
+        ) WITHOUT ROWID''',
+        '''CREATE TABLE IF NOT EXISTS rollup_controle (
+            chave TEXT PRIMARY KEY,
+            valor TEXT
+        )''',
+    ]),
+    (3, [
+        # Vazia de propósito: a troca para auto_vacuum incremental reescreve o arquivo
+        # inteiro (VACUUM) e não pode rodar na abertura do banco. Bancos novos já
+        # nascem incrementais (PoolConexoes); os antigos convertem numa manutenção
+        # explícita: ativar_vacuum_incremental() ou aplicar_retencao(converter_vacuum=True).
+    ]),
+    (4, [
+        # Última leitura de cada fonte (bomba) para o cálculo de tempo de bomba ligada
+        '''CREATE TABLE IF NOT EXISTS rollup_fontes (
+            fonte TEXT PRIMARY KEY,
+            data_hora TEXT NOT NULL,
+            status_bomba INTEGER NOT NULL
+        ) WITHOUT ROWID''',
+    ]),
+]
+
+# --- ROLLUPS (SÉRIES AGREGADAS) ---
+# resolução -> (segundos, função que dá o início do balde a partir do texto ISO)
+RESOLUCOES_ROLLUP = {
+    'hora': (3600, lambda iso: iso[:13] + ':00:00'),
+    'dia': (86400, lambda iso: iso[:10] + 'T00:00:00'),
+}
+# Intervalos maiores que isso entre duas leituras são tratados como falta de dados,
+# não como bomba ligada o tempo todo.
+MAX_INTERVALO_BOMBA_S = 3600
+
+# Prefixos de observacoes que identificam a fonte de uma leitura quando várias
+# bombas gravam na mesma tabela: simulador e gateway ("bomba=00042" ou, sem id
+# na linha, "host=ip"). Leituras sem esses prefixos (serial, modelo de ML) são
+# da fonte padrão "".
+PREFIXOS_FONTE = ('bomba=', 'host=', 'tcp:', 'udp:', 'unix:')
+
+def _fonte_leitura(observacoes: Optional[str]) -> str:
+    """Chave estável da bomba/fonte de uma leitura, a partir de observacoes."""
+    if observacoes and observacoes.startswith(PREFIXOS_FONTE):
+        fonte = observacoes.split(';', 1)[0]
+        if fonte.startswith(('tcp:', 'udp:')):
+            # Gravado pelo gateway antigo ("tcp:ip:porta"): a porta muda a cada
+            # reconexão, então a bomba é identificada só pelo endereço
+            return 'host=' + fonte[4:].rsplit(':', 1)[0]
+        return fonte
+    return ""
+
+# Colunas que entram nos rollups: alterar qualquer uma exige recalcular
+COLUNAS_ROLLUP = {'data_hora', 'umidade', 'ph', 'status_bomba', 'observacoes'}
+
+SQL_UPSERT_ROLLUP = '''
+        INSERT INTO rollup_leituras
+        (resolucao, inicio, quantidade, umidade_n, umidade_soma, umidade_min, umidade_max,
+         ph_n, ph_soma, ph_min, ph_max, bomba_ligada_s)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (resolucao, inicio) DO UPDATE SET
+            quantidade = quantidade + excluded.quantidade,
+            umidade_n = umidade_n + excluded.umidade_n,
+            umidade_soma = umidade_soma + excluded.umidade_soma,
+            umidade_min = MIN(COALESCE(umidade_min, excluded.umidade_min), COALESCE(excluded.umidade_min, umidade_min)),
+            umidade_max = MAX(COALESCE(umidade_max, excluded.umidade_max), COALESCE(excluded.umidade_max, umidade_max)),
+            ph_n = ph_n + excluded.ph_n,
+            ph_soma = ph_soma + excluded.ph_soma,
+            ph_min = MIN(COALESCE(ph_min, excluded.ph_min), COALESCE(excluded.ph_min, ph_min)),
+            ph_max = MAX(COALESCE(ph_max, excluded.ph_max), COALESCE(excluded.ph_max, ph_max)),
+            bomba_ligada_s = bomba_ligada_s + excluded.bomba_ligada_s
+        '''
+
+def _novo_agregado() -> List[Any]:
+    # quantidade, umidade_n, umidade_soma, umidade_min, umidade_max, ph_n, ph_soma, ph_min, ph_max, bomba_ligada_s
+    return [0, 0, 0.0, None, None, 0, 0.0, None, None, 0.0]
+
+def _acumular(agregado: List[Any], umidade: Optional[float], ph: Optional[float]) -> None:
+    agregado[0] += 1
+    if umidade is not None:
+        agregado[1] += 1
+        agregado[2] += umidade
+        agregado[3] = umidade if agregado[3] is None else min(agregado[3], umidade)
+        agregado[4] = umidade if agregado[4] is None else max(agregado[4], umidade)
+    if ph is not None:
+        agregado[5] += 1
+        agregado[6] += ph
+        agregado[7] = ph if agregado[7] is None else min(agregado[7], ph)
+        agregado[8] = ph if agregado[8] is None else max(agregado[8], ph)
+
+# Tipos fixos por coluna: blocos com valores nulos não mudam o esquema do arquivo
+ESQUEMA_ARROW = pa.schema([
+    ('id', pa.int64()), ('data_hora', pa.string()), ('umidade', pa.float64()),
+    ('ph', pa.float64()), ('fosforo', pa.int64()), ('potassio', pa.int64()),
+    ('status_bomba', pa.int64()), ('previsao_irrigacao', pa.int64()),
+    ('confianca_previsao', pa.float64()), ('observacoes', pa.string()),
+]) if ARROW_AVAILABLE else None
+
+def _texto_data(valor: Any) -> Optional[str]:
+    """Aceita datetime/date ou texto ISO e devolve o texto usado na coluna data_hora."""
+    if valor is None:
+        return None
+    if isinstance(valor, (datetime.datetime, datetime.date)):
+        return valor.isoformat()
+    return str(valor)
+
+def interpretar_linha_serial(linha: str) -> Tuple[float, float, int, int, int, str]:
+    """
+    Converte uma linha do monitor serial em valores prontos para o banco.
+    Formato: "umidade,ph,fosforo,potassio,status_bomba[,observacoes]"
+    Exemplo: "40.0,3.40,SIM,NAO,0"
+    ATUALIZAÇÃO FASE 4: Processa 'SIM'/'NAO' para fósforo e potássio.
+    Lança ValueError/IndexError se a linha estiver malformada.
+    """
+    partes = linha.strip().split(',')
+    if len(partes) < 5:
+        raise ValueError(f"esperados 5 campos, recebidos {len(partes)}")
+
+    umidade = float(partes[0])
+    ph = float(partes[1])
+
+    # Converte "SIM"/"NAO" para 1/0
+    fosforo = 1 if partes[2].strip().upper() == 'SIM' else 0
+    potassio = 1 if partes[3].strip().upper() == 'SIM' else 0
+
+    status_bomba = int(partes[4])
+
+    observacoes = partes[5] if len(partes) > 5 else ""
+    return umidade, ph, fosforo, potassio, status_bomba, observacoes
+
+# --- CONFIGURAÇÃO DE DESEMPENHO DO SQLITE ---
+# WAL: leitores não bloqueiam o escritor (e vice-versa).
+# synchronous=NORMAL é seguro em WAL (só perde a última transação numa queda de energia).
+PRAGMAS_PADRAO = {
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,        # ~16 MB de cache de páginas por conexão
+    'mmap_size': 268435456,      # 256 MB de leitura via memória mapeada
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,        # ms esperando lock antes de dar "database is locked"
+}
+
+class PoolConexoes:
+    """
+    Pool de conexões SQLite: uma conexão de escrita (protegida por lock, o SQLite
+    só aceita um escritor por vez) e até `max_leitores` conexões de leitura, cada
+    uma usada por uma thread por vez. Com ':memory:' tudo usa a mesma conexão,
+    já que cada conexão em memória seria um banco diferente.
+    """
+
+    def __init__(self, nome_bd: str, max_leitores: int = 4, wal: bool = True,
+                 pragmas: Optional[Dict[str, Any]] = None):
+        self.nome_bd = nome_bd
+        self.wal = wal
+        self.pragmas = dict(PRAGMAS_PADRAO if pragmas is None else pragmas)
+        self._memoria = nome_bd == ":memory:" or nome_bd.startswith("file::memory:")
+        self._lock_escrita = threading.RLock()
+        self._livres: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._vagas = threading.BoundedSemaphore(max(1, max_leitores))
+        self._todas: List[sqlite3.Connection] = []
+        self.escritor = self._nova_conexao()
+        # Só tem efeito em arquivo novo (antes da primeira tabela); bancos
+        # existentes continuam como estão até ativar_vacuum_incremental()
+        self.escritor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        if wal and not self._memoria:
+            self.escritor.execute('PRAGMA journal_mode=WAL')
+
+    def _nova_conexao(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.nome_bd, check_same_thread=False,
+                               timeout=self.pragmas.get('busy_timeout', 5000) / 1000)
+        for nome, valor in self.pragmas.items():
+            conn.execute(f'PRAGMA {nome}={valor}')
+        self._todas.append(conn)
+        return conn
+
+    @contextmanager
+    def escrita(self):
+        """Conexão de escrita exclusiva (uma thread por vez)."""
+        with self._lock_escrita:
+            yield self.escritor
+
+    @contextmanager
+    def leitura(self):
+        """Empresta uma conexão de leitura; bloqueia se todas estiverem em uso."""
+        if self._memoria:
+            with self._lock_escrita:
+                yield self.escritor
+            return
+        with self._vagas:
+            try:
+                conn = self._livres.get_nowait()
+            except queue.Empty:
+                conn = self._nova_conexao()
+            try:
+                yield conn
+            finally:
+                self._livres.put(conn)
+
+    def fechar(self) -> None:
+        for conn in self._todas:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        self._todas.clear()
 
 class BancoDadosAgricola:
-    def __init__(self, nome_bd: str = "dados_agricolas.db"):
-        """Inicializa a conexão com o banco de dados."""
+    def __init__(self, nome_bd: str = "dados_agricolas.db", max_leitores: int = 4, wal: bool = True,
+                 manter_rollups: bool = True):
+        """
+        Inicializa o pool de conexões com o banco de dados.
+        Pode ser compartilhado entre threads: um escritor por vez e vários leitores
+        simultâneos (modo WAL).
+        manter_rollups: atualiza os agregados por hora/dia depois de cada gravação em
+        lote. Leituras avulsas (inserir_leitura) não pagam esse custo: entram nos
+        agregados na próxima gravação em lote ou na próxima consulta de obter_serie.
+        Se False, rode atualizar_rollups() periodicamente (job de recuperação).
+        """
         self.nome_bd = nome_bd
-        self.conn = sqlite3.connect(nome_bd)
-        self.cursor = self.conn.cursor()
+        self.manter_rollups = manter_rollups
+        self.ultimo_relatorio_retencao: Optional[Dict[str, Any]] = None
+        self._pool = PoolConexoes(nome_bd, max_leitores=max_leitores, wal=wal)
         self.criar_tabelas()
 
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """Conexão de escrita (mantida por compatibilidade)."""
+        return self._pool.escritor
+
     def criar_tabelas(self) -> None:
         """
         Cria a tabela de sensores se não existir.
@@ -20,7 +283,34 @@ class BancoDadosAgricola:
         - fosforo e potassio agora representam presença (0/1).
         - Adicionadas colunas para previsões do modelo de Machine Learning.
         """
-        self.cursor.execute('''
+        with self._pool.escrita() as conn:
+            self._criar_tabela_leituras(conn)
+            self._migrar_esquema(conn)
+        if self.manter_rollups:
+            # Banco que já tinha leituras (ou rollups atrasados): coloca em dia agora,
+            # senão obter_serie ficaria vazia até a próxima inserção
+            self.atualizar_rollups()
+        print("Tabela 'leituras_sensores' verificada/criada com sucesso!")
+
+    @staticmethod
+    def _migrar_esquema(conn: sqlite3.Connection) -> None:
+        """
+        Aplica as migrações pendentes em bancos já existentes.
+        A versão aplicada fica em PRAGMA user_version.
+        """
+        versao_atual = conn.execute('PRAGMA user_version').fetchone()[0]
+        for versao, comandos in MIGRACOES:
+            if versao <= versao_atual:
+                continue
+            for sql in comandos:
+                conn.execute(sql)
+            conn.execute(f'PRAGMA user_version = {versao}')
+            conn.commit()
+            print(f"Migração do esquema aplicada (versão {versao}).")
+
+    @staticmethod
+    def _criar_tabela_leituras(conn: sqlite3.Connection) -> None:
+        conn.execute('''
         CREATE TABLE IF NOT EXISTS leituras_sensores (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             data_hora TEXT NOT NULL,
@@ -34,8 +324,7 @@ class BancoDadosAgricola:
             observacoes TEXT
         )
         ''')
-        self.conn.commit()
-        print("Tabela 'leituras_sensores' verificada/criada com sucesso!")
+        conn.commit()
 
     def inserir_leitura(self, umidade: float, ph: float, fosforo: int,
                       potassio: int, status_bomba: int,
@@ -47,16 +336,12 @@ class BancoDadosAgricola:
         """
         data_hora = datetime.datetime.now().isoformat()
 
-        self.cursor.execute('''
-        INSERT INTO leituras_sensores
-        (data_hora, umidade, ph, fosforo, potassio, status_bomba,
-         previsao_irrigacao, confianca_previsao, observacoes)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (data_hora, umidade, ph, fosforo, potassio, status_bomba,
-              previsao_irrigacao, confianca_previsao, observacoes))
-
-        self.conn.commit()
-        return self.cursor.lastrowid
+        with self._pool.escrita() as conn:
+            cursor = conn.execute(SQL_INSERIR_LEITURA, (data_hora, umidade, ph, fosforo, potassio, status_bomba,
+                  previsao_irrigacao, confianca_previsao, observacoes))
+            conn.commit()
+            # Rollups ficam para a próxima gravação em lote / consulta (um commit por leitura)
+            return cursor.lastrowid
 
     def importar_do_serial(self, dados_serial: List[str]) -> List[int]:
         """
@@ -66,91 +351,629 @@ class BancoDadosAgricola:
         ids_inseridos = []
 
         for linha in dados_serial:
-            # Novo formato esperado: "umidade,ph,fosforo,potassio,status_bomba"
-            # Exemplo: "40.0,3.40,SIM,NAO,0"
+            if len(linha.strip().split(',')) < 5:
+                continue  # linha incompleta (ex.: quebra no monitor serial)
             try:
-                partes = linha.strip().split(',')
-                if len(partes) >= 5:
-                    umidade = float(partes[0])
-                    ph = float(partes[1])
-                    
-                    # Converte "SIM"/"NAO" para 1/0
-                    fosforo_str = partes[2].strip().upper()
-                    potassio_str = partes[3].strip().upper()
-                    fosforo = 1 if fosforo_str == 'SIM' else 0
-                    potassio = 1 if potassio_str == 'SIM' else 0
-
-                    status_bomba = int(partes[4])
-
-                    observacoes = ""
-                    if len(partes) > 5:
-                        observacoes = partes[5]
-
-                    # Por enquanto, não há previsão de ML ao importar do serial
-                    id_leitura = self.inserir_leitura(
-                        umidade, ph, fosforo, potassio, status_bomba,
-                        observacoes=observacoes
-                    )
-                    ids_inseridos.append(id_leitura)
+                (umidade, ph, fosforo, potassio, status_bomba,
+                 observacoes) = interpretar_linha_serial(linha)
+
+                # Por enquanto, não há previsão de ML ao importar do serial
+                id_leitura = self.inserir_leitura(
+                    umidade, ph, fosforo, potassio, status_bomba,
+                    observacoes=observacoes
+                )
+                ids_inseridos.append(id_leitura)
             except (ValueError, IndexError) as e:
                 print(f"Erro ao processar linha do serial: '{linha}'. Erro: {e}")
 
         return ids_inseridos
     
+    def inserir_leituras_em_lote(self, leituras: Iterable[Tuple],
+                                 tamanho_lote: Optional[int] = None) -> Tuple[Optional[int], Optional[int]]:
+        """
+        Insere muitas leituras com executemany.
+        leituras: tuplas (data_hora, umidade, ph, fosforo, potassio, status_bomba,
+                  previsao_irrigacao, confianca_previsao, observacoes).
+        tamanho_lote=None grava tudo em uma única transação; com um número, faz um
+        commit a cada `tamanho_lote` linhas (transações menores, lock mais curto).
+        Retorna (primeiro_id, ultimo_id) inseridos, ou (None, None) se nada entrou.
+        """
+        pedaco = tamanho_lote or 5000
+        iterador = iter(leituras)
+        primeiro_id, ultimo_id = None, None
+        with self._pool.escrita() as conn:
+            try:
+                while True:
+                    lote = list(itertools.islice(iterador, pedaco))
+                    if not lote:
+                        break
+                    conn.executemany(SQL_INSERIR_LEITURA, lote)
+                    # Dentro da transação os ids do executemany são consecutivos
+                    ultimo_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+                    if primeiro_id is None:
+                        primeiro_id = ultimo_id - len(lote) + 1
+                    if tamanho_lote:
+                        conn.commit()
+                conn.commit()
+            except sqlite3.Error:
+                conn.rollback()
+                raise
+            if self.manter_rollups:
+                self.atualizar_rollups()
+        return primeiro_id, ultimo_id
+
+    def importar_do_serial_em_lote(self, dados_serial: Iterable[str],
+                                   tamanho_lote: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Versão em lote de importar_do_serial: interpreta as linhas em blocos e grava
+        com executemany (uma transação, ou uma a cada `tamanho_lote` linhas).
+        Linhas malformadas são registradas e puladas, sem abortar o lote.
+        Retorna {'inseridas', 'primeiro_id', 'ultimo_id', 'invalidas': [(nº linha, linha, erro)]}.
+        """
+        invalidas = []
+        contador = {'inseridas': 0}
+
+        def linhas_validas():
+            # Um único data_hora por bloco de 1000 linhas: evita um now() por linha
+            data_hora = datetime.datetime.now().isoformat()
+            for numero, linha in enumerate(dados_serial, start=1):
+                if numero % 1000 == 0:
+                    data_hora = datetime.datetime.now().isoformat()
+                if not linha.strip():
+                    continue
+                try:
+                    umidade, ph, fosforo, potassio, status_bomba, observacoes = interpretar_linha_serial(linha)
+                except (ValueError, IndexError) as e:
+                    invalidas.append((numero, linha, str(e)))
+                    continue
+                contador['inseridas'] += 1
+                yield (data_hora, umidade, ph, fosforo, potassio, status_bomba,
+                       None, None, observacoes)
+
+        primeiro_id, ultimo_id = self.inserir_leituras_em_lote(linhas_validas(), tamanho_lote)
+        for numero, linha, erro in invalidas[:10]:
+            print(f"Erro ao processar linha {numero} do serial: '{linha}'. Erro: {erro}")
+        return {
+            'inseridas': contador['inseridas'],
+            'primeiro_id': primeiro_id,
+            'ultimo_id': ultimo_id,
+            'invalidas': invalidas
+        }
+
     # --- Funções que não precisam de alteração significativa ---
     
     def obter_todas_leituras(self) -> List[Dict[str, Any]]:
         """Retorna todas as leituras do banco de dados."""
-        self.cursor.execute('SELECT * FROM leituras_sensores ORDER BY data_hora DESC')
-        linhas = self.cursor.fetchall()
-        colunas = [description[0] for description in self.cursor.description]
+        with self._pool.leitura() as conn:
+            cursor = conn.execute('SELECT * FROM leituras_sensores ORDER BY data_hora DESC')
+            linhas = cursor.fetchall()
+            colunas = [description[0] for description in cursor.description]
         return [dict(zip(colunas, linha)) for linha in linhas]
 
+    # --- Rollups ---
+
+    def atualizar_rollups(self, tamanho_bloco: int = 50_000) -> int:
+        """
+        Incorpora aos rollups as leituras com id acima da marca d'água salva em
+        rollup_controle (job de recuperação; também chamado após cada gravação em
+        lote e antes de cada consulta de obter_serie).
+        O tempo de bomba ligada de cada leitura com status_bomba=1 vai até a leitura
+        seguinte da mesma fonte (ver _fonte_leitura) e é dividido entre os baldes que
+        o intervalo atravessa. Com várias bombas, bomba_ligada_s é a soma entre elas.
+        Retorna o número de leituras processadas.
+        """
+        processadas = 0
+        with self._pool.escrita() as conn:
+            controle = dict(conn.execute('SELECT chave, valor FROM rollup_controle').fetchall())
+            ultimo_id = int(controle.get('ultimo_id', 0))
+            # Estado por fonte carregado sob demanda, só das fontes que aparecem no bloco
+            anteriores: Dict[str, Optional[Tuple[datetime.datetime, int]]] = {}
+            if controle.get('anterior_data_hora'):
+                # Estado salvo antes do controle por fonte
+                anteriores[""] = (datetime.datetime.fromisoformat(controle['anterior_data_hora']),
+                                  int(controle['anterior_status']))
+
+            while True:
+                linhas = conn.execute(
+                    'SELECT id, data_hora, umidade, ph, status_bomba, observacoes FROM leituras_sensores '
+                    'WHERE id > ? ORDER BY id LIMIT ?', (ultimo_id, tamanho_bloco)).fetchall()
+                if not linhas:
+                    break
+                fontes = [_fonte_leitura(linha[5]) for linha in linhas]
+                anteriores.update(self._carregar_fontes(
+                    conn, {fonte for fonte in fontes if fonte not in anteriores}))
+
+                agregados: Dict[Tuple[str, str], List[Any]] = {}
+                alteradas = set()
+                for (id_leitura, data_hora, umidade, ph, status_bomba, _), fonte in zip(linhas, fontes):
+                    momento = datetime.datetime.fromisoformat(data_hora)
+                    for resolucao, (_, balde) in RESOLUCOES_ROLLUP.items():
+                        chave = (resolucao, balde(data_hora))
+                        _acumular(agregados.setdefault(chave, _novo_agregado()), umidade, ph)
+
+                    anterior = anteriores.get(fonte)
+                    if anterior is not None and anterior[1] == 1:
+                        self._distribuir_bomba_ligada(agregados, anterior[0], momento)
+                    anteriores[fonte] = (momento, int(status_bomba or 0))
+                    alteradas.add(fonte)
+                    ultimo_id = id_leitura
+
+                conn.executemany(SQL_UPSERT_ROLLUP, [(res, ini, *ag) for (res, ini), ag in agregados.items()])
+                conn.executemany(
+                    'INSERT OR REPLACE INTO rollup_fontes (fonte, data_hora, status_bomba) VALUES (?, ?, ?)',
+                    [(fonte, anteriores[fonte][0].isoformat(), anteriores[fonte][1]) for fonte in alteradas])
+                conn.execute("INSERT OR REPLACE INTO rollup_controle (chave, valor) VALUES ('ultimo_id', ?)",
+                             (str(ultimo_id),))
+                conn.execute("DELETE FROM rollup_controle "
+                             "WHERE chave IN ('anterior_data_hora', 'anterior_status')")
+                conn.commit()
+                processadas += len(linhas)
+        return processadas
+
+    @staticmethod
+    def _carregar_fontes(conn: sqlite3.Connection,
+                         fontes: Iterable[str]) -> Dict[str, Optional[Tuple[datetime.datetime, int]]]:
+        """Última leitura já agregada de cada fonte pedida (None se não houver)."""
+        fontes = list(fontes)
+        estado: Dict[str, Optional[Tuple[datetime.datetime, int]]] = dict.fromkeys(fontes)
+        for i in range(0, len(fontes), 500):
+            parte = fontes[i:i + 500]
+            for fonte, data_hora, status in conn.execute(
+                    'SELECT fonte, data_hora, status_bomba FROM rollup_fontes WHERE fonte IN (%s)'
+                    % ','.join('?' * len(parte)), parte):
+                estado[fonte] = (datetime.datetime.fromisoformat(data_hora), int(status))
+        return estado
+
+    def _corrigir_rollups(self, conn: sqlite3.Connection, afetadas: Iterable[Tuple[int, str, str]]) -> None:
+        """
+        Recalcula os rollups depois de alterar/apagar leituras já agregadas.
+        afetadas: (id, data_hora, observacoes) das versões antiga e nova das linhas.
+        Os dias tocados são refeitos a partir das leituras brutas e o estado de
+        rollup_fontes das fontes tocadas volta a ser a última leitura que restou.
+        Roda na transação de quem chamou (sem commit).
+        """
+        marca = conn.execute("SELECT valor FROM rollup_controle WHERE chave = 'ultimo_id'").fetchone()
+        ultimo_id = int(marca[0]) if marca else 0
+        afetadas = [a for a in afetadas if a[0] <= ultimo_id]
+        if not afetadas:
+            return  # ainda não agregadas: entram normalmente no próximo atualizar_rollups
+        for dia in sorted({data_hora[:10] for _, data_hora, _ in afetadas}):
+            self._recalcular_dia(conn, dia, ultimo_id)
+
+        janela = datetime.timedelta(seconds=MAX_INTERVALO_BOMBA_S)
+        referencias: Dict[str, str] = {}
+        for _, data_hora, observacoes in afetadas:
+            fonte = _fonte_leitura(observacoes)
+            referencias[fonte] = max(referencias.get(fonte, data_hora), data_hora)
+        for fonte, estado in self._carregar_fontes(conn, referencias).items():
+            referencia = max(referencias[fonte], estado[0].isoformat() if estado else "")
+            # Uma leitura mais antiga que a janela daria intervalo descartado de qualquer jeito
+            desde = (datetime.datetime.fromisoformat(referencia) - janela).isoformat()
+            ultima = None
+            for data_hora, status, observacoes in conn.execute(
+                    'SELECT data_hora, status_bomba, observacoes FROM leituras_sensores '
+                    'WHERE data_hora >= ? AND id <= ? ORDER BY data_hora DESC, id DESC',
+                    (desde, ultimo_id)):
+                if _fonte_leitura(observacoes) == fonte:
+                    ultima = (data_hora, int(status or 0))
+                    break
+            if ultima is None:
+                conn.execute('DELETE FROM rollup_fontes WHERE fonte = ?', (fonte,))
+            else:
+                conn.execute('INSERT OR REPLACE INTO rollup_fontes (fonte, data_hora, status_bomba) '
+                             'VALUES (?, ?, ?)', (fonte, *ultima))
+
+    def _recalcular_dia(self, conn: sqlite3.Connection, dia: str, ultimo_id: int) -> None:
+        """Refaz os rollups de hora e de dia de `dia` (AAAA-MM-DD) a partir das leituras brutas."""
+        inicio = datetime.datetime.fromisoformat(dia + 'T00:00:00')
+        fim = inicio + datetime.timedelta(days=1)
+        janela = datetime.timedelta(seconds=MAX_INTERVALO_BOMBA_S)
+        # Leituras da véspera e do dia seguinte dentro da janela: os intervalos de
+        # bomba ligada que cruzam a meia-noite também contam no dia
+        linhas = conn.execute(
+            'SELECT data_hora, umidade, ph, status_bomba, observacoes FROM leituras_sensores '
+            'WHERE data_hora >= ? AND data_hora < ? AND id <= ? ORDER BY id',
+            ((inicio - janela).isoformat(), (fim + janela).isoformat(), ultimo_id)).fetchall()
+
+        agregados: Dict[Tuple[str, str], List[Any]] = {}
+        anteriores: Dict[str, Tuple[datetime.datetime, int]] = {}
+        for data_hora, umidade, ph, status_bomba, observacoes in linhas:
+            momento = datetime.datetime.fromisoformat(data_hora)
+            if inicio <= momento < fim:
+                for resolucao, (_, balde) in RESOLUCOES_ROLLUP.items():
+                    _acumular(agregados.setdefault((resolucao, balde(data_hora)), _novo_agregado()),
+                              umidade, ph)
+            fonte = _fonte_leitura(observacoes)
+            anterior = anteriores.get(fonte)
+            if anterior is not None and anterior[1] == 1:
+                self._distribuir_bomba_ligada(agregados, anterior[0], momento)
+            anteriores[fonte] = (momento, int(status_bomba or 0))
+
+        conn.execute('DELETE FROM rollup_leituras WHERE inicio >= ? AND inicio < ?',
+                     (inicio.isoformat(), fim.isoformat()))
+        conn.executemany(SQL_UPSERT_ROLLUP, [(res, ini, *ag) for (res, ini), ag in agregados.items()
+                                             if inicio.isoformat() <= ini < fim.isoformat()])
+
+    @staticmethod
+    def _distribuir_bomba_ligada(agregados: Dict[Tuple[str, str], List[Any]],
+                                 inicio: datetime.datetime, fim: datetime.datetime) -> None:
+        """Soma o intervalo [inicio, fim) de bomba ligada nos baldes de cada resolução."""
+        if fim <= inicio or (fim - inicio).total_seconds() > MAX_INTERVALO_BOMBA_S:
+            return
+        for resolucao, (segundos, balde) in RESOLUCOES_ROLLUP.items():
+            atual = inicio
+            while atual < fim:
+                inicio_balde = datetime.datetime.fromisoformat(balde(atual.isoformat()))
+                fim_balde = min(fim, inicio_balde + datetime.timedelta(seconds=segundos))
+                chave = (resolucao, inicio_balde.isoformat())
+                agregados.setdefault(chave, _novo_agregado())[9] += (fim_balde - atual).total_seconds()
+                atual = fim_balde
+
+    def obter_serie(self, inicio: Any = None, fim: Any = None, resolucao_s: Optional[int] = None,
+                    max_pontos: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Série agregada (min/máx/média de umidade e pH, segundos de bomba ligada).
+        Usa o rollup mais grosso que ainda atende a resolução pedida; abaixo de 1 hora
+        agrega direto das leituras brutas, por minuto.
+        resolucao_s: tamanho desejado do ponto, em segundos.
+        max_pontos: alternativa a resolucao_s, escolhe a resolução pelo tamanho do período.
+        """
+        ordenadas = sorted(RESOLUCOES_ROLLUP.items(), key=lambda r: r[1][0])
+        escolhida = None
+        if resolucao_s is None and max_pontos and inicio is not None and fim is not None:
+            # Menor rollup que não ultrapassa max_pontos no período
+            periodo = (datetime.datetime.fromisoformat(_texto_data(fim)) -
+                       datetime.datetime.fromisoformat(_texto_data(inicio))).total_seconds()
+            if periodo / 60 > max_pontos:
+                escolhida = ordenadas[-1][0]
+                for resolucao, (segundos, _) in reversed(ordenadas):
+                    if periodo / segundos <= max_pontos:
+                        escolhida = resolucao
+        else:
+            # Rollup mais grosso que ainda respeita a resolução pedida
+            for resolucao, (segundos, _) in ordenadas:
+                if segundos <= (resolucao_s or 3600):
+                    escolhida = resolucao
+
+        if escolhida is None:
+            return self._serie_bruta_por_minuto(inicio, fim)
+
+        # Coloca em dia as leituras avulsas (e tudo, se manter_rollups=False);
+        # sem leituras novas custa uma consulta pelo índice
+        self.atualizar_rollups()
+        balde = RESOLUCOES_ROLLUP[escolhida][1]
+        sql = ('''SELECT inicio, quantidade,
+                         umidade_soma / NULLIF(umidade_n, 0) AS umidade_media, umidade_min, umidade_max,
+                         ph_soma / NULLIF(ph_n, 0) AS ph_media, ph_min, ph_max, bomba_ligada_s
+                  FROM rollup_leituras WHERE resolucao = ?''')
+        parametros: List[Any] = [escolhida]
+        if inicio is not None:
+            sql += ' AND inicio >= ?'
+            parametros.append(balde(_texto_data(inicio)))
+        if fim is not None:
+            sql += ' AND inicio < ?'
+            parametros.append(_texto_data(fim))
+        sql += ' ORDER BY inicio'
+        return self._consultar(sql, parametros)
+
+    def _serie_bruta_por_minuto(self, inicio: Any = None, fim: Any = None) -> List[Dict[str, Any]]:
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append('data_hora >= ?')
+            parametros.append(_texto_data(inicio))
+        if fim is not None:
+            condicoes.append('data_hora < ?')
+            parametros.append(_texto_data(fim))
+        sql = ('''SELECT substr(data_hora, 1, 16) || ':00' AS inicio, COUNT(*) AS quantidade,
+                         AVG(umidade) AS umidade_media, MIN(umidade) AS umidade_min, MAX(umidade) AS umidade_max,
+                         AVG(ph) AS ph_media, MIN(ph) AS ph_min, MAX(ph) AS ph_max,
+                         NULL AS bomba_ligada_s
+                  FROM leituras_sensores''')
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += ' GROUP BY 1 ORDER BY 1'
+        return self._consultar(sql, parametros)
+
+    # --- Retenção ---
+
+    def ativar_vacuum_incremental(self) -> bool:
+        """
+        Manutenção (offline): converte um banco antigo para auto_vacuum incremental.
+        Roda um VACUUM, que reescreve o arquivo inteiro e precisa dele só para si:
+        pare o gateway e o Dashboard antes. Retorna True se o banco já está (ou
+        ficou) incremental; False se o banco estava em uso por outro processo.
+        """
+        with self._pool.escrita() as conn:
+            if conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2:
+                return True
+            try:
+                conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                conn.execute('VACUUM')
+            except sqlite3.OperationalError as e:
+                print(f"⚠️ Não foi possível ativar o vacuum incremental ({e}). "
+                      "Feche os outros processos que usam o banco e tente de novo.")
+                return False
+            print("Banco convertido para auto_vacuum incremental.")
+            return conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+
+    def aplicar_retencao(self, idade_maxima_dias: float = 90, tamanho_lote: int = 5000,
+                         pausa_s: float = 0.01, paginas_por_vacuum: int = 1000,
+                         converter_vacuum: bool = False) -> Dict[str, Any]:
+        """
+        Remove leituras brutas mais antigas que `idade_maxima_dias`, depois de garantir
+        que já estão nos rollups. Apaga em lotes pequenos, cada um em sua transação, e
+        solta o lock de escrita entre eles para a ingestão não ficar parada.
+        Em seguida devolve as páginas livres ao disco com incremental_vacuum.
+        converter_vacuum: em banco antigo (sem auto_vacuum incremental), roda antes
+        ativar_vacuum_incremental(); só use numa janela de manutenção.
+        Retorna {'linhas_removidas', 'bytes_recuperados', 'tempo_s', 'lotes', 'vacuum_incremental'}.
+        """
+        inicio = time.perf_counter()
+        if converter_vacuum:
+            self.ativar_vacuum_incremental()
+        self.atualizar_rollups()
+        limite = (datetime.datetime.now() - datetime.timedelta(days=idade_maxima_dias)).isoformat()
+
+        with self._pool.leitura() as conn:
+            marca = conn.execute("SELECT valor FROM rollup_controle WHERE chave = 'ultimo_id'").fetchone()
+            tamanho_pagina = conn.execute('PRAGMA page_size').fetchone()[0]
+            paginas_antes = conn.execute('PRAGMA page_count').fetchone()[0]
+        ultimo_agregado = int(marca[0]) if marca else 0
+
+        removidas, lotes = 0, 0
+        while True:
+            with self._pool.escrita() as conn:
+                cursor = conn.execute(
+                    'DELETE FROM leituras_sensores WHERE id IN ('
+                    ' SELECT id FROM leituras_sensores WHERE data_hora < ? AND id <= ? LIMIT ?)',
+                    (limite, ultimo_agregado, tamanho_lote))
+                conn.commit()
+            if cursor.rowcount <= 0:
+                break
+            removidas += cursor.rowcount
+            lotes += 1
+            if pausa_s:
+                time.sleep(pausa_s)
+
+        # Devolve as páginas livres também em lotes
+        while True:
+            with self._pool.escrita() as conn:
+                livres = conn.execute('PRAGMA freelist_count').fetchone()[0]
+                if livres == 0:
+                    break
+                conn.execute(f'PRAGMA incremental_vacuum({int(paginas_por_vacuum)})')
+                conn.commit()
+                if conn.execute('PRAGMA freelist_count').fetchone()[0] >= livres:
+                    break  # banco sem auto_vacuum incremental: nada a devolver
+        with self._pool.escrita() as conn:
+            paginas_depois = conn.execute('PRAGMA page_count').fetchone()[0]
+            incremental = conn.execute('PRAGMA auto_vacuum').fetchone()[0] == 2
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+        relatorio = {
+            'linhas_removidas': removidas,
+            'bytes_recuperados': max(0, paginas_antes - paginas_depois) * tamanho_pagina,
+            'tempo_s': time.perf_counter() - inicio,
+            'lotes': lotes,
+            # False: o espaço livre fica no arquivo até ativar_vacuum_incremental()
+            'vacuum_incremental': incremental,
+        }
+        self.ultimo_relatorio_retencao = relatorio
+        return relatorio
+
+    def agendar_retencao(self, intervalo_s: float = 86400, **kwargs) -> threading.Event:
+        """
+        Roda aplicar_retencao em uma thread de fundo a cada `intervalo_s` segundos.
+        Retorna um Event: chame .set() para parar o agendamento.
+        """
+        parar = threading.Event()
+
+        def ciclo():
+            while not parar.wait(intervalo_s):
+                try:
+                    rel = self.aplicar_retencao(**kwargs)
+                    print(f"Retenção: {rel['linhas_removidas']} linhas removidas, "
+                          f"{rel['bytes_recuperados'] / 1024:.0f} KB recuperados em {rel['tempo_s']:.2f}s.")
+                except sqlite3.Error as e:
+                    print(f"⚠️ Erro na retenção: {e}")
+
+        threading.Thread(target=ciclo, daemon=True, name="retencao-leituras").start()
+        return parar
+
+    def _consultar(self, sql: str, parametros: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        with self._pool.leitura() as conn:
+            cursor = conn.execute(sql, tuple(parametros))
+            colunas = [description[0] for description in cursor.description]
+            return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+    def obter_leituras_periodo(self, inicio: Any = None, fim: Any = None,
+                               limite: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Leituras com inicio <= data_hora < fim, em ordem cronológica (usa o índice de data_hora)."""
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append('data_hora >= ?')
+            parametros.append(_texto_data(inicio))
+        if fim is not None:
+            condicoes.append('data_hora < ?')
+            parametros.append(_texto_data(fim))
+        sql = 'SELECT * FROM leituras_sensores'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += ' ORDER BY data_hora, id'
+        if limite is not None:
+            sql += ' LIMIT ?'
+            parametros.append(int(limite))
+        return self._consultar(sql, parametros)
+
+    def obter_leituras_por_status(self, status_bomba: int, inicio: Any = None, fim: Any = None,
+                                  limite: Optional[int] = 100) -> List[Dict[str, Any]]:
+        """Leituras mais recentes com o status de bomba informado (índice status_bomba + data_hora)."""
+        sql = 'SELECT * FROM leituras_sensores WHERE status_bomba = ?'
+        parametros: List[Any] = [status_bomba]
+        if inicio is not None:
+            sql += ' AND data_hora >= ?'
+            parametros.append(_texto_data(inicio))
+        if fim is not None:
+            sql += ' AND data_hora < ?'
+            parametros.append(_texto_data(fim))
+        sql += ' ORDER BY data_hora DESC'
+        if limite is not None:
+            sql += ' LIMIT ?'
+            parametros.append(int(limite))
+        return self._consultar(sql, parametros)
+
+    def obter_ultimas_leituras(self, quantidade: int = 10) -> List[Dict[str, Any]]:
+        """As N leituras mais recentes (percorre o índice de trás para frente, sem ordenar)."""
+        return self._consultar(
+            'SELECT * FROM leituras_sensores ORDER BY data_hora DESC, id DESC LIMIT ?', (int(quantidade),))
+
+    def paginar_leituras(self, tamanho_pagina: int = 100,
+                         apos: Optional[Tuple[str, int]] = None) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, int]]]:
+        """
+        Paginação por chave (keyset), da leitura mais recente para a mais antiga.
+        apos: cursor devolvido pela página anterior (None = primeira página).
+        Retorna (linhas, próximo cursor); o cursor é None quando acabaram as páginas.
+        Ao contrário de OFFSET, o custo de cada página não cresce com a posição.
+        """
+        if apos is None:
+            linhas = self._consultar(
+                'SELECT * FROM leituras_sensores ORDER BY data_hora DESC, id DESC LIMIT ?',
+                (int(tamanho_pagina),))
+        else:
+            linhas = self._consultar(
+                'SELECT * FROM leituras_sensores WHERE (data_hora, id) < (?, ?) '
+                'ORDER BY data_hora DESC, id DESC LIMIT ?',
+                (apos[0], apos[1], int(tamanho_pagina)))
+        proximo = (linhas[-1]['data_hora'], linhas[-1]['id']) if len(linhas) == tamanho_pagina else None
+        return linhas, proximo
+
     def obter_leitura_por_id(self, id_leitura: int) -> Optional[Dict[str, Any]]:
         """Retorna uma leitura específica pelo ID."""
-        self.cursor.execute('SELECT * FROM leituras_sensores WHERE id = ?', (id_leitura,))
-        linha = self.cursor.fetchone()
-        if linha:
-            colunas = [description[0] for description in self.cursor.description]
-            return dict(zip(colunas, linha))
+        with self._pool.leitura() as conn:
+            cursor = conn.execute('SELECT * FROM leituras_sensores WHERE id = ?', (id_leitura,))
+            linha = cursor.fetchone()
+            if linha:
+                colunas = [description[0] for description in cursor.description]
+                return dict(zip(colunas, linha))
         return None
 
     def atualizar_leitura(self, id_leitura: int, **kwargs) -> bool:
-        """Atualiza uma leitura existente. Já é compatível com as novas colunas."""
+        """
+        Atualiza uma leitura existente. Já é compatível com as novas colunas.
+        Se a leitura já estava nos rollups, os dias afetados são recalculados.
+        """
         if not kwargs:
             return False
         set_clause = ", ".join([f"{key} = ?" for key in kwargs.keys()])
         valores = list(kwargs.values())
         valores.append(id_leitura)
-        self.cursor.execute(
-            f'UPDATE leituras_sensores SET {set_clause} WHERE id = ?',
-            valores
-        )
-        self.conn.commit()
-        return self.cursor.rowcount > 0
+        with self._pool.escrita() as conn:
+            antes = conn.execute('SELECT id, data_hora, observacoes FROM leituras_sensores WHERE id = ?',
+                                 (id_leitura,)).fetchone()
+            cursor = conn.execute(
+                f'UPDATE leituras_sensores SET {set_clause} WHERE id = ?',
+                valores
+            )
+            if cursor.rowcount > 0 and COLUNAS_ROLLUP.intersection(kwargs):
+                depois = conn.execute('SELECT id, data_hora, observacoes FROM leituras_sensores WHERE id = ?',
+                                      (id_leitura,)).fetchone()
+                self._corrigir_rollups(conn, [antes, depois])
+            conn.commit()
+            return cursor.rowcount > 0
 
     def deletar_leitura(self, id_leitura: int) -> bool:
-        """Deleta uma leitura pelo ID."""
-        self.cursor.execute('DELETE FROM leituras_sensores WHERE id = ?', (id_leitura,))
-        self.conn.commit()
-        return self.cursor.rowcount > 0
-
-    def exportar_para_csv(self, nome_arquivo: str = "dados_sensores.csv") -> str:
-        """Exporta todos os dados para um arquivo CSV."""
-        dados = self.obter_todas_leituras()
-        if not dados:
+        """Deleta uma leitura pelo ID (e recalcula os rollups do dia, se já agregada)."""
+        with self._pool.escrita() as conn:
+            antes = conn.execute('SELECT id, data_hora, observacoes FROM leituras_sensores WHERE id = ?',
+                                 (id_leitura,)).fetchone()
+            cursor = conn.execute('DELETE FROM leituras_sensores WHERE id = ?', (id_leitura,))
+            if cursor.rowcount > 0:
+                self._corrigir_rollups(conn, [antes])
+            conn.commit()
+            return cursor.rowcount > 0
+
+    def _iterar_blocos(self, inicio: Any = None, fim: Any = None,
+                       tamanho_bloco: int = 5000) -> Iterator[Tuple[List[str], List[tuple]]]:
+        """
+        Percorre as leituras (mais recentes primeiro) em blocos de `tamanho_bloco` linhas
+        com fetchmany, sem carregar a tabela inteira. Gera (colunas, linhas).
+        """
+        condicoes, parametros = [], []
+        if inicio is not None:
+            condicoes.append('data_hora >= ?')
+            parametros.append(_texto_data(inicio))
+        if fim is not None:
+            condicoes.append('data_hora < ?')
+            parametros.append(_texto_data(fim))
+        sql = 'SELECT * FROM leituras_sensores'
+        if condicoes:
+            sql += ' WHERE ' + ' AND '.join(condicoes)
+        sql += ' ORDER BY data_hora DESC'
+
+        with self._pool.leitura() as conn:
+            cursor = conn.execute(sql, parametros)
+            colunas = [description[0] for description in cursor.description]
+            while True:
+                linhas = cursor.fetchmany(tamanho_bloco)
+                if not linhas:
+                    break
+                yield colunas, linhas
+
+    def exportar_para_csv(self, nome_arquivo: str = "dados_sensores.csv", inicio: Any = None,
+                          fim: Any = None, compactar: Optional[bool] = None,
+                          tamanho_bloco: int = 5000) -> str:
+        """
+        Exporta os dados para CSV em streaming (memória constante, qualquer tamanho de tabela).
+        inicio/fim: filtro opcional por data_hora.
+        compactar: grava gzip; por padrão, ativado se o nome terminar em '.gz'.
+        """
+        blocos = self._iterar_blocos(inicio, fim, tamanho_bloco)
+        primeiro = next(blocos, None)
+        if primeiro is None:
             return "Sem dados para exportar"
-        with open(nome_arquivo, 'w', newline='', encoding='utf-8') as csvfile:
-            nomes_campos = dados[0].keys()
-            writer = csv.DictWriter(csvfile, fieldnames=nomes_campos)
-            writer.writeheader()
-            writer.writerows(dados)
+
+        if compactar is None:
+            compactar = nome_arquivo.endswith('.gz')
+        abrir = gzip.open if compactar else open
+        with abrir(nome_arquivo, 'wt', newline='', encoding='utf-8') as csvfile:
+            writer = csv.writer(csvfile)
+            writer.writerow(primeiro[0])
+            writer.writerows(primeiro[1])
+            for _, linhas in blocos:
+                writer.writerows(linhas)
         return os.path.abspath(nome_arquivo)
-    
+
+    def exportar_colunar(self, nome_arquivo: str = "dados_sensores.parquet", inicio: Any = None,
+                         fim: Any = None, tamanho_bloco: int = 50_000) -> str:
+        """
+        Exporta em formato colunar para análises: Parquet ('.parquet') ou
+        Arrow IPC ('.arrow' / '.feather'). Grava bloco a bloco (memória constante).
+        Requer pyarrow.
+        """
+        if not ARROW_AVAILABLE:
+            return "Exportação colunar indisponível (pyarrow não instalado)"
+
+        parquet = not nome_arquivo.endswith(('.arrow', '.feather'))
+        escritor = None
+        try:
+            for colunas, linhas in self._iterar_blocos(inicio, fim, tamanho_bloco):
+                lote = pa.RecordBatch.from_arrays(
+                    [pa.array([linha[i] for linha in linhas], type=ESQUEMA_ARROW.field(nome).type)
+                     for i, nome in enumerate(colunas)], schema=ESQUEMA_ARROW)
+                if escritor is None:
+                    escritor = (pq.ParquetWriter(nome_arquivo, ESQUEMA_ARROW) if parquet
+                                else pa.ipc.new_file(nome_arquivo, ESQUEMA_ARROW))
+                escritor.write_batch(lote)
+        finally:
+            if escritor is not None:
+                escritor.close()
+        if escritor is None:
+            return "Sem dados para exportar"
+        return os.path.abspath(nome_arquivo)
+
     def fechar(self):
-        """Fecha a conexão com o banco de dados."""
-        if self.conn:
-            self.conn.close()
+        """Fecha todas as conexões do pool."""
+        self._pool.fechar()
 
     def __enter__(self):
         return self
@@ -175,6 +998,66 @@ def gerar_dados_exemplo_fase4(num_amostras: int = 10) -> List[str]:
         dados.append(linha)
     return dados
 
+def benchmark_importacao(num_linhas: int = 100_000, num_linhas_lento: int = 2_000) -> Dict[str, float]:
+    """
+    Compara linhas/segundo de importar_do_serial (um commit por linha) com
+    importar_do_serial_em_lote (uma transação) em bancos temporários.
+    O caminho antigo roda com menos linhas porque cada commit força um fsync.
+    """
+    pasta = tempfile.mkdtemp()
+    resultado = {}
+    for nome, metodo, n in (('linha_a_linha', 'importar_do_serial', num_linhas_lento),
+                            ('em_lote', 'importar_do_serial_em_lote', num_linhas)):
+        dados = gerar_dados_exemplo_fase4(n)
+        with BancoDadosAgricola(os.path.join(pasta, f"bench_{nome}.db")) as bd:
+            inicio = time.perf_counter()
+            getattr(bd, metodo)(dados)
+            resultado[nome] = n / (time.perf_counter() - inicio)
+    return resultado
+
+def benchmark_concorrencia(duracao_s: float = 3.0, leitores: int = 4,
+                           linhas_iniciais: int = 50_000, wal: bool = True) -> Dict[str, float]:
+    """
+    Mede a vazão de leitura e escrita enquanto um job de ingestão grava sem parar.
+    Uma thread importa lotes do serial; `leitores` threads consultam leituras por id.
+    Rode com wal=True e wal=False para comparar.
+    """
+    caminho = os.path.join(tempfile.mkdtemp(), "bench_concorrencia.db")
+    bd = BancoDadosAgricola(caminho, max_leitores=leitores, wal=wal)
+    bd.importar_do_serial_em_lote(gerar_dados_exemplo_fase4(linhas_iniciais))
+    lote = gerar_dados_exemplo_fase4(500)
+
+    parar = threading.Event()
+    contagem = {'escritas': 0, 'leituras': 0}
+    lock_contagem = threading.Lock()
+
+    def ingestao():
+        while not parar.is_set():
+            resultado = bd.importar_do_serial_em_lote(lote)
+            with lock_contagem:
+                contagem['escritas'] += resultado['inseridas']
+
+    def leitor():
+        feitas = 0
+        while not parar.is_set():
+            bd.obter_leitura_por_id(random.randint(1, linhas_iniciais))
+            feitas += 1
+        with lock_contagem:
+            contagem['leituras'] += feitas
+
+    threads = [threading.Thread(target=ingestao)] + [threading.Thread(target=leitor) for _ in range(leitores)]
+    for t in threads:
+        t.start()
+    time.sleep(duracao_s)
+    parar.set()
+    for t in threads:
+        t.join()
+    bd.fechar()
+    return {
+        'escritas_por_s': contagem['escritas'] / duracao_s,
+        'leituras_por_s': contagem['leituras'] / duracao_s,
+    }
+
 if __name__ == "__main__":
     # Apagar o banco antigo para testar a criação da nova tabela do zero
     if os.path.exists("dados_agricolas.db"):
@@ -224,4 +1107,17 @@ if __name__ == "__main__":
         caminho_csv = bd.exportar_para_csv()
         print(f"   Arquivo CSV gerado em: {caminho_csv}")
 
+        # 6. Benchmark da importação em lote
+        print("\n6. Benchmark de importação (linhas/s):")
+        bench = benchmark_importacao()
+        print(f"   Linha a linha: {bench['linha_a_linha']:,.0f} linhas/s")
+        print(f"   Em lote:       {bench['em_lote']:,.0f} linhas/s")
+
+        # 7. Concorrência: leituras enquanto a ingestão grava
+        print("\n7. Benchmark de concorrência (ingestão + 4 leitores):")
+        for modo_wal in (True, False):
+            conc = benchmark_concorrencia(wal=modo_wal)
+            print(f"   {'WAL     ' if modo_wal else 'Rollback'}: {conc['escritas_por_s']:,.0f} escritas/s | "
+                  f"{conc['leituras_por_s']:,.0f} leituras/s")
+
         print("\n=== Demonstração concluída ===")
\ No newline at end of file
@@ -1,15 +1,29 @@
+import itertools
+import json
 import math
+import os
+import time
+import numpy as np
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+PRESETS_PATH = os.path.join(BASE_DIR, 'presets_culturas.json')
 
 # Função pura: Recebe dados, retorna resultado. Sem input() nem print()
-def calcular_area_plantio(forma, dimensao1, dimensao2=0):
+def calcular_area_plantio(forma, dimensao1, dimensao2=0, geografico=False):
     """
     Calcula a área baseada na forma.
-    forma: str ('retângulo', 'quadrado', 'círculo')
-    dimensao1: largura ou lado ou raio
+    forma: str ('retângulo', 'quadrado', 'círculo', 'polígono')
+    dimensao1: largura ou lado ou raio; no polígono, a lista de vértices
+               (ou de anéis, o primeiro externo e os demais buracos)
     dimensao2: comprimento (apenas para retângulo)
+    geografico: (polígono) vértices em (longitude, latitude) graus; área em m²
     """
     forma = forma.lower().strip()
     
+    if forma in ["polígono", "poligono"]:
+        return area_poligono(dimensao1, geografico)
+
     if forma in ["retângulo", "retangulo"]:
         # dimensao1 = largura, dimensao2 = comprimento
         return dimensao1 * dimensao2
@@ -25,12 +39,21 @@ def calcular_area_plantio(forma, dimensao1, dimensao2=0):
     else:
         return 0.0
 
+_VETORES = (np.ndarray, pd.Series, list, tuple)
+
 def calcular_qtd_insumos(area_cultivo, qtd_por_m2, num_linhas):
     """
     area_cultivo: float
     qtd_por_m2: float
     num_linhas: int
+    Também aceita arrays (ex.: as áreas de carregar_geojson) e calcula item a item.
     """
+    if (isinstance(area_cultivo, _VETORES) or isinstance(qtd_por_m2, _VETORES)
+            or isinstance(num_linhas, _VETORES)):
+        area = np.asarray(area_cultivo, dtype=np.float64)
+        qtd = np.asarray(qtd_por_m2, dtype=np.float64)
+        return np.where((area > 0) & (qtd > 0), area * qtd * np.asarray(num_linhas), 0.0)
+
     if area_cultivo <= 0 or qtd_por_m2 <= 0:
         return 0.0
         
@@ -39,3 +62,286 @@ def calcular_qtd_insumos(area_cultivo, qtd_por_m2, num_linhas):
     
 
     return total_quantity
+
+# --- POLÍGONOS (LEVANTAMENTOS GPS / GEOJSON) ---
+RAIO_TERRA_M = 6371008.8  # raio médio da Terra (m)
+
+def _eh_numero(valor):
+    return isinstance(valor, (int, float, np.integer, np.floating))
+
+def _normalizar_geometria(geometria):
+    """
+    Aceita um anel [(x, y), ...], um polígono [anel_externo, buraco, ...],
+    um MultiPolygon [polígono, ...] ou um dict GeoJSON {'type', 'coordinates'}.
+    Devolve sempre a lista de polígonos (cada um, lista de anéis).
+    """
+    if isinstance(geometria, dict):
+        tipo, coordenadas = geometria.get('type'), geometria.get('coordinates') or []
+        if tipo == 'Polygon':
+            return [coordenadas]
+        if tipo == 'MultiPolygon':
+            return list(coordenadas)
+        return []
+    if geometria is None or len(geometria) == 0:
+        return []
+    if _eh_numero(geometria[0][0]):
+        return [[geometria]]
+    if _eh_numero(geometria[0][0][0]):
+        return [geometria]
+    return list(geometria)
+
+def _achatar(geometrias):
+    """
+    Junta os vértices de todas as geometrias em um único array (N, 2).
+    Retorna (vertices, inicio de cada anel, geometria de cada anel, sinal do anel:
+    +1 externo, -1 buraco).
+    """
+    valores, inicios, donos, sinais = [], [], [], []
+    total = 0
+    for indice, geometria in enumerate(geometrias):
+        for poligono in _normalizar_geometria(geometria):
+            for i, anel in enumerate(poligono):
+                if len(anel) < 3:
+                    continue
+                inicios.append(total)
+                donos.append(indice)
+                sinais.append(1.0 if i == 0 else -1.0)
+                total += len(anel)
+                # Lista plana [x0, y0, x1, y1, ...]; a altitude (3ª coordenada) é ignorada
+                if len(anel[0]) == 2:
+                    valores.extend(itertools.chain.from_iterable(anel))
+                else:
+                    valores.extend(itertools.chain.from_iterable(ponto[:2] for ponto in anel))
+    return (np.array(valores, dtype=np.float64).reshape(-1, 2), np.array(inicios, dtype=np.int64),
+            np.array(donos, dtype=np.int64), np.array(sinais))
+
+def _areas_aneis(vertices, inicios, geografico=False):
+    """
+    Área de cada anel, todos de uma vez: os termos de cada aresta são somados
+    por anel com np.add.reduceat.
+    Plano: fórmula do laço (shoelace). Geográfico (lon/lat em graus): área na
+    esfera pela fórmula de Chamberlain & Duquette, em m².
+    """
+    if len(inicios) == 0:
+        return np.zeros(0)
+    fins = np.append(inicios[1:], len(vertices))
+    proximo = np.arange(1, len(vertices) + 1)
+    proximo[fins - 1] = inicios  # a última aresta de cada anel fecha no primeiro vértice
+    x, y = vertices[:, 0], vertices[:, 1]
+
+    if geografico:
+        lon, lat = np.radians(x), np.radians(y)
+        dlon = (lon[proximo] - lon + np.pi) % (2 * np.pi) - np.pi  # atravessa o antimeridiano
+        termos = dlon * (2.0 + np.sin(lat) + np.sin(lat[proximo]))
+        return np.abs(np.add.reduceat(termos, inicios)) * RAIO_TERRA_M ** 2 / 2.0
+    termos = x * y[proximo] - x[proximo] * y
+    return np.abs(np.add.reduceat(termos, inicios)) / 2.0
+
+def areas_poligonos(geometrias, geografico=False):
+    """
+    Área de muitas geometrias (polígonos com buracos ou MultiPolygons) em uma
+    passada vetorizada. Retorna um array com uma área por geometria.
+    """
+    geometrias = list(geometrias)
+    vertices, inicios, donos, sinais = _achatar(geometrias)
+    areas = _areas_aneis(vertices, inicios, geografico)
+    total = np.bincount(donos, weights=sinais * areas, minlength=len(geometrias))
+    return np.clip(total, 0.0, None)
+
+def area_poligono(geometria, geografico=False):
+    """Área de um polígono (ver areas_poligonos)."""
+    return float(areas_poligonos([geometria], geografico)[0])
+
+def carregar_geojson(origem, geografico=True):
+    """
+    Lê uma FeatureCollection GeoJSON (caminho, texto JSON ou dict) e devolve um
+    DataFrame com as propriedades de cada talhão + forma='Polígono' e 'area' (m²).
+    GeoJSON usa (longitude, latitude) em graus, por isso geografico=True por padrão.
+    O resultado pode ir direto para calcular_plantio_lote.
+    """
+    if isinstance(origem, dict):
+        colecao = origem
+    elif isinstance(origem, str) and origem.lstrip().startswith('{'):
+        colecao = json.loads(origem)
+    else:
+        with open(origem, 'r', encoding='utf-8') as f:
+            colecao = json.load(f)
+
+    features = colecao.get('features', []) if colecao.get('type') == 'FeatureCollection' else [colecao]
+    talhoes = pd.DataFrame([f.get('properties') or {} for f in features], index=range(len(features)))
+    talhoes['forma'] = "Polígono"
+    talhoes['area'] = areas_poligonos((f.get('geometry') for f in features), geografico)
+    return talhoes
+
+# --- PRESETS DE CULTURAS ---
+def carregar_presets(caminho=PRESETS_PATH):
+    """
+    Lê os presets {cultura: {'qtd': kg/L por m², 'insumo': nome}} do arquivo JSON.
+    Retorna {} se o arquivo não existir ou estiver inválido.
+    """
+    try:
+        with open(caminho, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+# --- CÁLCULO EM LOTE (CADASTRO INTEIRO DE TALHÕES) ---
+# Nomes aceitos para cada forma (mesmos da versão escalar)
+FORMAS = {
+    "retângulo": "retangulo", "retangulo": "retangulo",
+    "quadrado": "quadrado",
+    "círculo": "circulo", "circulo": "circulo",
+    "polígono": "poligono", "poligono": "poligono",
+}
+
+def calcular_plantio_lote(talhoes, presets=None):
+    """
+    Mesma conta de calcular_area_plantio + calcular_qtd_insumos para milhares de
+    talhões de uma vez (pandas/NumPy, sem loop em Python).
+    talhoes: DataFrame (ou lista de dicts) com as colunas
+             forma, dimensao1, dimensao2 (opcional), cultura, num_linhas (opcional, padrão 1)
+             e qtd_por_m2 (opcional: sobrepõe o preset da cultura).
+             Talhões 'polígono' usam a coluna 'area' já calculada (ex.: carregar_geojson)
+             ou, se não houver, a coluna 'coordenadas' (vértices planos, em metros).
+    presets: dict de carregar_presets() (padrão: lido do arquivo).
+    Retorna (por_talhao, por_cultura):
+      por_talhao  = talhões + area, insumo, qtd_por_m2, total_insumo
+      por_cultura = totais agrupados por cultura e insumo
+    """
+    presets = carregar_presets() if presets is None else presets
+    df = pd.DataFrame(talhoes).copy()
+    n = len(df)
+
+    # Textos repetidos (forma, cultura) são tratados uma vez por valor distinto
+    # e espalhados pelos códigos do factorize
+    codigos, formas = pd.factorize(df['forma'])
+    forma = np.array([FORMAS.get(str(f).lower().strip()) for f in formas] + [None], dtype=object)[codigos]
+    d1 = (pd.to_numeric(df['dimensao1'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+          if 'dimensao1' in df else np.zeros(n))
+    d2 = (pd.to_numeric(df['dimensao2'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+          if 'dimensao2' in df else np.zeros(n))
+    poligono = np.zeros(n)
+    eh_poligono = forma == "poligono"
+    if 'area' in df:
+        poligono = pd.to_numeric(df['area'], errors='coerce').fillna(0.0).to_numpy(dtype=np.float64)
+    elif 'coordenadas' in df and eh_poligono.any():
+        poligono[eh_poligono] = areas_poligonos(df['coordenadas'].to_numpy()[eh_poligono])
+    df['area'] = np.select(
+        [forma == "retangulo", forma == "quadrado", forma == "circulo", eh_poligono],
+        [d1 * d2, d1 ** 2, math.pi * d1 ** 2, poligono],
+        default=0.0)
+
+    codigos, culturas = pd.factorize(df['cultura'])
+    preset = [presets.get(c, {}) for c in culturas] + [{}]  # o último atende códigos -1 (vazio)
+    df['insumo'] = np.array([p.get('insumo') or "Sem preset" for p in preset], dtype=object)[codigos]
+    qtd = np.array([p.get('qtd', np.nan) for p in preset], dtype=np.float64)[codigos]
+    if 'qtd_por_m2' in df:
+        informada = pd.to_numeric(df['qtd_por_m2'], errors='coerce').to_numpy(dtype=np.float64)
+        qtd = np.where(np.isnan(informada), qtd, informada)
+    df['qtd_por_m2'] = np.nan_to_num(qtd)
+    linhas = (pd.to_numeric(df['num_linhas'], errors='coerce').fillna(1).to_numpy()
+              if 'num_linhas' in df else np.ones(n))
+
+    df['total_insumo'] = calcular_qtd_insumos(df['area'].to_numpy(), df['qtd_por_m2'].to_numpy(), linhas)
+
+    por_cultura = (df.groupby(['cultura', 'insumo'], sort=True)
+                     .agg(talhoes=('area', 'size'), area_total=('area', 'sum'),
+                          total_insumo=('total_insumo', 'sum'))
+                     .reset_index())
+    return df, por_cultura
+
+def gerar_talhoes_exemplo(n=10_000, presets=None, semente=None):
+    """Cadastro aleatório de talhões para testes e benchmark."""
+    presets = carregar_presets() if presets is None else presets
+    rng = np.random.default_rng(semente)
+    return pd.DataFrame({
+        'forma': rng.choice(["Retângulo", "Quadrado", "Círculo"], n),
+        'dimensao1': rng.uniform(20.0, 500.0, n).round(1),
+        'dimensao2': rng.uniform(20.0, 500.0, n).round(1),
+        'cultura': rng.choice(list(presets) or ["Soja"], n),
+        'num_linhas': rng.integers(1, 5, n),
+    })
+
+def benchmark_lote(n=100_000):
+    """Talhões/segundo: loop com as funções escalares x calcular_plantio_lote."""
+    presets = carregar_presets()
+    talhoes = gerar_talhoes_exemplo(n, presets, semente=42)
+
+    inicio = time.perf_counter()
+    escalar = []
+    for t in talhoes.itertuples(index=False):
+        area = calcular_area_plantio(t.forma, t.dimensao1, t.dimensao2)
+        qtd = presets.get(t.cultura, {}).get('qtd', 0.0)
+        escalar.append(calcular_qtd_insumos(area, qtd, t.num_linhas))
+    tempo_escalar = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    por_talhao, _ = calcular_plantio_lote(talhoes, presets)
+    tempo_lote = time.perf_counter() - inicio
+
+    return {
+        'talhoes': n,
+        'escalar_por_s': n / tempo_escalar,
+        'lote_por_s': n / tempo_lote,
+        'resultados_iguais': bool(np.allclose(escalar, por_talhao['total_insumo'])),
+    }
+
+def gerar_geojson_exemplo(n=20_000, vertices=200, centro=(-47.06, -22.90), semente=None):
+    """
+    FeatureCollection com `n` talhões irregulares (polígonos com `vertices` vértices,
+    raio de 100 a 600 m) em volta de `centro` (lon, lat). Devolve também a área de
+    cada um calculada no plano local em metros, para conferência.
+    """
+    rng = np.random.default_rng(semente)
+    angulos = np.linspace(0.0, 2 * np.pi, vertices, endpoint=False)
+    raios = rng.uniform(100.0, 600.0, (n, 1)) * rng.uniform(0.7, 1.0, (n, vertices))
+    dx, dy = raios * np.cos(angulos), raios * np.sin(angulos)
+    lat0 = centro[1] + rng.uniform(-0.5, 0.5, (n, 1))
+    lon0 = centro[0] + rng.uniform(-0.5, 0.5, (n, 1))
+    lat = lat0 + np.degrees(dy / RAIO_TERRA_M)
+    lon = lon0 + np.degrees(dx / (RAIO_TERRA_M * np.cos(np.radians(lat0))))
+    area_plana = np.abs(np.sum(dx * np.roll(dy, -1, axis=1) - np.roll(dx, -1, axis=1) * dy, axis=1)) / 2
+
+    culturas = list(carregar_presets()) or ["Soja"]
+    features = []
+    for i in range(n):
+        anel = np.column_stack([lon[i], lat[i]]).tolist()
+        anel.append(anel[0])  # GeoJSON repete o primeiro vértice no fim
+        features.append({'type': 'Feature',
+                         'properties': {'talhao': i, 'cultura': culturas[i % len(culturas)]},
+                         'geometry': {'type': 'Polygon', 'coordinates': [anel]}})
+    return {'type': 'FeatureCollection', 'features': features}, area_plana
+
+def benchmark_geojson(n=20_000, vertices=200):
+    """Tempo para carregar e calcular áreas + insumos de uma FeatureCollection grande."""
+    colecao, area_plana = gerar_geojson_exemplo(n, vertices, semente=42)
+    inicio = time.perf_counter()
+    talhoes = carregar_geojson(colecao)
+    por_talhao, por_cultura = calcular_plantio_lote(talhoes)
+    tempo = time.perf_counter() - inicio
+    erro = np.abs(por_talhao['area'].to_numpy() - area_plana) / area_plana
+    return {
+        'talhoes': n,
+        'vertices': n * vertices,
+        'tempo_s': tempo,
+        'erro_relativo_max': float(erro.max()),
+        'area_total_ha': float(por_talhao['area'].sum() / 10_000),
+        'por_cultura': por_cultura,
+    }
+
+if __name__ == "__main__":
+    print("\n🌱 --- BENCHMARK CALCULADORA DE PLANTIO --- 🌱")
+    rel = benchmark_lote()
+    print(f"   Talhões: {rel['talhoes']:,}")
+    print(f"   Funções escalares: {rel['escalar_por_s']:,.0f} talhões/s")
+    print(f"   calcular_plantio_lote: {rel['lote_por_s']:,.0f} talhões/s "
+          f"({rel['lote_por_s'] / rel['escalar_por_s']:.0f}x)")
+    print(f"   Mesmos resultados: {'sim' if rel['resultados_iguais'] else 'NÃO'}\n")
+
+    print("🗺️ --- BENCHMARK GEOJSON (POLÍGONOS) --- 🗺️")
+    rel = benchmark_geojson()
+    print(f"   {rel['talhoes']:,} talhões / {rel['vertices']:,} vértices em {rel['tempo_s']:.2f}s")
+    print(f"   Área total: {rel['area_total_ha']:,.1f} ha (erro máx. vs. plano local: "
+          f"{rel['erro_relativo_max'] * 100:.3f}%)")
+    print(rel['por_cultura'].to_string(index=False))
+    print()
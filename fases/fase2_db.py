@@ -1,5 +1,10 @@
 import json
 import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
 import pandas as pd
 
 # Tenta importar o Oracle, mas se falhar (porque não instalou), segue a vida.
@@ -13,95 +18,746 @@ except ImportError:
 # --- CONFIGURAÇÕES ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 JSON_PATH = os.path.join(BASE_DIR, 'dados_insumos.json')
+# Banco local do modo offline (substitui a regravação do JSON inteiro a cada insert)
+LOCAL_DB_PATH = os.path.join(BASE_DIR, 'insumos_local.db')
+
+_CONEXAO_LOCAL = None
+_LOCK_LOCAL = threading.Lock()
+
+# --- POOL DE SESSÕES ORACLE ---
+ORACLE_CONFIG = {
+    'host': "ORACLE.FIAP.COM.BR",
+    'porta': 1521,
+    'servico': "ORCL",
+    'usuario': "RM562962",
+    'senha': "170180",
+    'pool_min': 1,
+    'pool_max': 4,
+    'pool_incremento': 1,
+}
+
+# Módulo do driver (cx_Oracle). Pode ser trocado por um substituto local
+# com a mesma API para testes (ver configurar_driver_oracle).
+_driver_oracle = cx_Oracle if ORACLE_AVAILABLE else None
+_POOL_ORACLE = None
+_LOCK_POOL = threading.Lock()
+
+class CircuitoOracle:
+    """
+    Disjuntor (circuit breaker) da conexão Oracle.
+    Depois de `limite_falhas` falhas seguidas ele "abre": por `tempo_aberto_s`
+    segundos conectar_oracle() devolve None na hora, sem esperar o timeout de rede,
+    e o sistema cai direto no banco local. Passado esse tempo, uma tentativa é
+    liberada (meio-aberto); se der certo, fecha de novo.
+    """
+
+    def __init__(self, limite_falhas=3, tempo_aberto_s=30.0):
+        self.limite_falhas = limite_falhas
+        self.tempo_aberto_s = tempo_aberto_s
+        self.falhas = 0
+        self.aberto_em = None
+        self._lock = threading.Lock()
+
+    @property
+    def estado(self):
+        if self.aberto_em is None:
+            return "fechado"
+        if time.monotonic() - self.aberto_em >= self.tempo_aberto_s:
+            return "meio-aberto"
+        return "aberto"
+
+    def permitir(self):
+        with self._lock:
+            estado = self.estado
+            if estado == "meio-aberto":
+                # Só uma tentativa por vez: reabre até ela terminar
+                self.aberto_em = time.monotonic()
+                return True
+            return estado == "fechado"
+
+    def registrar_sucesso(self):
+        with self._lock:
+            self.falhas = 0
+            self.aberto_em = None
+
+    def registrar_falha(self):
+        with self._lock:
+            self.falhas += 1
+            if self.falhas >= self.limite_falhas or self.aberto_em is not None:
+                self.aberto_em = time.monotonic()
+
+_CIRCUITO = CircuitoOracle()
+
+def configurar_driver_oracle(driver, **config):
+    """
+    Troca o driver Oracle (ex.: um substituto local que imita cx_Oracle) e/ou
+    a configuração. Descarta o pool atual e reinicia o disjuntor.
+    """
+    global _driver_oracle, _POOL_ORACLE
+    with _LOCK_POOL:
+        if _POOL_ORACLE is not None:
+            try:
+                _POOL_ORACLE.close()
+            except Exception:
+                pass
+        _driver_oracle = driver
+        _POOL_ORACLE = None
+        ORACLE_CONFIG.update(config)
+    _CIRCUITO.registrar_sucesso()
+    if _CONEXAO_LOCAL is not None:
+        # Banco local aberto antes do driver: itens gravados offline ainda não foram para a outbox
+        with _LOCK_LOCAL:
+            _enfileirar_offline(_CONEXAO_LOCAL)
+
+def _obter_pool():
+    """Cria o SessionPool na primeira necessidade (criação preguiçosa)."""
+    global _POOL_ORACLE
+    with _LOCK_POOL:
+        if _POOL_ORACLE is None:
+            dsn = _driver_oracle.makedsn(ORACLE_CONFIG['host'], ORACLE_CONFIG['porta'],
+                                         service_name=ORACLE_CONFIG['servico'])
+            _POOL_ORACLE = _driver_oracle.SessionPool(
+                user=ORACLE_CONFIG['usuario'], password=ORACLE_CONFIG['senha'], dsn=dsn,
+                min=ORACLE_CONFIG['pool_min'], max=ORACLE_CONFIG['pool_max'],
+                increment=ORACLE_CONFIG['pool_incremento'], threaded=True)
+        return _POOL_ORACLE
+
+def _descartar_pool():
+    global _POOL_ORACLE
+    with _LOCK_POOL:
+        if _POOL_ORACLE is not None:
+            try:
+                _POOL_ORACLE.close(force=True)
+            except Exception:
+                pass
+        _POOL_ORACLE = None
 
 def conectar_oracle():
-    """Tenta conectar ao Oracle. Retorna a conexão ou None se falhar."""
-    if not ORACLE_AVAILABLE:
+    """
+    Pega uma sessão do pool Oracle. Retorna a conexão ou None se falhar.
+    A sessão é testada (ping) antes de ser entregue; sessões quebradas são descartadas.
+    Com o disjuntor aberto, retorna None imediatamente.
+    """
+    if _driver_oracle is None:
+        return None
+    if not _CIRCUITO.permitir():
         return None
-        
+
+    conn = None
     try:
-        dsn = cx_Oracle.makedsn("ORACLE.FIAP.COM.BR", 1521, service_name="ORCL")
-        conn = cx_Oracle.connect(user="RM562962", password="170180", dsn=dsn)
+        pool = _obter_pool()
+        conn = pool.acquire()
+        conn.ping()
+        _CIRCUITO.registrar_sucesso()
         return conn
     except Exception as e:
+        if conn is not None:
+            try:
+                pool.drop(conn)
+            except Exception:
+                pass
+        _CIRCUITO.registrar_falha()
+        if _CIRCUITO.estado != "fechado":
+            _descartar_pool()  # recria do zero quando o banco voltar
         print(f"⚠️ Erro conexão Oracle: {e}")
         return None
 
 def desconectar_oracle(conn):
+    """Devolve a sessão ao pool (ou fecha, se o pool não existir mais)."""
     if conn:
         try:
-            conn.close()
+            if _POOL_ORACLE is not None:
+                _POOL_ORACLE.release(conn)
+            else:
+                conn.close()
         except:
             pass
 
+def status_oracle():
+    """Estado do disjuntor e uso do pool (para exibir no Dashboard)."""
+    info = {'disjuntor': _CIRCUITO.estado, 'falhas_seguidas': _CIRCUITO.falhas,
+            'sessoes_abertas': 0, 'sessoes_em_uso': 0}
+    pool = _POOL_ORACLE
+    if pool is not None:
+        info['sessoes_abertas'] = getattr(pool, 'opened', 0)
+        info['sessoes_em_uso'] = getattr(pool, 'busy', 0)
+    return info
+
+# --- ARMAZENAMENTO LOCAL (MODO OFFLINE) ---
+def _conectar_local():
+    """
+    Conexão (única por processo) com o banco local SQLite do modo offline.
+    O SQLite cuida da escrita atômica e do lock do arquivo entre processos;
+    inserir é só acrescentar uma linha, sem reescrever o arquivo.
+    Na primeira abertura importa os itens do antigo dados_insumos.json.
+    Itens gravados sem driver Oracle ficam marcados (pendente_oracle = 1) e vão
+    para a outbox quando o driver estiver disponível.
+    """
+    global _CONEXAO_LOCAL
+    if _CONEXAO_LOCAL is None:
+        conn = sqlite3.connect(LOCAL_DB_PATH, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS insumos_local (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                nome TEXT NOT NULL,
+                tipo TEXT,
+                quantidade INTEGER,
+                validade TEXT,
+                pendente_oracle INTEGER NOT NULL DEFAULT 0
+            )""")
+        colunas = [linha[1] for linha in conn.execute("PRAGMA table_info(insumos_local)")]
+        if 'pendente_oracle' not in colunas:
+            conn.execute("ALTER TABLE insumos_local ADD COLUMN pendente_oracle INTEGER NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_insumos_pendente ON insumos_local (id) "
+                     "WHERE pendente_oracle = 1")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_insumos_nome ON insumos_local (nome)")
+        # (tipo, nome): filtro por tipo já sai na ordem das páginas (nome, id)
+        conn.execute("DROP INDEX IF EXISTS idx_insumos_tipo")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_insumos_tipo_nome ON insumos_local (tipo, nome)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (chave TEXT PRIMARY KEY, valor TEXT)")
+        # Outbox: inserts ainda não confirmados no Oracle (write-behind)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS outbox_insumos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                chave TEXT NOT NULL UNIQUE,
+                nome TEXT NOT NULL,
+                tipo TEXT,
+                quantidade INTEGER,
+                validade TEXT,
+                criado_em REAL NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                proxima_tentativa REAL NOT NULL DEFAULT 0,
+                ultimo_erro TEXT
+            )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_proxima ON outbox_insumos (proxima_tentativa)")
+        conn.commit()
+        _migrar_json(conn)
+        _enfileirar_offline(conn)
+        _CONEXAO_LOCAL = conn
+    return _CONEXAO_LOCAL
+
+def _migrar_json(conn):
+    """
+    Migração única do dados_insumos.json para o banco local (o JSON não é alterado).
+    Os itens do JSON não vão para o Oracle aqui: o arquivo é a carga inicial do
+    repositório e já pode estar no Oracle (ver enfileirar_json_legado).
+    """
+    if conn.execute("SELECT 1 FROM meta WHERE chave = 'json_migrado'").fetchone():
+        return
+    itens = []
+    if os.path.exists(JSON_PATH):
+        try:
+            with open(JSON_PATH, 'r', encoding='utf-8') as f:
+                itens = json.load(f)
+        except Exception as e:
+            print(f"⚠️ Erro ao ler JSON para migração: {e}")
+            return
+    with conn:
+        conn.executemany(
+            "INSERT INTO insumos_local (nome, tipo, quantidade, validade) VALUES (?, ?, ?, ?)",
+            [(i.get('nome'), i.get('tipo'), i.get('quantidade'), i.get('validade')) for i in itens])
+        conn.execute("INSERT INTO meta (chave, valor) VALUES ('json_migrado', ?)", (str(len(itens)),))
+
+def _enfileirar_offline(conn):
+    """
+    Passa para a outbox os itens gravados enquanto não havia driver Oracle.
+    A chave de idempotência nasce junto com a entrada da outbox e a marca
+    pendente_oracle é apagada na mesma transação, então nada é enfileirado duas vezes.
+    """
+    if _driver_oracle is None:
+        return 0
+    with conn:
+        linhas = conn.execute(
+            "SELECT id, nome, tipo, quantidade, validade FROM insumos_local "
+            "WHERE pendente_oracle = 1 ORDER BY id").fetchall()
+        if not linhas:
+            return 0
+        agora = time.time()
+        conn.executemany(
+            "INSERT INTO outbox_insumos (chave, nome, tipo, quantidade, validade, criado_em) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(str(uuid.uuid4()), nome, tipo, quantidade, validade, agora)
+             for _, nome, tipo, quantidade, validade in linhas])
+        conn.executemany("UPDATE insumos_local SET pendente_oracle = 0 WHERE id = ?",
+                         [(linha[0],) for linha in linhas])
+    return len(linhas)
+
+def enfileirar_json_legado():
+    """
+    Passo manual (opcional): envia ao Oracle os itens do dados_insumos.json, para
+    quem usava a versão antiga que gravava offline no JSON. Roda uma vez só.
+    Cuidado: itens do JSON que já estejam no Oracle serão duplicados.
+    """
+    if _driver_oracle is None:
+        return "⚠️ Driver Oracle indisponível: nada foi enfileirado."
+    with _LOCK_LOCAL:
+        conn = _conectar_local()
+        if conn.execute("SELECT 1 FROM meta WHERE chave = 'json_enfileirado'").fetchone():
+            return "Itens do JSON já foram enfileirados anteriormente."
+        try:
+            with open(JSON_PATH, 'r', encoding='utf-8') as f:
+                itens = [i for i in json.load(f) if i.get('nome')]
+        except Exception as e:
+            return f"Erro ao ler JSON: {e}"
+        agora = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT INTO outbox_insumos (chave, nome, tipo, quantidade, validade, criado_em) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(str(uuid.uuid4()), i.get('nome'), i.get('tipo'), i.get('quantidade'),
+                  i.get('validade'), agora) for i in itens])
+            conn.execute("INSERT INTO meta (chave, valor) VALUES ('json_enfileirado', ?)", (str(len(itens)),))
+    iniciar_sincronizacao()
+    _SINCRONIZADOR.acordar()
+    return f"Sucesso: {len(itens)} item(ns) do JSON enfileirado(s) para o Oracle."
+
+def _inserir_local(nome, tipo, quantidade, validade, enfileirar=False):
+    """
+    Grava o item no banco local. Com enfileirar=True, grava na mesma transação
+    uma entrada na outbox (com chave de idempotência) para o envio ao Oracle;
+    sem ela, o item fica marcado para ser enfileirado quando houver driver.
+    """
+    chave = str(uuid.uuid4())
+    with _LOCK_LOCAL:
+        conn = _conectar_local()
+        _MARCAS_PAGINA.clear()
+        with conn:
+            conn.execute(
+                "INSERT INTO insumos_local (nome, tipo, quantidade, validade, pendente_oracle) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (nome.upper(), tipo, int(quantidade), str(validade), 0 if enfileirar else 1))
+            if enfileirar:
+                conn.execute(
+                    "INSERT INTO outbox_insumos (chave, nome, tipo, quantidade, validade, criado_em) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (chave, nome, tipo, int(quantidade), str(validade), time.time()))
+    return chave
+
+def _ler_local(nome=None, tipo=None):
+    sql = "SELECT nome, tipo, quantidade, validade FROM insumos_local"
+    condicoes, parametros = [], []
+    if nome:
+        condicoes.append("nome = ?")
+        parametros.append(nome.upper())
+    if tipo:
+        condicoes.append("tipo = ?")
+        parametros.append(tipo)
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    sql += " ORDER BY id"
+    with _LOCK_LOCAL:
+        return pd.read_sql(sql, _conectar_local(), params=parametros)
+
+def buscar_insumos(nome=None, tipo=None):
+    """Consulta o estoque local pelos índices de nome e/ou tipo."""
+    return _ler_local(nome, tipo)
+
+# --- SINCRONIZAÇÃO WRITE-BEHIND (OUTBOX -> ORACLE) ---
+# O MERGE usa a chave de idempotência para que um lote reenviado (ex.: commit
+# feito mas resposta perdida) não duplique linhas. A coluna vem da migração
+# MIGRACAO_CHAVE_ORACLE (rodada à parte por quem administra o banco); a
+# sincronização só confere se ela existe e, se não existir, não envia nada e
+# mostra o problema em status_sincronizacao().
+MIGRACAO_CHAVE_ORACLE = os.path.join(BASE_DIR, 'sql', 'oracle_001_chave_idempotencia.sql')
+SQL_EXISTE_CHAVE = ("SELECT COUNT(*) FROM user_tab_columns "
+                    "WHERE table_name = 'INSUMOS' AND column_name = 'CHAVE_IDEMPOTENCIA'")
+SQL_MERGE_INSUMO = """
+    MERGE INTO insumos d
+    USING (SELECT :1 AS chave, :2 AS nome, :3 AS tipo, :4 AS quantidade,
+                  TO_DATE(:5, 'YYYY-MM-DD') AS validade FROM dual) s
+    ON (d.chave_idempotencia = s.chave)
+    WHEN NOT MATCHED THEN
+        INSERT (nome, tipo, quantidade, validade, chave_idempotencia)
+        VALUES (s.nome, s.tipo, s.quantidade, s.validade, s.chave)"""
+
+class SincronizadorOracle:
+    """
+    Thread em segundo plano que esvazia a outbox para o Oracle.
+    Cada rodada envia até `tamanho_lote` itens em um único executemany (MERGE).
+    Sem Oracle, espera com backoff exponencial (até `backoff_max_s`); itens
+    recusados individualmente pelo banco recebem seu próprio backoff e ficam na
+    outbox com o erro registrado. Nada é apagado da outbox antes do commit.
+    """
+
+    def __init__(self, intervalo_s=5.0, tamanho_lote=200, backoff_base_s=2.0, backoff_max_s=300.0):
+        self.intervalo_s = intervalo_s
+        self.tamanho_lote = tamanho_lote
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.sincronizados = 0
+        self.falhas_seguidas = 0
+        self.ultima_sincronizacao = None
+        self.ultimo_erro = None
+        self.itens_por_s = 0.0
+        self.idempotente = None     # None = esquema do Oracle ainda não verificado
+        self.erro_esquema = None
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self._thread = None
+
+    def _backoff(self, tentativas):
+        return min(self.backoff_max_s, self.backoff_base_s * (2 ** max(0, tentativas - 1)))
+
+    def _verificar_esquema(self, conn):
+        """
+        Confere se insumos.chave_idempotencia existe (não altera o esquema).
+        Enquanto faltar, é conferida de novo a cada rodada.
+        """
+        cursor = conn.cursor()
+        cursor.execute(SQL_EXISTE_CHAVE)
+        if cursor.fetchone()[0]:
+            self.idempotente = True
+            self.erro_esquema = None
+            return
+        if self.idempotente is None:
+            print(f"⚠️ Coluna insumos.chave_idempotencia não existe no Oracle. "
+                  f"Rode a migração {MIGRACAO_CHAVE_ORACLE}.")
+        self.idempotente = False
+        self.erro_esquema = ("Coluna insumos.chave_idempotencia não existe no Oracle: sincronização "
+                             f"parada até rodar a migração {os.path.relpath(MIGRACAO_CHAVE_ORACLE, os.path.dirname(BASE_DIR))}.")
+
+    def _proximo_lote(self):
+        with _LOCK_LOCAL:
+            return _conectar_local().execute(
+                "SELECT id, chave, nome, tipo, quantidade, validade, tentativas FROM outbox_insumos "
+                "WHERE proxima_tentativa <= ? ORDER BY id LIMIT ?",
+                (time.time(), self.tamanho_lote)).fetchall()
+
+    def sincronizar(self):
+        """
+        Uma rodada de envio. Retorna quantos itens foram confirmados no Oracle,
+        ou None se o Oracle não estava disponível.
+        """
+        lote = self._proximo_lote()
+        if not lote:
+            return 0
+        conn = conectar_oracle()
+        if conn is None:
+            self.falhas_seguidas += 1
+            self.ultimo_erro = "Oracle indisponível"
+            return None
+
+        inicio = time.perf_counter()
+        erros = {}
+        try:
+            if not self.idempotente:
+                self._verificar_esquema(conn)
+                if not self.idempotente:
+                    self.falhas_seguidas += 1
+                    self.ultimo_erro = self.erro_esquema
+                    return None
+            cursor = conn.cursor()
+            cursor.executemany(SQL_MERGE_INSUMO, [linha[1:6] for linha in lote], batcherrors=True)
+            for erro in cursor.getbatcherrors():
+                erros[erro.offset] = erro.message
+            conn.commit()
+        except Exception as e:
+            self.falhas_seguidas += 1
+            self.ultimo_erro = str(e)
+            print(f"⚠️ Erro ao sincronizar insumos com o Oracle: {e}")
+            return None
+        finally:
+            desconectar_oracle(conn)
+
+        agora = time.time()
+        enviados = [(linha[0],) for i, linha in enumerate(lote) if i not in erros]
+        recusados = [(lote[i][6] + 1, agora + self._backoff(lote[i][6] + 1), msg, lote[i][0])
+                     for i, msg in erros.items()]
+        with _LOCK_LOCAL:
+            conn_local = _conectar_local()
+            with conn_local:
+                conn_local.executemany("DELETE FROM outbox_insumos WHERE id = ?", enviados)
+                conn_local.executemany(
+                    "UPDATE outbox_insumos SET tentativas = ?, proxima_tentativa = ?, ultimo_erro = ? "
+                    "WHERE id = ?", recusados)
+
+        duracao = time.perf_counter() - inicio
+        if enviados:
+            invalidar_cache()
+        self.sincronizados += len(enviados)
+        self.itens_por_s = len(enviados) / duracao if duracao > 0 else 0.0
+        self.ultima_sincronizacao = datetime.now().isoformat(timespec='seconds')
+        self.falhas_seguidas = 0
+        if erros:
+            self.ultimo_erro = next(iter(erros.values()))
+        return len(enviados)
+
+    def _executar(self):
+        while not self._parar.is_set():
+            try:
+                enviados = self.sincronizar()
+            except Exception as e:
+                enviados = None
+                self.ultimo_erro = str(e)
+            if enviados is None:
+                espera = self._backoff(self.falhas_seguidas)
+            elif enviados == self.tamanho_lote:
+                continue  # ainda há fila: segue sem esperar
+            else:
+                espera = self.intervalo_s
+            self._acordar.wait(espera)
+            self._acordar.clear()
+
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="sincronizador-oracle",
+                                            daemon=True)
+            self._thread.start()
+
+    def acordar(self):
+        """Pede uma rodada imediata (ex.: logo depois de um insert)."""
+        self._acordar.set()
+
+    def parar(self, timeout=5.0):
+        self._parar.set()
+        self._acordar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+_SINCRONIZADOR = SincronizadorOracle()
+
+def iniciar_sincronizacao():
+    """Garante que a thread de sincronização está rodando (idempotente)."""
+    if _driver_oracle is not None:
+        _SINCRONIZADOR.iniciar()
+
+def sincronizar_pendentes():
+    """Roda uma rodada de sincronização na thread atual (útil em scripts)."""
+    return _SINCRONIZADOR.sincronizar()
+
+def _pendentes_outbox(nome=None, tipo=None):
+    # Na outbox o nome fica como foi digitado (vai assim para o Oracle)
+    where, parametros = _filtros(nome, tipo, "UPPER(nome)", lambda i: "?")
+    with _LOCK_LOCAL:
+        return pd.read_sql("SELECT nome, tipo, quantidade, validade FROM outbox_insumos"
+                           + where + " ORDER BY id", _conectar_local(), params=parametros)
+
+def status_sincronizacao():
+    """Pendências da outbox, última sincronização e vazão do último lote."""
+    with _LOCK_LOCAL:
+        pendentes, mais_antigo = _conectar_local().execute(
+            "SELECT COUNT(*), MIN(criado_em) FROM outbox_insumos").fetchone()
+    return {
+        'pendentes': pendentes,
+        'pendente_ha_s': time.time() - mais_antigo if mais_antigo else 0.0,
+        'sincronizados': _SINCRONIZADOR.sincronizados,
+        'ultima_sincronizacao': _SINCRONIZADOR.ultima_sincronizacao,
+        'itens_por_s': _SINCRONIZADOR.itens_por_s,
+        'ultimo_erro': _SINCRONIZADOR.ultimo_erro,
+        'falhas_seguidas': _SINCRONIZADOR.falhas_seguidas,
+        'idempotente': _SINCRONIZADOR.idempotente,
+        'erro_esquema': _SINCRONIZADOR.erro_esquema,
+    }
+
+# --- CACHE DE LEITURA ---
+# Cada rerun do Streamlit chama as leituras de novo; o cache evita repetir a
+# consulta ao Oracle enquanto a resposta tiver menos de CACHE_TTL_S segundos.
+# Inserts e sincronizações invalidam tudo na hora.
+CACHE_TTL_S = 30.0
+
+_CACHE_LEITURAS = {}
+_LOCK_CACHE = threading.Lock()
+_GERACAO_CACHE = 0
+_ESTATISTICAS_CACHE = {'acertos': 0, 'faltas': 0, 'invalidacoes': 0}
+
+def _do_cache(chave, carregar):
+    """Devolve o valor em cache para `chave` ou chama carregar() e guarda por CACHE_TTL_S."""
+    agora = time.monotonic()
+    with _LOCK_CACHE:
+        item = _CACHE_LEITURAS.get(chave)
+        if item is not None and item[0] > agora:
+            _ESTATISTICAS_CACHE['acertos'] += 1
+            return item[1]
+        _ESTATISTICAS_CACHE['faltas'] += 1
+        geracao = _GERACAO_CACHE
+    valor = carregar()
+    with _LOCK_CACHE:
+        # Se houve invalidação durante a consulta, o resultado já pode estar velho
+        if geracao == _GERACAO_CACHE:
+            _CACHE_LEITURAS[chave] = (time.monotonic() + CACHE_TTL_S, valor)
+    return valor
+
+def invalidar_cache():
+    global _GERACAO_CACHE
+    with _LOCK_CACHE:
+        _CACHE_LEITURAS.clear()
+        _GERACAO_CACHE += 1
+        _ESTATISTICAS_CACHE['invalidacoes'] += 1
+
+def estatisticas_cache():
+    """Acertos/faltas do cache de leitura (para exibir no Dashboard)."""
+    with _LOCK_CACHE:
+        info = dict(_ESTATISTICAS_CACHE)
+        info['entradas'] = len(_CACHE_LEITURAS)
+    total = info['acertos'] + info['faltas']
+    info['taxa_acerto'] = info['acertos'] / total if total else 0.0
+    info['ttl_s'] = CACHE_TTL_S
+    return info
+
 # --- FUNÇÕES DE LEITURA ---
-def obter_dados_insumos():
+def _faixa_prefixo(prefixo):
+    """Limites [inicio, fim) das strings que começam com `prefixo` (ordem binária)."""
+    return prefixo, prefixo[:-1] + chr(min(ord(prefixo[-1]) + 1, 0x10FFFF))
+
+def _filtros(nome, tipo, coluna_nome, marcador):
+    """
+    Monta o WHERE dos filtros da tela: nome pelo prefixo (sem diferenciar
+    maiúsculas) e tipo exato. `marcador(i)` gera o placeholder de cada banco.
+    O prefixo vira uma faixa (coluna >= 'ABC' AND coluna < 'ABD'), que o banco
+    resolve pelo índice do nome; LIKE 'ABC%' faria uma varredura da tabela.
+    """
+    condicoes, parametros = [], []
+    prefixo = (nome or "").strip().upper()
+    if prefixo:
+        condicoes.append(f"{coluna_nome} >= {marcador(len(parametros))} "
+                         f"AND {coluna_nome} < {marcador(len(parametros) + 1)}")
+        parametros.extend(_faixa_prefixo(prefixo))
+    if tipo:
+        condicoes.append(f"tipo = {marcador(len(parametros))}")
+        parametros.append(tipo)
+    return (" WHERE " + " AND ".join(condicoes) if condicoes else ""), parametros
+
+def _marcador_oracle(i):
+    return f":{i + 1}"
+
+def _contar_oracle(conn, nome, tipo):
+    where, parametros = _filtros(nome, tipo, "UPPER(nome)", _marcador_oracle)
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) FROM insumos" + where, parametros)
+    return cursor.fetchone()[0]
+
+def _pagina_oracle(conn, nome, tipo, inicio, tamanho_pagina):
+    where, parametros = _filtros(nome, tipo, "UPPER(nome)", _marcador_oracle)
+    query = ("SELECT nome, tipo, quantidade, TO_CHAR(validade, 'YYYY-MM-DD') as validade FROM insumos"
+             + where + " ORDER BY nome, ROWID")
+    if tamanho_pagina:
+        n = len(parametros)
+        query += f" OFFSET :{n + 1} ROWS FETCH NEXT :{n + 2} ROWS ONLY"
+        parametros += [inicio, tamanho_pagina]
+    return pd.read_sql(query, conn, params=parametros)
+
+# Paginação por chave (keyset) do banco local: para cada filtro guarda a última
+# linha (nome, id) antes de cada início de página já visitado. A próxima página
+# continua de (nome, id) > marca pelo índice, sem OFFSET desde o começo.
+# Qualquer insert local desloca as páginas, então as marcas são apagadas.
+_MARCAS_PAGINA = {}
+MAX_FILTROS_MARCADOS = 256
+
+def _pagina_local(nome, tipo, inicio, tamanho_pagina):
+    sql = "SELECT nome, tipo, quantidade, validade, id FROM insumos_local"
+    with _LOCK_LOCAL:
+        conn = _conectar_local()
+        if not tamanho_pagina:
+            where, parametros = _filtros(nome, tipo, "nome", lambda i: "?")
+            df = pd.read_sql(sql + where + " ORDER BY nome, id", conn, params=parametros)
+            return df.drop(columns='id')
+
+        chave = (nome or None, tipo or None, tamanho_pagina)
+        if chave not in _MARCAS_PAGINA and len(_MARCAS_PAGINA) >= MAX_FILTROS_MARCADOS:
+            _MARCAS_PAGINA.clear()
+        marcas = _MARCAS_PAGINA.setdefault(chave, {})
+        # Marca mais próxima antes da página pedida (0 = começo, sem marca)
+        desde = max((p for p in marcas if p <= inicio), default=0)
+        if desde:
+            # A marca substitui o início da faixa do prefixo: o índice já
+            # começa a leitura nela (com as duas, o SQLite pode escolher a faixa)
+            where, parametros = _filtros(None, tipo, "nome", lambda i: "?")
+            condicoes = ["(nome, id) > (?, ?)"]
+            parametros += list(marcas[desde])
+            prefixo = (nome or "").strip().upper()
+            if prefixo:
+                condicoes.append("nome < ?")
+                parametros.append(_faixa_prefixo(prefixo)[1])
+            where += (" AND " if where else " WHERE ") + " AND ".join(condicoes)
+        else:
+            where, parametros = _filtros(nome, tipo, "nome", lambda i: "?")
+        sql += where + " ORDER BY nome, id LIMIT ? OFFSET ?"
+        parametros += [tamanho_pagina, inicio - desde]
+        df = pd.read_sql(sql, conn, params=parametros)
+        if len(df) == tamanho_pagina:
+            ultima = df.iloc[-1]
+            marcas[inicio + tamanho_pagina] = (ultima['nome'], int(ultima['id']))
+    return df.drop(columns='id')
+
+def _carregar_insumos(nome, tipo, inicio, tamanho_pagina):
     conn = conectar_oracle()
-    
+
     # 1. TENTATIVA ORACLE
     if conn:
         try:
-            query = "SELECT nome, tipo, quantidade, TO_CHAR(validade, 'YYYY-MM-DD') as validade FROM insumos"
-            df = pd.read_sql(query, conn)
-            desconectar_oracle(conn)
+            df = _pagina_oracle(conn, nome, tipo, inicio, tamanho_pagina)
+            iniciar_sincronizacao()
+            # Itens gravados localmente que ainda estão a caminho do Oracle
+            # entram depois das linhas do Oracle, na(s) última(s) página(s)
+            if not tamanho_pagina or len(df) < tamanho_pagina:
+                pendentes = _pendentes_outbox(nome, tipo)
+                if not pendentes.empty:
+                    if tamanho_pagina:
+                        total_oracle = inicio + len(df) if len(df) else _contar_oracle(conn, nome, tipo)
+                        desde = max(0, inicio - total_oracle)
+                        pendentes = pendentes.iloc[desde:desde + tamanho_pagina - len(df)]
+                    pendentes.columns = df.columns  # o Oracle devolve os nomes em maiúsculas
+                    df = pd.concat([df, pendentes], ignore_index=True)
             return df, "Conectado ao Oracle Database (Nuvem)"
         except Exception as e:
+            pass
+        finally:
             desconectar_oracle(conn)
-    
-    # 2. TENTATIVA JSON (FALLBACK)
-    if os.path.exists(JSON_PATH):
-        try:
-            with open(JSON_PATH, 'r', encoding='utf-8') as f:
-                dados = json.load(f)
-            df = pd.DataFrame(dados)
-            return df, "Modo Offline (Lendo de JSON Local)"
-        except Exception as e:
-            return pd.DataFrame(), f"Erro ao ler JSON: {e}"
-    
-    return pd.DataFrame(), "Modo Simulado (JSON não encontrado)"
 
-# --- FUNÇÕES DE ESCRITA (ATUALIZADA) ---
-def inserir_insumo(nome, tipo, quantidade, validade):
-    # Tenta conectar no Oracle primeiro
+    # 2. TENTATIVA BANCO LOCAL (FALLBACK)
+    try:
+        df = _pagina_local(nome, tipo, inicio, tamanho_pagina)
+        return df, "Modo Offline (Lendo do Banco Local)"
+    except Exception as e:
+        return pd.DataFrame(), f"Erro ao ler banco local: {e}"
+
+def obter_dados_insumos(nome=None, tipo=None, pagina=1, tamanho_pagina=None):
+    """
+    Lista os insumos (filtrados por prefixo do nome e/ou tipo). Com tamanho_pagina,
+    devolve só a página pedida (paginação feita no banco). Resultado em cache por
+    CACHE_TTL_S segundos.
+    """
+    inicio = (max(1, pagina) - 1) * tamanho_pagina if tamanho_pagina else 0
+    df, msg = _do_cache(('pagina', nome or None, tipo or None, inicio, tamanho_pagina),
+                        lambda: _carregar_insumos(nome, tipo, inicio, tamanho_pagina))
+    return df.copy(), msg
+
+def _carregar_contagem(nome, tipo):
     conn = conectar_oracle()
-    
-    # --- CENÁRIO 1: SALVAR NO ORACLE (Se estiver online) ---
     if conn:
         try:
-            cursor = conn.cursor()
-            sql = "INSERT INTO insumos (nome, tipo, quantidade, validade) VALUES (:1, :2, :3, TO_DATE(:4, 'YYYY-MM-DD'))"
-            cursor.execute(sql, (nome, tipo, quantidade, validade))
-            conn.commit()
-            return "Sucesso: Insumo inserido no Oracle!"
-        except Exception as e:
-            return f"Erro ao inserir no Oracle: {str(e)}"
+            return _contar_oracle(conn, nome, tipo) + len(_pendentes_outbox(nome, tipo))
+        except Exception:
+            pass
         finally:
             desconectar_oracle(conn)
+    where, parametros = _filtros(nome, tipo, "nome", lambda i: "?")
+    with _LOCK_LOCAL:
+        return _conectar_local().execute("SELECT COUNT(*) FROM insumos_local" + where,
+                                         parametros).fetchone()[0]
+
+def contar_insumos(nome=None, tipo=None):
+    """Total de itens com os mesmos filtros de obter_dados_insumos (para a paginação)."""
+    return _do_cache(('contagem', nome or None, tipo or None),
+                     lambda: _carregar_contagem(nome, tipo))
 
-    # --- CENÁRIO 2: SALVAR NO JSON (Modo Offline) ---
+# --- FUNÇÕES DE ESCRITA (ATUALIZADA) ---
+def inserir_insumo(nome, tipo, quantidade, validade):
+    """
+    Grava primeiro no banco local (a tela nunca espera pelo Oracle) e deixa o
+    item na outbox; a thread de sincronização envia para o Oracle em lote.
+    """
     try:
-        # 1. Carrega dados existentes
-        lista_dados = []
-        if os.path.exists(JSON_PATH):
-            with open(JSON_PATH, 'r', encoding='utf-8') as f:
-                lista_dados = json.load(f)
-        
-        # 2. Cria o novo item
-        novo_item = {
-            "nome": nome.upper(),
-            "tipo": tipo,
-            "quantidade": int(quantidade),
-            "validade": str(validade)
-        }
-        
-        # 3. Adiciona e Salva
-        lista_dados.append(novo_item)
-        
-        with open(JSON_PATH, 'w', encoding='utf-8') as f:
-            json.dump(lista_dados, f, indent=4, ensure_ascii=False)
-            
-        return "Sucesso: Item salvo localmente (Modo Offline)!"
-        
+        _inserir_local(nome, tipo, quantidade, validade, enfileirar=_driver_oracle is not None)
     except Exception as e:
+        return f"Erro ao salvar no banco local: {str(e)}"
+    invalidar_cache()
 
-        return f"Erro ao salvar no JSON: {str(e)}"
+    if _driver_oracle is None:
+        return "Sucesso: Item salvo localmente (Modo Offline)!"
+    iniciar_sincronizacao()
+    _SINCRONIZADOR.acordar()
+    return "Sucesso: Item salvo! Sincronização com o Oracle em segundo plano."
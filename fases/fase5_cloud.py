@@ -1,18 +1,54 @@
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import collections
 import boto3
 from botocore.exceptions import NoCredentialsError, PartialCredentialsError
 
 # --- CONFIGURAÇÃO AWS ---
 # Se tiver credenciais reais, coloque-as nas variáveis de ambiente ou configure o AWS CLI.
 # Se não tiver, o código entrará em modo SIMULAÇÃO para não travar o app.
+REGIAO_PADRAO = 'us-east-1'
+TOPICO_ARN_PADRAO = os.environ.get('FARMTECH_SNS_TOPIC_ARN')
+# Endpoint alternativo (ex.: um SNS local de testes como o LocalStack/moto)
+ENDPOINT_SNS = os.environ.get('FARMTECH_SNS_ENDPOINT')
+
+MAX_LOTE_SNS = 10  # limite do publish_batch
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+JORNAL_PATH = os.path.join(BASE_DIR, 'alertas_jornal.db')
+
+_CLIENTES_SNS = {}
+_LOCK_CLIENTES = threading.Lock()
+
+def obter_cliente_sns(regiao=REGIAO_PADRAO, endpoint_url=ENDPOINT_SNS):
+    """Cliente SNS criado uma única vez por (região, endpoint) e reaproveitado."""
+    chave = (regiao, endpoint_url)
+    with _LOCK_CLIENTES:
+        if chave not in _CLIENTES_SNS:
+            _CLIENTES_SNS[chave] = boto3.client('sns', region_name=regiao, endpoint_url=endpoint_url)
+        return _CLIENTES_SNS[chave]
 
 def enviar_alerta_aws(assunto, mensagem, topico_arn=None):
     """
     Tenta enviar um alerta via AWS SNS.
-    Se falhar (sem credenciais), apenas simula o envio no log.
+    Se falhar (sem credenciais ou sem rede), o alerta fica no jornal local e é
+    reenviado quando a conexão voltar. Se o tópico já tem alertas esperando no
+    jornal, o novo entra atrás deles (ordem por tópico).
     """
+    topico_arn = topico_arn or TOPICO_ARN_PADRAO
+    if topico_arn and obter_jornal().tem_pendentes(topico_arn, incluir_fila=True):
+        jornal = obter_jornal()
+        jornal.registrar(topico_arn, assunto, mensagem)
+        jornal.acordar()
+        return f"📒 Alerta na fila do jornal, atrás dos pendentes do tópico: {assunto} - {mensagem}"
     try:
         # Tenta conectar à AWS (busca credenciais automáticas do sistema)
-        sns = boto3.client('sns', region_name='us-east-1')
+        sns = obter_cliente_sns()
         
         if topico_arn:
             response = sns.publish(
@@ -20,12 +56,566 @@ def enviar_alerta_aws(assunto, mensagem, topico_arn=None):
                 Message=mensagem,
                 Subject=assunto
             )
+            obter_jornal().registrar(topico_arn, assunto, mensagem, estado='enviado')
             return f"✅ Alerta AWS enviado! ID: {response['MessageId']}"
         else:
             return "⚠️ AWS Configurada, mas Tópico ARN não fornecido."
             
     except (NoCredentialsError, PartialCredentialsError):
         # MODO SIMULAÇÃO (Para garantir a nota se a conta AWS expirou)
+        if topico_arn:
+            obter_jornal().registrar(topico_arn, assunto, mensagem)
+            return f"☁️ [Simulação AWS] Alerta guardado no jornal para reenvio: {assunto} - {mensagem}"
         return f"☁️ [Simulação AWS] Alerta registrado: {assunto} - {mensagem}"
     except Exception as e:
-        return f"❌ Erro AWS: {str(e)}"
\ No newline at end of file
+        if topico_arn:
+            obter_jornal().registrar(topico_arn, assunto, mensagem)
+            return f"❌ Erro AWS: {str(e)} (alerta guardado no jornal para reenvio)"
+        return f"❌ Erro AWS: {str(e)}"
+
+# --- DESPACHO EM SEGUNDO PLANO ---
+class LimitadorTaxa:
+    """Token bucket: até `rajada` envios de uma vez, repostos a `taxa_por_s` por segundo."""
+
+    def __init__(self, taxa_por_s=5.0, rajada=10):
+        if taxa_por_s <= 0 or rajada < 1:
+            raise ValueError("taxa_por_s deve ser > 0 e rajada >= 1")
+        self.taxa_por_s = taxa_por_s
+        self.rajada = rajada
+        self.fichas = float(rajada)
+        self._ultimo = time.monotonic()
+
+    @property
+    def lote_maximo(self):
+        """Maior lote que cabe no balde (e no publish_batch)."""
+        return max(1, min(MAX_LOTE_SNS, int(self.rajada)))
+
+    def _repor(self):
+        agora = time.monotonic()
+        self.fichas = min(self.rajada, self.fichas + (agora - self._ultimo) * self.taxa_por_s)
+        self._ultimo = agora
+
+    def aguardar(self, n=1):
+        """
+        Bloqueia (só a thread do despachante) até haver `n` fichas.
+        O balde nunca passa de `rajada`, então n maior é consumido em partes.
+        """
+        while n > 0:
+            parte = min(n, self.rajada)
+            self._repor()
+            while self.fichas < parte:
+                time.sleep((parte - self.fichas) / self.taxa_por_s)
+                self._repor()
+            self.fichas -= parte
+            n -= parte
+
+class DespachanteAlertas:
+    """
+    Envia alertas ao SNS fora da thread que os gera (ex.: a renderização do Streamlit).
+    - enfileirar() nunca bloqueia: a fila é limitada e, cheia, o alerta vai direto
+      para o jornal como pendente (sem jornal, é descartado).
+    - Com jornal, cada alerta é gravado já ao entrar na fila (estado 'na_fila') e
+      depois marcado como enviado/simulado, ou vira pendente se o envio falhar;
+      uma queda do processo não perde o que estava só na memória.
+    - Alertas repetidos da mesma bomba (chave) dentro de `janela_s` segundos são
+      agrupados: só o primeiro sai na hora (os demais ficam no jornal como
+      'coalescido'); ao fim da janela sai um resumo com a quantidade de repetições.
+    - Os envios respeitam um token bucket e saem em lotes de até 10 (publish_batch).
+    """
+
+    def __init__(self, topico_arn=None, tamanho_fila=1000, janela_s=60.0,
+                 taxa_por_s=5.0, rajada=10, cliente=None, jornal=None):
+        self.topico_arn = topico_arn or TOPICO_ARN_PADRAO
+        self.jornal = jornal
+        self.janela_s = janela_s
+        self.limitador = LimitadorTaxa(taxa_por_s, rajada)
+        self._cliente = cliente
+        self._fila = queue.Queue(maxsize=tamanho_fila)
+        self._janelas = {}  # chave -> [inicio da janela, repetições, último assunto/mensagem]
+        self._lock = threading.Lock()
+        self._parar = threading.Event()
+        self._thread = None
+        self.contadores = {'enfileirados': 0, 'enviados': 0, 'descartados': 0,
+                           'coalescidos': 0, 'simulados': 0, 'falhas': 0, 'no_jornal': 0}
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            self._cliente = obter_cliente_sns()
+        return self._cliente
+
+    # --- Entrada ---
+    @property
+    def _com_jornal(self):
+        # Sem tópico (simulação) não há o que reenviar depois
+        return self.jornal is not None and bool(self.topico_arn)
+
+    def _colocar(self, assunto, mensagem):
+        """Retorna 'enfileirado', 'no_jornal' (fila cheia) ou 'descartado'."""
+        uid = uuid.uuid4().hex if self._com_jornal else None
+        if uid:
+            # Gravado antes de entrar na fila: o jornal vê o alerta na ordem de chegada
+            self.jornal.registrar(self.topico_arn, assunto, mensagem, estado='na_fila', uid=uid)
+        try:
+            self._fila.put_nowait((assunto, mensagem, uid))
+        except queue.Full:
+            if uid:
+                self.jornal.atualizar(self.topico_arn, [uid], 'pendente')
+                self.jornal.acordar()
+                with self._lock:
+                    self.contadores['no_jornal'] += 1
+                return "no_jornal"
+            with self._lock:
+                self.contadores['descartados'] += 1
+            return "descartado"
+        with self._lock:
+            self.contadores['enfileirados'] += 1
+        return "enfileirado"
+
+    def enfileirar(self, assunto, mensagem, chave=None):
+        """
+        Agenda o alerta e retorna na hora.
+        Retorna 'enfileirado', 'coalescido', 'no_jornal' (fila cheia, guardado
+        para reenvio) ou 'descartado'.
+        """
+        self.iniciar()
+        if chave is not None:
+            agora = time.monotonic()
+            with self._lock:
+                janela = self._janelas.get(chave)
+                if janela is not None and agora - janela[0] < self.janela_s:
+                    janela[1] += 1
+                    janela[2] = (assunto, mensagem)
+                    self.contadores['coalescidos'] += 1
+                    coalescido = True
+                else:
+                    self._janelas[chave] = [agora, 0, (assunto, mensagem)]
+                    coalescido = False
+            if coalescido:
+                if self._com_jornal:
+                    self.jornal.registrar(self.topico_arn, assunto, mensagem, estado='coalescido')
+                return "coalescido"
+        return self._colocar(assunto, mensagem)
+
+    def _fechar_janelas(self):
+        """Gera o resumo das janelas vencidas que tiveram repetições."""
+        agora = time.monotonic()
+        resumos = []
+        with self._lock:
+            for chave, (inicio, repeticoes, ultimo) in list(self._janelas.items()):
+                if agora - inicio >= self.janela_s:
+                    del self._janelas[chave]
+                    if repeticoes:
+                        assunto, mensagem = ultimo
+                        resumos.append((assunto, f"{mensagem} (+{repeticoes} alerta(s) de {chave} "
+                                                 f"agrupado(s) em {self.janela_s:.0f}s)"))
+        for assunto, mensagem in resumos:
+            self._colocar(assunto, mensagem)
+
+    # --- Envio ---
+    def _simular(self, lote):
+        for assunto, mensagem, uid in lote:
+            print(f"☁️ [Simulação AWS] Alerta registrado: {assunto} - {mensagem}")
+            if uid:
+                self.jornal.atualizar(self.topico_arn, [uid], 'simulado')
+            elif self.jornal is not None:
+                self.jornal.registrar(self.topico_arn, assunto, mensagem, estado='simulado')
+        self.contadores['simulados'] += len(lote)
+
+    def _para_jornal(self, lote):
+        """Passa os alertas para o reenvio do jornal; sem jornal, o alerta é perdido."""
+        if not self._com_jornal:
+            self.contadores['falhas'] += len(lote)
+            return
+        self.jornal.atualizar(self.topico_arn, [uid for _, _, uid in lote], 'pendente')
+        self.contadores['no_jornal'] += len(lote)
+        self.jornal.acordar()
+
+    def _publicar(self, lote):
+        """Publica o lote e devolve as posições dos alertas que o SNS recusou."""
+        if len(lote) == 1:
+            assunto, mensagem, _ = lote[0]
+            self.cliente.publish(TopicArn=self.topico_arn, Message=mensagem, Subject=assunto)
+            return set()
+        resposta = self.cliente.publish_batch(
+            TopicArn=self.topico_arn,
+            PublishBatchRequestEntries=[{'Id': str(i), 'Message': m, 'Subject': a}
+                                        for i, (a, m, _) in enumerate(lote)])
+        return {int(f['Id']) for f in resposta.get('Failed', [])}
+
+    def _despachar(self, lote):
+        if not self.topico_arn:
+            self._simular(lote)
+            return
+        # Com alertas antigos ainda no jornal, os novos entram atrás deles
+        # para não passarem na frente (ordem por tópico)
+        if self._com_jornal and self.jornal.tem_pendentes(self.topico_arn):
+            self._para_jornal(lote)
+            return
+        try:
+            recusados = self._publicar(lote)
+        except (NoCredentialsError, PartialCredentialsError):
+            if self._com_jornal:
+                self._para_jornal(lote)
+            else:
+                self._simular(lote)
+            return
+        except Exception as e:
+            print(f"❌ Erro AWS: {e}")
+            self._para_jornal(lote)
+            return
+        enviados = [item for i, item in enumerate(lote) if i not in recusados]
+        self.contadores['enviados'] += len(enviados)
+        if self._com_jornal:
+            self.jornal.atualizar(self.topico_arn, [uid for _, _, uid in enviados], 'enviado')
+        if recusados:
+            self._para_jornal([lote[i] for i in sorted(recusados)])
+
+    def _executar(self):
+        while not (self._parar.is_set() and self._fila.empty()):
+            self._fechar_janelas()
+            try:
+                lote = [self._fila.get(timeout=min(1.0, self.janela_s))]
+            except queue.Empty:
+                continue
+            while len(lote) < self.limitador.lote_maximo:
+                try:
+                    lote.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            self.limitador.aguardar(len(lote))
+            try:
+                self._despachar(lote)
+            except Exception as e:
+                self.contadores['falhas'] += len(lote)
+                print(f"❌ Erro ao despachar alertas: {e}")
+            finally:
+                for _ in lote:
+                    self._fila.task_done()
+
+    # --- Ciclo de vida ---
+    def iniciar(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._parar.clear()
+            self._thread = threading.Thread(target=self._executar, name="despachante-alertas",
+                                            daemon=True)
+            self._thread.start()
+
+    def parar(self, timeout=10.0):
+        """Envia o que ainda está na fila e encerra a thread."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def estatisticas(self):
+        with self._lock:
+            info = dict(self.contadores)
+        info['na_fila'] = self._fila.qsize()
+        return info
+
+# --- JORNAL LOCAL DE ALERTAS ---
+# Mudança de estado de alertas já registrados (identificados pelo uid)
+_Atualizacao = collections.namedtuple('_Atualizacao', 'estado uids')
+
+class JornalAlertas:
+    """
+    Jornal local (SQLite) onde todo alerta é registrado com um número de sequência.
+    Estados: 'pendente' (aguardando envio), 'na_fila' (na fila em memória do
+    despachante), 'enviado', 'falhou' (recusado de vez pelo SNS), 'simulado'
+    (sem tópico configurado) e 'coalescido' (agrupado num resumo do despachante).
+    Ao abrir o jornal, alertas 'na_fila' de um processo que caiu voltam a 'pendente'.
+
+    - registrar() só coloca o alerta numa fila em memória e retorna: uma thread
+      escritora grava em lotes (group commit), uma transação por lote, então
+      rajadas de milhares de alertas por segundo não atrasam quem gerou o alerta.
+    - Uma thread de reenvio esvazia os pendentes de cada tópico em ordem de
+      sequência, em lotes do publish_batch, com backoff enquanto não há conexão.
+      Em tópicos FIFO a sequência vira o MessageDeduplicationId, então um lote
+      repetido depois de uma queda não duplica mensagens.
+    """
+
+    def __init__(self, caminho=JORNAL_PATH, cliente=None, tamanho_lote=1000, reenviar=True,
+                 taxa_por_s=5.0, rajada=10, backoff_base_s=2.0, backoff_max_s=300.0):
+        self.caminho = caminho
+        self.tamanho_lote = tamanho_lote
+        self.limitador = LimitadorTaxa(taxa_por_s, rajada)
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self._cliente = cliente
+        self._entrada = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._acordar = threading.Event()
+        self._parar = threading.Event()
+        self.contadores = {'registrados': 0, 'gravados': 0, 'reenviados': 0, 'falhas': 0}
+        self.ultimo_erro = None
+
+        conn = self._conectar()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS alertas (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                topico TEXT,
+                assunto TEXT,
+                mensagem TEXT NOT NULL,
+                criado_em REAL NOT NULL,
+                estado TEXT NOT NULL DEFAULT 'pendente',
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                enviado_em REAL,
+                uid TEXT
+            )""")
+        colunas = [linha[1] for linha in conn.execute("PRAGMA table_info(alertas)")]
+        if 'uid' not in colunas:
+            conn.execute("ALTER TABLE alertas ADD COLUMN uid TEXT")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alertas_pendentes ON alertas (estado, topico, seq)")
+        conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_alertas_uid ON alertas (uid)")
+        # Sobras de um processo que caiu com alertas na fila em memória
+        conn.execute("UPDATE alertas SET estado = 'pendente' WHERE estado = 'na_fila'")
+        conn.commit()
+        # Pendentes por tópico (inclui os que ainda estão na fila de gravação)
+        self._pendentes = dict(conn.execute(
+            "SELECT topico, COUNT(*) FROM alertas WHERE estado = 'pendente' GROUP BY topico").fetchall())
+        self._na_fila = {}
+        conn.close()
+
+        self._escritor = threading.Thread(target=self._escrever, name="jornal-escritor", daemon=True)
+        self._reenvio = threading.Thread(target=self._reenviar, name="jornal-reenvio", daemon=True)
+        self._escritor.start()
+        if reenviar:
+            self._reenvio.start()
+
+    def _conectar(self):
+        conn = sqlite3.connect(self.caminho, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # FULL: o commit só retorna depois do fsync (sobrevive a queda de energia);
+        # o custo é diluído pelo group commit
+        conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    @property
+    def cliente(self):
+        if self._cliente is None:
+            self._cliente = obter_cliente_sns()
+        return self._cliente
+
+    # --- Escrita ---
+    def registrar(self, topico, assunto, mensagem, estado='pendente', uid=None):
+        """
+        Agenda a gravação do alerta (não bloqueia).
+        uid: identificador para mudar o estado depois com atualizar().
+        """
+        if estado in ('pendente', 'na_fila'):
+            contagem = self._pendentes if estado == 'pendente' else self._na_fila
+            with self._lock:
+                contagem[topico] = contagem.get(topico, 0) + 1
+        self.contadores['registrados'] += 1
+        self._entrada.put((topico, assunto, mensagem, time.time(), estado, uid))
+
+    def atualizar(self, topico, uids, estado):
+        """Agenda a troca de estado de alertas registrados como 'na_fila' (não bloqueia)."""
+        if not uids:
+            return
+        with self._lock:
+            self._na_fila[topico] = max(0, self._na_fila.get(topico, 0) - len(uids))
+            if estado == 'pendente':
+                self._pendentes[topico] = self._pendentes.get(topico, 0) + len(uids)
+        self._entrada.put(_Atualizacao(estado, list(uids)))
+
+    def aguardar_gravacao(self, timeout=None):
+        """Espera até tudo o que foi registrado antes desta chamada estar no disco."""
+        marcador = threading.Event()
+        self._entrada.put(marcador)
+        return marcador.wait(timeout)
+
+    def _escrever(self):
+        conn = self._conectar()
+        while True:
+            lote = [self._entrada.get()]
+            while len(lote) < self.tamanho_lote:
+                try:
+                    lote.append(self._entrada.get_nowait())
+                except queue.Empty:
+                    break
+            linhas = [item for item in lote
+                      if isinstance(item, tuple) and not isinstance(item, _Atualizacao)]
+            atualizacoes = [item for item in lote if isinstance(item, _Atualizacao)]
+            try:
+                with conn:
+                    # Inserções antes das atualizações: um uid sempre entra na fila antes
+                    # da sua troca de estado, então o lote mantém essa ordem
+                    conn.executemany(
+                        "INSERT INTO alertas (topico, assunto, mensagem, criado_em, estado, uid) "
+                        "VALUES (?, ?, ?, ?, ?, ?)", linhas)
+                    for estado, uids in atualizacoes:
+                        conn.executemany(
+                            "UPDATE alertas SET estado = ?, enviado_em = CASE WHEN ? = 'enviado' "
+                            "THEN ? ELSE enviado_em END WHERE uid = ?",
+                            [(estado, estado, time.time(), uid) for uid in uids])
+                self.contadores['gravados'] += len(linhas)
+            except sqlite3.Error as e:
+                self.contadores['falhas'] += len(linhas)
+                self.ultimo_erro = str(e)
+                print(f"⚠️ Erro ao gravar jornal de alertas: {e}")
+            for item in lote:
+                if isinstance(item, threading.Event):
+                    item.set()
+            if any(item is None for item in lote):
+                break
+            if (any(linha[4] == 'pendente' for linha in linhas)
+                    or any(item.estado == 'pendente' for item in atualizacoes)):
+                self._acordar.set()
+        conn.close()
+
+    # --- Reenvio ---
+    def tem_pendentes(self, topico, incluir_fila=False):
+        """incluir_fila=True também conta os alertas ainda na fila do despachante."""
+        with self._lock:
+            total = self._pendentes.get(topico, 0)
+            if incluir_fila:
+                total += self._na_fila.get(topico, 0)
+            return total > 0
+
+    def acordar(self):
+        self._acordar.set()
+
+    def _publicar(self, topico, lote):
+        """Publica (seq, assunto, mensagem) e devolve {seq: sender_fault} dos recusados."""
+        fifo = topico.endswith('.fifo')
+        entradas = []
+        for seq, assunto, mensagem in lote:
+            entrada = {'Id': str(seq), 'Message': mensagem, 'Subject': assunto}
+            if fifo:
+                entrada['MessageGroupId'] = 'farmtech'
+                entrada['MessageDeduplicationId'] = str(seq)
+            entradas.append(entrada)
+        resposta = self.cliente.publish_batch(TopicArn=topico, PublishBatchRequestEntries=entradas)
+        return {int(f['Id']): f.get('SenderFault', False) for f in resposta.get('Failed', [])}
+
+    def reenviar_pendentes(self, conn):
+        """
+        Uma rodada de reenvio (todos os tópicos). Retorna quantos alertas saíram.
+        Erros de conexão/credenciais sobem para quem chamou.
+        """
+        total = 0
+        topicos = [t for (t,) in conn.execute(
+            "SELECT DISTINCT topico FROM alertas WHERE estado = 'pendente'").fetchall()]
+        for topico in topicos:
+            while not self._parar.is_set():
+                # Não passa na frente de alertas mais antigos ainda na fila do despachante:
+                # ele os devolve como pendentes ao ver que o tópico tem atraso
+                lote = conn.execute(
+                    "SELECT seq, assunto, mensagem FROM alertas WHERE estado = 'pendente' AND topico = ? "
+                    "AND seq < COALESCE((SELECT MIN(seq) FROM alertas WHERE estado = 'na_fila' "
+                    "AND topico = ?), 9223372036854775807) "
+                    "ORDER BY seq LIMIT ?", (topico, topico, self.limitador.lote_maximo)).fetchall()
+                if not lote:
+                    break
+                self.limitador.aguardar(len(lote))
+                recusados = self._publicar(topico, lote)
+                agora = time.time()
+                with conn:
+                    conn.executemany(
+                        "UPDATE alertas SET estado = 'enviado', enviado_em = ? WHERE seq = ?",
+                        [(agora, seq) for seq, _, _ in lote if seq not in recusados])
+                    conn.executemany(
+                        "UPDATE alertas SET estado = CASE WHEN ? THEN 'falhou' ELSE estado END, "
+                        "tentativas = tentativas + 1 WHERE seq = ?",
+                        [(fault, seq) for seq, fault in recusados.items()])
+                resolvidos = len(lote) - sum(1 for fault in recusados.values() if not fault)
+                enviados = len(lote) - len(recusados)
+                with self._lock:
+                    self._pendentes[topico] = max(0, self._pendentes.get(topico, 0) - resolvidos)
+                self.contadores['reenviados'] += enviados
+                total += enviados
+                if any(not fault for fault in recusados.values()):
+                    # Falha temporária: para este tópico aqui para manter a ordem
+                    raise RuntimeError(f"SNS recusou {len(recusados)} alerta(s) de {topico}")
+        return total
+
+    def _reenviar(self):
+        conn = self._conectar()
+        falhas_seguidas = 0
+        while not self._parar.is_set():
+            try:
+                self.reenviar_pendentes(conn)
+                falhas_seguidas = 0
+                espera = None
+            except Exception as e:
+                falhas_seguidas += 1
+                self.ultimo_erro = str(e)
+                espera = min(self.backoff_max_s, self.backoff_base_s * 2 ** (falhas_seguidas - 1))
+            self._acordar.wait(espera)
+            self._acordar.clear()
+        conn.close()
+
+    # --- Ciclo de vida ---
+    def fechar(self, timeout=10.0):
+        """Grava o que falta e encerra as threads."""
+        self._entrada.put(None)
+        self._escritor.join(timeout)
+        self._parar.set()
+        self._acordar.set()
+        if self._reenvio.is_alive():
+            self._reenvio.join(timeout)
+
+    def estatisticas(self):
+        info = dict(self.contadores)
+        with self._lock:
+            info['pendentes'] = sum(self._pendentes.values())
+        info['ultimo_erro'] = self.ultimo_erro
+        return info
+
+_JORNAL = None
+_DESPACHANTE = None
+_LOCK_DESPACHANTE = threading.Lock()
+
+def obter_jornal():
+    """Jornal único do processo (criado na primeira chamada)."""
+    global _JORNAL
+    with _LOCK_DESPACHANTE:
+        if _JORNAL is None:
+            _JORNAL = JornalAlertas()
+        return _JORNAL
+
+def obter_despachante(**config):
+    """Despachante único do processo (criado na primeira chamada), ligado ao jornal."""
+    global _DESPACHANTE
+    if 'jornal' not in config:
+        config['jornal'] = obter_jornal()
+    with _LOCK_DESPACHANTE:
+        if _DESPACHANTE is None:
+            _DESPACHANTE = DespachanteAlertas(**config)
+        return _DESPACHANTE
+
+def enfileirar_alerta(assunto, mensagem, chave=None):
+    """Versão não bloqueante de enviar_alerta_aws (retorna uma mensagem para o log)."""
+    resultado = obter_despachante().enfileirar(assunto, mensagem, chave)
+    if resultado == "enfileirado":
+        return f"📨 Alerta enfileirado para envio: {assunto} - {mensagem}"
+    if resultado == "coalescido":
+        return f"🔁 Alerta repetido de {chave} agrupado (janela de {_DESPACHANTE.janela_s:.0f}s)."
+    if resultado == "no_jornal":
+        return f"📒 Fila de alertas cheia: alerta guardado no jornal para reenvio: {assunto}"
+    return "⚠️ Fila de alertas cheia: alerta descartado."
+
+def benchmark_jornal(n_alertas=20000):
+    """Rajada de alertas no jornal (banco temporário): custo por registro e vazão de gravação."""
+    # Só a escrita interessa aqui: sem thread de reenvio
+    jornal = JornalAlertas(os.path.join(tempfile.mkdtemp(), "benchmark_jornal.db"), reenviar=False)
+    inicio = time.perf_counter()
+    for i in range(n_alertas):
+        jornal.registrar("arn:aws:sns:us-east-1:000000000000:benchmark", "Alerta Crítico", f"Alerta {i}")
+    tempo_registro = time.perf_counter() - inicio
+    jornal.aguardar_gravacao()
+    tempo_total = time.perf_counter() - inicio
+    jornal.fechar()
+    return {
+        'alertas': n_alertas,
+        'registro_us': tempo_registro / n_alertas * 1e6,
+        'gravados_por_s': n_alertas / tempo_total,
+    }
+
+if __name__ == "__main__":
+    print("\n📒 --- BENCHMARK JORNAL DE ALERTAS --- 📒")
+    rel = benchmark_jornal()
+    print(f"   Alertas: {rel['alertas']}")
+    print(f"   Custo por registro (thread do chamador): {rel['registro_us']:.1f} µs")
+    print(f"   Vazão de gravação em disco: {rel['gravados_por_s']:,.0f} alertas/s\n")
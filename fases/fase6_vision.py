@@ -1,5 +1,13 @@
 import os
 import sys
+import csv
+import glob
+import json
+import time
+import itertools
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 
 # Tenta importar o YOLO.
 try:
@@ -9,40 +17,69 @@ except ImportError:
     YOLO_AVAILABLE = False
     print("⚠️ AVISO: Biblioteca 'ultralytics' não encontrada. Instalando modo de simulação.")
 
+# OpenCV para leitura de vídeo (já vem como dependência do ultralytics)
+try:
+    import cv2
+    CV2_AVAILABLE = True
+except ImportError:
+    CV2_AVAILABLE = False
+
+# Leitura por janelas de GeoTIFF (opcional, só para o modo tiles)
+try:
+    import rasterio
+    RASTERIO_AVAILABLE = True
+except ImportError:
+    RASTERIO_AVAILABLE = False
+
 # --- CONFIGURAÇÕES ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, '..', 'assets', 'best.pt')
+ASSETS_DIR = os.path.join(BASE_DIR, '..', 'assets')
+TAMANHO_ENTRADA = 640  # lado do quadrado de entrada do YOLO (letterbox)
+TAMANHO_TILE = 1024    # modo tiles (imagens aéreas grandes)
+SOBREPOSICAO_TILE = 128
+LIMIAR_NMS = 0.5
+LIMIAR_MUDANCA = 4.0   # modo vídeo: diferença média de pixel (0-255) para reanalisar o quadro
+TOLERANCIA_SAIDA_S = 1.0
+CONF_PADRAO = 0.25
+EXTENSOES_IMAGEM = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+AVISO_SIMULACAO = "⚠️ Modo Simulação (Modelo não carregado)"
+
+# --- ADAPTAÇÃO PARA AGRICULTURA (TRADUÇÃO DE CLASSES) ---
+# O modelo COCO detecta 'person', 'truck', 'car'.
+# Vamos traduzir isso para o contexto da fazenda.
+NOVOS_NOMES = {
+    0: 'Agricultor / Pessoa',      # ID 0 = person
+    2: 'Veículo / Trator',         # ID 2 = car
+    7: 'Maquinário Pesado',        # ID 7 = truck
+    5: 'Maquinário / Ônibus',      # ID 5 = bus
+    1: 'Bicicleta / Moto',         # ID 1 = bicycle
+
+    # Mantemos os animais caso apareçam (segurança contra invasão)
+    16: 'Animal (Cachorro)',
+    17: 'Animal (Gato)',
+    21: 'Animal Silvestre (Urso)',
+    22: 'Animal Silvestre'
+}
+
+# --- REGISTRO DE MODELOS (CACHE POR PROCESSO) ---
+# Chave: caminho absoluto do .pt -> (mtime do arquivo, modelo carregado).
+# Compartilhado pelo Streamlit e por qualquer chamada em lote no mesmo processo.
+_REGISTRO_MODELOS = {}
+_LOCK_REGISTRO = threading.Lock()
 
-def carregar_modelo():
-    """Tenta carregar o modelo YOLO."""
+def carregar_modelo(caminho_modelo=MODEL_PATH):
+    """Tenta carregar o modelo YOLO do disco (sem cache)."""
     if not YOLO_AVAILABLE:
         return None
     
-    if os.path.exists(MODEL_PATH):
+    if os.path.exists(caminho_modelo):
         try:
             # Carrega o modelo
-            model = YOLO(MODEL_PATH)
-            
-            # --- ADAPTAÇÃO PARA AGRICULTURA (TRADUÇÃO DE CLASSES) ---
-            # O modelo COCO detecta 'person', 'truck', 'car'.
-            # Vamos traduzir isso para o contexto da fazenda.
-            
-            novos_nomes = {
-                0: 'Agricultor / Pessoa',      # ID 0 = person
-                2: 'Veículo / Trator',         # ID 2 = car
-                7: 'Maquinário Pesado',        # ID 7 = truck
-                5: 'Maquinário / Ônibus',      # ID 5 = bus
-                1: 'Bicicleta / Moto',         # ID 1 = bicycle
-                
-                # Mantemos os animais caso apareçam (segurança contra invasão)
-                16: 'Animal (Cachorro)',
-                17: 'Animal (Gato)',
-                21: 'Animal Silvestre (Urso)', 
-                22: 'Animal Silvestre'
-            }
+            model = YOLO(caminho_modelo)
             
             # Atualiza os nomes no modelo
-            for id_classe, novo_nome in novos_nomes.items():
+            for id_classe, novo_nome in NOVOS_NOMES.items():
                 if id_classe in model.names:
                     model.names[id_classe] = novo_nome
                     
@@ -52,38 +89,94 @@ def carregar_modelo():
             return None
     return None
 
-def processar_imagem(caminho_imagem_ou_pil):
+def _aquecer_modelo(model):
+    """Roda uma inferência falsa para alocar memória e compilar o grafo antes do 1º uso real."""
+    import numpy as np
+    try:
+        model(np.zeros((64, 64, 3), dtype=np.uint8), verbose=False)
+    except Exception as e:
+        print(f"Aviso: aquecimento do modelo falhou: {e}")
+
+def obter_modelo(caminho_modelo=MODEL_PATH):
+    """
+    Retorna o modelo YOLO do registro do processo.
+    Carrega só na primeira chamada e recarrega se o arquivo .pt mudar (mtime).
+    """
+    if not YOLO_AVAILABLE:
+        return None
+
+    caminho = os.path.abspath(caminho_modelo)
+    try:
+        mtime = os.path.getmtime(caminho)
+    except OSError:
+        return None
+
+    with _LOCK_REGISTRO:
+        entrada = _REGISTRO_MODELOS.get(caminho)
+        if entrada and entrada[0] == mtime:
+            return entrada[1]
+
+        model = carregar_modelo(caminho)
+        if model is None:
+            return None
+        _aquecer_modelo(model)
+        _REGISTRO_MODELOS[caminho] = (mtime, model)
+        return model
+
+def limpar_cache_modelos():
+    """Esvazia o registro (força recarga na próxima varredura)."""
+    with _LOCK_REGISTRO:
+        _REGISTRO_MODELOS.clear()
+
+def _contar_classes(resultado, nomes):
+    """Conta as detecções de um resultado YOLO por nome de classe (já traduzido)."""
+    contagem = {}
+    for box in resultado.boxes:
+        cls_id = int(box.cls[0])
+        nome_classe = nomes[cls_id]
+        contagem[nome_classe] = contagem.get(nome_classe, 0) + 1
+    return contagem
+
+def _montar_mensagem(contagem):
+    """Gera o relatório de texto a partir da contagem por classe."""
+    if contagem:
+        resumo = ", ".join([f"{qtd}x {nome}" for nome, qtd in contagem.items()])
+        # Mensagem focada em monitoramento
+        return f"📍 Monitoramento: {resumo} identificado(s) na área."
+    return "✅ Área limpa. Nenhum agricultor ou maquinário detectado."
+
+def processar_imagem(caminho_imagem_ou_pil, modo_tiles=False,
+                     tamanho_tile=TAMANHO_TILE, sobreposicao=SOBREPOSICAO_TILE):
     """
     Processa a imagem focando em SEGURANÇA e ATIVOS.
+    modo_tiles=True: para ortomosaicos grandes (drone). A imagem é lida em janelas
+    sobrepostas, sem decodificar o arquivo inteiro; ver processar_em_tiles.
+    A imagem devolvida tem a mesma ordem de canais nos dois modos: BGR com o YOLO
+    (como results[0].plot()) e RGB na simulação.
     """
-    model = carregar_modelo()
+    if modo_tiles:
+        relatorio = processar_em_tiles(caminho_imagem_ou_pil, tamanho_tile, sobreposicao)
+        previa = relatorio['previa']
+        if obter_modelo():
+            # A prévia dos tiles é desenhada em RGB; converte para o BGR do plot()
+            import numpy as np
+            previa = np.ascontiguousarray(previa[..., ::-1])
+        return previa, relatorio['mensagem']
+
+    model = obter_modelo()
     
     # --- CENÁRIO 1: YOLO Funcionando ---
     if model:
         try:
             # Confiança de 0.25 (padrão) para evitar falsos positivos malucos
-            results = model(caminho_imagem_ou_pil, conf=0.25)
+            results = model(caminho_imagem_ou_pil, conf=CONF_PADRAO)
             
             # Desenha as caixas com os nomes traduzidos
             img_resultado_array = results[0].plot() 
             
             # Gera o relatório de texto
-            contagem = {}
-            detectou_algo = False
-            
-            for box in results[0].boxes:
-                detectou_algo = True
-                cls_id = int(box.cls[0])
-                nome_classe = model.names[cls_id]
-                
-                contagem[nome_classe] = contagem.get(nome_classe, 0) + 1
-            
-            if detectou_algo:
-                resumo = ", ".join([f"{qtd}x {nome}" for nome, qtd in contagem.items()])
-                # Mensagem focada em monitoramento
-                msg = f"📍 Monitoramento: {resumo} identificado(s) na área."
-            else:
-                msg = "✅ Área limpa. Nenhum agricultor ou maquinário detectado."
+            contagem = _contar_classes(results[0], model.names)
+            msg = _montar_mensagem(contagem)
                 
             return img_resultado_array, msg
             
@@ -103,5 +196,662 @@ def processar_imagem(caminho_imagem_ou_pil):
          except:
              return None, "Erro ao abrir imagem."
 
-    aviso = "⚠️ Modo Simulação (Modelo não carregado)"
-    return img_resultado_array, aviso
\ No newline at end of file
+    return img_resultado_array, AVISO_SIMULACAO
+
+# --- PROCESSAMENTO EM LOTE (PASTA / GLOB / ITERADOR) ---
+
+def _listar_imagens(origem):
+    """
+    Normaliza a origem do lote em um iterador de imagens.
+    origem: pasta, padrão glob ('fotos/*.jpg'), caminho único ou iterável de caminhos/PIL.
+    """
+    if isinstance(origem, str):
+        if os.path.isdir(origem):
+            nomes = sorted(os.listdir(origem))
+            return (os.path.join(origem, n) for n in nomes
+                    if os.path.splitext(n)[1].lower() in EXTENSOES_IMAGEM)
+        if glob.has_magic(origem):
+            return iter(sorted(glob.glob(origem)))
+        return iter([origem])
+    return iter(origem)
+
+def _nome_imagem(imagem, indice):
+    """Identificador legível da imagem no relatório."""
+    if isinstance(imagem, str):
+        return imagem
+    return getattr(imagem, 'filename', None) or f"imagem_{indice}"
+
+def _extrair_caixas(resultado, nomes, preparada=None):
+    """
+    Converte as caixas do YOLO em dicionários simples (xyxy em pixels).
+    Se a imagem veio do pipeline (letterbox), devolve as coordenadas na imagem original.
+    """
+    caixas = []
+    for box in resultado.boxes:
+        cls_id = int(box.cls[0])
+        x1, y1, x2, y2 = [float(v) for v in box.xyxy[0].tolist()]
+        if preparada:
+            escala = preparada['escala']
+            pad_x, pad_y = preparada['pad']
+            x1, x2 = (x1 - pad_x) / escala, (x2 - pad_x) / escala
+            y1, y2 = (y1 - pad_y) / escala, (y2 - pad_y) / escala
+        caixas.append({
+            'classe': nomes[cls_id],
+            'confianca': float(box.conf[0]),
+            'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2
+        })
+    return caixas
+
+def _salvar_anotada(resultado, pasta_saida, nome):
+    """Salva a imagem com as caixas desenhadas (plot() devolve BGR)."""
+    from PIL import Image
+    os.makedirs(pasta_saida, exist_ok=True)
+    base = os.path.splitext(os.path.basename(str(nome)))[0]
+    destino = os.path.join(pasta_saida, f"{base}_anotada.jpg")
+    Image.fromarray(resultado.plot()[..., ::-1]).save(destino)
+    return destino
+
+def _abrir_resumo(arquivo_resumo):
+    """Abre o resumo em CSV ou JSONL (decidido pela extensão) e devolve uma função de escrita."""
+    f = open(arquivo_resumo, 'w', newline='', encoding='utf-8')
+    if arquivo_resumo.lower().endswith('.csv'):
+        writer = csv.writer(f)
+        writer.writerow(['arquivo', 'total_deteccoes', 'contagem', 'tempo_ms', 'mensagem'])
+
+        def escrever(item):
+            writer.writerow([item['arquivo'], sum(item['contagem'].values()),
+                             json.dumps(item['contagem'], ensure_ascii=False),
+                             f"{item['tempo_ms']:.1f}", item['mensagem']])
+    else:
+        def escrever(item):
+            registro = {k: v for k, v in item.items() if k != 'arquivo_anotado' or v}
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+    return f, escrever
+
+def processar_lote(origem, tamanho_lote=8, conf=CONF_PADRAO,
+                   pasta_saida=None, arquivo_resumo=None, num_workers=0):
+    """
+    Processa várias imagens em mini-lotes e devolve os resultados um a um (gerador).
+    origem: pasta, padrão glob, ou iterável de caminhos / imagens PIL.
+    pasta_saida: se informado, salva as imagens anotadas.
+    arquivo_resumo: se informado, grava um resumo .csv ou .jsonl.
+    num_workers: se > 0, decodifica/redimensiona as imagens em paralelo
+                 (pipeline_preprocessamento) enquanto o modelo trabalha.
+    Cada item: {'arquivo', 'contagem', 'caixas', 'tempo_ms', 'mensagem', 'arquivo_anotado'}.
+    """
+    model = obter_modelo()
+    if num_workers and model:
+        imagens = pipeline_preprocessamento(origem, num_workers=num_workers)
+    else:
+        imagens = _listar_imagens(origem)
+    tamanho_lote = max(1, int(tamanho_lote))
+
+    arquivo, escrever = (None, None)
+    if arquivo_resumo:
+        arquivo, escrever = _abrir_resumo(arquivo_resumo)
+
+    try:
+        indice = 0
+        while True:
+            lote = list(itertools.islice(imagens, tamanho_lote))
+            if not lote:
+                break
+
+            # Itens vindos do pipeline já chegam decodificados (letterbox)
+            preparados = [img if isinstance(img, dict) else None for img in lote]
+            entradas = [_entrada_modelo(p) if p else img for p, img in zip(preparados, lote)]
+
+            # Só vão ao modelo as imagens que abriram; uma imagem ruim não derruba o lote
+            validos = [pos for pos, e in enumerate(entradas) if e is not None]
+            resultados = [None] * len(lote)
+            erros = [None] * len(lote)
+            tempos = [0.0] * len(lote)
+            if model and validos:
+                inicio = time.perf_counter()
+                try:
+                    saida = model([entradas[pos] for pos in validos], conf=conf, verbose=False)
+                    # Tempo do lote rateado por imagem
+                    tempo_ms = (time.perf_counter() - inicio) * 1000 / len(validos)
+                    for pos, resultado in zip(validos, saida):
+                        resultados[pos] = resultado
+                        tempos[pos] = tempo_ms
+                except Exception as e:
+                    print(f"Erro na inferência YOLO (lote): {e} — repetindo imagem a imagem.")
+                    for pos in validos:
+                        inicio = time.perf_counter()
+                        try:
+                            resultados[pos] = model([entradas[pos]], conf=conf, verbose=False)[0]
+                        except Exception as e_img:
+                            erros[pos] = f"Erro na inferência: {e_img}"
+                        tempos[pos] = (time.perf_counter() - inicio) * 1000
+
+            for pos, imagem in enumerate(lote):
+                prep = preparados[pos]
+                nome = prep['arquivo'] if prep else _nome_imagem(imagem, indice)
+                indice += 1
+                if (prep and prep['erro']) or (model and entradas[pos] is None):
+                    item = {
+                        'arquivo': nome,
+                        'contagem': {},
+                        'caixas': [],
+                        'tempo_ms': 0.0,
+                        'mensagem': "Erro ao abrir imagem.",
+                        'arquivo_anotado': None
+                    }
+                elif resultados[pos] is not None:
+                    resultado = resultados[pos]
+                    contagem = _contar_classes(resultado, model.names)
+                    item = {
+                        'arquivo': nome,
+                        'contagem': contagem,
+                        'caixas': _extrair_caixas(resultado, model.names, prep),
+                        'tempo_ms': tempos[pos],
+                        'mensagem': _montar_mensagem(contagem),
+                        'arquivo_anotado': None
+                    }
+                    if pasta_saida:
+                        item['arquivo_anotado'] = _salvar_anotada(resultado, pasta_saida, nome)
+                else:
+                    item = {
+                        'arquivo': nome,
+                        'contagem': {},
+                        'caixas': [],
+                        'tempo_ms': tempos[pos],
+                        'mensagem': erros[pos] or AVISO_SIMULACAO,
+                        'arquivo_anotado': None
+                    }
+
+                if escrever:
+                    escrever(item)
+                yield item
+    finally:
+        if arquivo:
+            arquivo.close()
+
+# --- MODO TILES (ORTOMOSAICOS DE DRONE) ---
+_LOCK_PIL = threading.Lock()
+
+def _abrir_imagem_grande(caminho):
+    """
+    Abre com PIL sem o limite anti "decompression bomb" (ortomosaicos passam dele),
+    só nesta chamada: o valor global é restaurado logo depois, então os demais
+    Image.open do processo (ex.: uploads do Streamlit) continuam protegidos.
+    """
+    from PIL import Image
+    with _LOCK_PIL:
+        limite = Image.MAX_IMAGE_PIXELS
+        Image.MAX_IMAGE_PIXELS = None
+        try:
+            return Image.open(caminho)
+        finally:
+            Image.MAX_IMAGE_PIXELS = limite
+
+class LeitorJanelado:
+    """
+    Lê regiões (janelas) de imagens muito grandes sem decodificar o arquivo inteiro.
+    - GeoTIFF/TIFF: usa rasterio (leitura por janela) quando instalado.
+    - .npy: memória mapeada (np.load com mmap_mode='r').
+    - Demais formatos: PIL. Atenção: PIL decodifica JPEG/PNG (e TIFF, sem
+      rasterio) por completo no primeiro recorte, então para arquivos gigantes
+      prefira GeoTIFF com rasterio instalado ou .npy. O motivo fica em `aviso`.
+    """
+
+    def __init__(self, origem):
+        self._raster = None
+        self._array = None
+        self._pil = None
+        self._caminho = None
+        self.aviso = None
+
+        if hasattr(origem, 'convert'):
+            self._pil = origem
+        elif str(origem).lower().endswith('.npy'):
+            import numpy as np
+            self._array = np.load(origem, mmap_mode='r')
+        elif RASTERIO_AVAILABLE and str(origem).lower().endswith(('.tif', '.tiff')):
+            self._raster = rasterio.open(origem)
+        else:
+            if str(origem).lower().endswith(('.tif', '.tiff')):
+                self.aviso = ("rasterio não instalado: o TIFF será lido pelo PIL e decodificado "
+                              "inteiro na memória (pip install rasterio para leitura por janelas).")
+                print(f"⚠️ {self.aviso}")
+            self._caminho = origem
+            self._pil = _abrir_imagem_grande(origem)
+
+    @property
+    def tamanho(self):
+        """(largura, altura) em pixels."""
+        if self._raster is not None:
+            return self._raster.width, self._raster.height
+        if self._array is not None:
+            return self._array.shape[1], self._array.shape[0]
+        return self._pil.size
+
+    def ler_janela(self, x, y, largura, altura):
+        """Retorna a janela como array RGB uint8 (altura, largura, 3)."""
+        import numpy as np
+        if self._raster is not None:
+            from rasterio.windows import Window
+            bandas = min(3, self._raster.count)
+            dados = self._raster.read(list(range(1, bandas + 1)),
+                                      window=Window(x, y, largura, altura))
+            janela = np.moveaxis(dados, 0, -1)
+        elif self._array is not None:
+            janela = np.asarray(self._array[y:y + altura, x:x + largura])
+        else:
+            janela = np.asarray(self._pil.crop((x, y, x + largura, y + altura)).convert('RGB'))
+        return _para_rgb(janela)
+
+    def miniatura(self, lado_max=1600):
+        """Prévia reduzida da imagem inteira (para exibir no dashboard)."""
+        import numpy as np
+        largura, altura = self.tamanho
+        escala = min(1.0, lado_max / max(largura, altura))
+        nova = (max(1, int(largura * escala)), max(1, int(altura * escala)))
+        if self._raster is not None:
+            bandas = min(3, self._raster.count)
+            dados = self._raster.read(list(range(1, bandas + 1)), out_shape=(bandas, nova[1], nova[0]))
+            return _para_rgb(np.moveaxis(dados, 0, -1)), escala
+        if self._array is not None:
+            passo = max(1, int(round(1 / escala)))
+            return _para_rgb(np.asarray(self._array[::passo, ::passo])), 1 / passo
+        from PIL import Image
+        if self._caminho is not None and self._pil.format == 'JPEG':
+            # Abertura nova com draft: o decodificador JPEG já entrega 1/2..1/8 do
+            # tamanho, sem decodificar (nem mexer) a imagem usada pelos recortes
+            img = _abrir_imagem_grande(self._caminho)
+            img.draft('RGB', nova)
+        else:
+            img = self._pil
+        # resize com reducing_gap reduz por blocos direto para o tamanho final,
+        # sem criar outra cópia em resolução cheia (ao contrário de copy + thumbnail)
+        paleta = img.mode in ('P', '1') or img.mode.startswith('I;')
+        reduzida = img.resize(nova, Image.NEAREST if paleta else Image.BILINEAR, reducing_gap=2.0)
+        return np.asarray(reduzida.convert('RGB')), nova[0] / largura
+
+    def fechar(self):
+        if self._raster is not None:
+            self._raster.close()
+
+def _para_rgb(janela):
+    """Garante 3 canais uint8 (cinza -> RGB, descarta alfa)."""
+    import numpy as np
+    if janela.ndim == 2:
+        janela = np.stack([janela] * 3, axis=-1)
+    elif janela.shape[2] == 1:
+        janela = np.repeat(janela, 3, axis=2)
+    if janela.dtype != np.uint8:
+        janela = np.clip(janela, 0, 255).astype(np.uint8)
+    return np.ascontiguousarray(janela[..., :3])
+
+def gerar_tiles(largura, altura, tamanho_tile=TAMANHO_TILE, sobreposicao=SOBREPOSICAO_TILE):
+    """
+    Gera as janelas (x, y, w, h) que cobrem a imagem com sobreposição.
+    O último tile de cada linha/coluna é alinhado à borda para não sobrar faixa sem análise.
+    """
+    passo = max(1, tamanho_tile - sobreposicao)
+
+    def posicoes(total):
+        if total <= tamanho_tile:
+            return [0]
+        pos = list(range(0, total - tamanho_tile, passo))
+        pos.append(total - tamanho_tile)
+        return pos
+
+    for y in posicoes(altura):
+        for x in posicoes(largura):
+            yield x, y, min(tamanho_tile, largura - x), min(tamanho_tile, altura - y)
+
+def _nms(caixas, scores, limiar=LIMIAR_NMS):
+    """
+    Non-maximum suppression guloso (NumPy).
+    Usa interseção sobre a MENOR caixa: um objeto cortado na costura de dois tiles
+    gera uma caixa parcial contida na completa, que o IoU comum não eliminaria.
+    Retorna os índices mantidos.
+    """
+    import numpy as np
+    if len(caixas) == 0:
+        return []
+    x1, y1, x2, y2 = caixas[:, 0], caixas[:, 1], caixas[:, 2], caixas[:, 3]
+    areas = np.maximum(0, x2 - x1) * np.maximum(0, y2 - y1)
+    ordem = np.argsort(-scores)
+    manter = []
+    while ordem.size > 0:
+        i = ordem[0]
+        manter.append(int(i))
+        resto = ordem[1:]
+        larg = np.maximum(0, np.minimum(x2[i], x2[resto]) - np.maximum(x1[i], x1[resto]))
+        alt = np.maximum(0, np.minimum(y2[i], y2[resto]) - np.maximum(y1[i], y1[resto]))
+        inter = larg * alt
+        menor = np.maximum(np.minimum(areas[i], areas[resto]), 1e-9)
+        ordem = resto[inter / menor <= limiar]
+    return manter
+
+def _mesclar_deteccoes(caixas, limiar=LIMIAR_NMS):
+    """Aplica NMS separadamente por classe sobre as detecções de todos os tiles."""
+    import numpy as np
+    por_classe = {}
+    for caixa in caixas:
+        por_classe.setdefault(caixa['classe'], []).append(caixa)
+
+    finais = []
+    for lista in por_classe.values():
+        coords = np.array([[c['x1'], c['y1'], c['x2'], c['y2']] for c in lista], dtype=float)
+        scores = np.array([c['confianca'] for c in lista], dtype=float)
+        finais.extend(lista[i] for i in _nms(coords, scores, limiar))
+    return finais
+
+def _desenhar_caixas(previa, caixas, escala):
+    """Desenha as caixas finais na prévia reduzida."""
+    import numpy as np
+    from PIL import Image, ImageDraw
+    img = Image.fromarray(previa)
+    desenho = ImageDraw.Draw(img)
+    for c in caixas:
+        desenho.rectangle([c['x1'] * escala, c['y1'] * escala, c['x2'] * escala, c['y2'] * escala],
+                          outline=(255, 0, 0), width=2)
+    return np.asarray(img)
+
+def processar_em_tiles(origem, tamanho_tile=TAMANHO_TILE, sobreposicao=SOBREPOSICAO_TILE,
+                       conf=CONF_PADRAO, limiar_nms=LIMIAR_NMS):
+    """
+    Inferência por tiles para imagens aéreas enormes.
+    Cada tile é lido sob demanda (LeitorJanelado), detectado no tamanho nativo e as
+    caixas voltam para coordenadas globais; duplicatas nas costuras são removidas por NMS.
+    Retorna {'contagem', 'caixas', 'num_tiles', 'tempo_s', 'mensagem', 'previa', 'aviso'}
+    ('aviso': motivo de a leitura não ser por janelas, ou None).
+    """
+    import numpy as np
+    inicio = time.perf_counter()
+    model = obter_modelo()
+    leitor = LeitorJanelado(origem)
+    try:
+        largura, altura = leitor.tamanho
+        caixas = []
+        num_tiles = 0
+        if model:
+            for x, y, w, h in gerar_tiles(largura, altura, tamanho_tile, sobreposicao):
+                num_tiles += 1
+                tile = leitor.ler_janela(x, y, w, h)
+                try:
+                    resultado = model(np.ascontiguousarray(tile[..., ::-1]), conf=conf, imgsz=tamanho_tile, verbose=False)[0]
+                except Exception as e:
+                    print(f"Erro na inferência YOLO (tile {x},{y}): {e}")
+                    continue
+                for c in _extrair_caixas(resultado, model.names):
+                    c['x1'] += x; c['x2'] += x
+                    c['y1'] += y; c['y2'] += y
+                    caixas.append(c)
+
+        caixas = _mesclar_deteccoes(caixas, limiar_nms)
+        contagem = {}
+        for c in caixas:
+            contagem[c['classe']] = contagem.get(c['classe'], 0) + 1
+
+        previa, escala = leitor.miniatura()
+        previa = _desenhar_caixas(previa, caixas, escala)
+        aviso = leitor.aviso
+    finally:
+        leitor.fechar()
+
+    return {
+        'contagem': contagem,
+        'caixas': caixas,
+        'num_tiles': num_tiles,
+        'tempo_s': time.perf_counter() - inicio,
+        'mensagem': _montar_mensagem(contagem) if model else AVISO_SIMULACAO,
+        'previa': previa,
+        'aviso': aviso
+    }
+
+# --- MODO VÍDEO (CÂMERAS DE SEGURANÇA) ---
+
+def _assinatura_quadro(quadro):
+    """Versão reduzida em tons de cinza do quadro, usada para detectar mudança de cena."""
+    cinza = cv2.cvtColor(quadro, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(cinza, (64, 36), interpolation=cv2.INTER_AREA).astype('float32')
+
+def eventos_video(caminho_video, limiar_mudanca=LIMIAR_MUDANCA, conf=CONF_PADRAO,
+                  passo_quadros=1, tolerancia_saida_s=TOLERANCIA_SAIDA_S, estatisticas=None):
+    """
+    Lê o vídeo quadro a quadro (arquivo local ou URL RTSP) e gera a linha do tempo
+    de eventos: {'classe', 'evento': 'entrada'|'saida', 'tempo_s', 'quadro', 'quantidade'}.
+    - Só roda o YOLO quando a cena muda (diferença média > limiar_mudanca) em relação
+      ao último quadro analisado; nos demais, o estado anterior é mantido.
+    - passo_quadros > 1 descarta quadros intermediários sem decodificá-los (grab).
+    - Uma classe só "sai" depois de ficar tolerancia_saida_s sem ser vista (evita pisca-pisca).
+    estatisticas: dict opcional preenchido com contadores e FPS ao longo da leitura
+                  ('erro' recebe o motivo se o vídeo não puder ser aberto).
+    """
+    if estatisticas is None:
+        estatisticas = {}
+    estatisticas.update({'quadros_lidos': 0, 'quadros_analisados': 0,
+                         'quadros_ignorados': 0, 'fps_video': 0.0, 'fps_processamento': 0.0,
+                         'erro': None})
+    if not CV2_AVAILABLE:
+        print("⚠️ AVISO: OpenCV (cv2) não encontrado. Análise de vídeo indisponível.")
+        return
+
+    model = obter_modelo()
+    captura = cv2.VideoCapture(caminho_video)
+    if not captura.isOpened():
+        captura.release()
+        estatisticas['erro'] = f"Não foi possível abrir o vídeo: {caminho_video}"
+        print(f"⚠️ {estatisticas['erro']}")
+        return
+    # Alguns backends/streams devolvem 0, -1 ou NaN quando não sabem o FPS
+    fps_video = captura.get(cv2.CAP_PROP_FPS)
+    if not fps_video > 0:
+        fps_video = 30.0
+    estatisticas['fps_video'] = fps_video
+
+    presentes = {}       # classe -> quantidade na cena
+    ultimo_visto = {}    # classe -> tempo_s da última detecção
+    contagem_ref = {}    # detecções do último quadro analisado
+    assinatura_ref = None
+    indice = -1
+    tempo_s = 0.0
+    inicio = time.perf_counter()
+    try:
+        while True:
+            # Pula quadros sem decodificar
+            for _ in range(passo_quadros - 1):
+                if not captura.grab():
+                    break
+                indice += 1
+                estatisticas['quadros_lidos'] += 1
+            ok, quadro = captura.read()
+            if not ok:
+                break
+            indice += 1
+            estatisticas['quadros_lidos'] += 1
+            tempo_s = indice / fps_video
+
+            assinatura = _assinatura_quadro(quadro)
+            mudou = (assinatura_ref is None or
+                     float(cv2.absdiff(assinatura, assinatura_ref).mean()) >= limiar_mudanca)
+
+            if mudou and model:
+                assinatura_ref = assinatura
+                estatisticas['quadros_analisados'] += 1
+                try:
+                    resultado = model(quadro, conf=conf, verbose=False)[0]
+                    contagem = _contar_classes(resultado, model.names)
+                except Exception as e:
+                    print(f"Erro na inferência YOLO (quadro {indice}): {e}")
+                    contagem = None
+
+                if contagem is not None:
+                    contagem_ref = contagem
+                    for classe, qtd in contagem.items():
+                        ultimo_visto[classe] = tempo_s
+                        if classe not in presentes:
+                            yield {'classe': classe, 'evento': 'entrada', 'tempo_s': tempo_s,
+                                   'quadro': indice, 'quantidade': qtd}
+                        presentes[classe] = qtd
+            else:
+                estatisticas['quadros_ignorados'] += 1
+                # Cena parada: vale o que foi visto no último quadro analisado
+                for classe in contagem_ref:
+                    ultimo_visto[classe] = tempo_s
+
+            for classe in list(presentes):
+                if tempo_s - ultimo_visto[classe] > tolerancia_saida_s:
+                    yield {'classe': classe, 'evento': 'saida', 'tempo_s': ultimo_visto[classe],
+                           'quadro': indice, 'quantidade': presentes.pop(classe)}
+
+            duracao = time.perf_counter() - inicio
+            if duracao > 0:
+                estatisticas['fps_processamento'] = estatisticas['quadros_lidos'] / duracao
+    finally:
+        captura.release()
+
+    # Fim do vídeo: fecha os intervalos em aberto
+    for classe, qtd in presentes.items():
+        yield {'classe': classe, 'evento': 'saida', 'tempo_s': tempo_s,
+               'quadro': indice, 'quantidade': qtd}
+
+def analisar_video(caminho_video, **kwargs):
+    """
+    Roda eventos_video até o fim e devolve a linha do tempo com o relatório de desempenho.
+    'tempo_real' indica se o processamento acompanhou o FPS original do vídeo.
+    """
+    estatisticas = {}
+    eventos = list(eventos_video(caminho_video, estatisticas=estatisticas, **kwargs))
+    relatorio = dict(estatisticas)
+    relatorio['eventos'] = eventos
+    relatorio['tempo_real'] = relatorio['fps_processamento'] >= relatorio['fps_video'] > 0
+    if not CV2_AVAILABLE:
+        relatorio['mensagem'] = "⚠️ OpenCV não instalado. Vídeo não analisado."
+    elif relatorio['erro']:
+        relatorio['mensagem'] = f"⚠️ {relatorio['erro']}"
+    elif obter_modelo() is None:
+        relatorio['mensagem'] = AVISO_SIMULACAO
+    else:
+        relatorio['mensagem'] = (f"🎥 {relatorio['quadros_lidos']} quadros lidos, "
+                                 f"{relatorio['quadros_analisados']} analisados, "
+                                 f"{len(eventos)} evento(s). "
+                                 f"{relatorio['fps_processamento']:.1f} FPS.")
+    return relatorio
+
+# --- PIPELINE PARALELO DE DECODIFICAÇÃO (PRODUTOR / CONSUMIDOR) ---
+
+def preparar_imagem(imagem, tamanho=TAMANHO_ENTRADA):
+    """
+    Decodifica a imagem e aplica letterbox (redimensiona mantendo proporção e
+    completa com cinza até tamanho x tamanho).
+    Retorna {'arquivo', 'array' (RGB uint8), 'escala', 'pad', 'tamanho_original', 'erro'}.
+    """
+    import numpy as np
+    from PIL import Image
+
+    nome = imagem if isinstance(imagem, str) else _nome_imagem(imagem, 0)
+    try:
+        img = imagem if hasattr(imagem, 'convert') else Image.open(imagem)
+        largura, altura = img.size
+        escala = tamanho / max(largura, altura)
+        nova_larg = max(1, round(largura * escala))
+        nova_alt = max(1, round(altura * escala))
+
+        # JPEG: decodifica direto em resolução reduzida (bem mais rápido em fotos grandes)
+        if hasattr(img, 'draft') and img.format == 'JPEG':
+            img.draft('RGB', (nova_larg, nova_alt))
+        img = img.convert('RGB').resize((nova_larg, nova_alt), Image.BILINEAR)
+
+        canvas = Image.new('RGB', (tamanho, tamanho), (114, 114, 114))
+        pad = ((tamanho - nova_larg) // 2, (tamanho - nova_alt) // 2)
+        canvas.paste(img, pad)
+        return {
+            'arquivo': nome,
+            'array': np.asarray(canvas),
+            'escala': escala,
+            'pad': pad,
+            'tamanho_original': (largura, altura),
+            'erro': None
+        }
+    except Exception as e:
+        return {'arquivo': nome, 'array': None, 'escala': 1.0, 'pad': (0, 0),
+                'tamanho_original': None, 'erro': str(e)}
+
+def _entrada_modelo(preparada):
+    """O YOLO interpreta arrays NumPy como BGR (padrão OpenCV)."""
+    import numpy as np
+    if preparada['array'] is None:
+        return None
+    return np.ascontiguousarray(preparada['array'][..., ::-1])
+
+def pipeline_preprocessamento(origem, num_workers=4, tamanho_fila=16,
+                              tamanho=TAMANHO_ENTRADA, usar_processos=False):
+    """
+    Decodifica e redimensiona imagens em paralelo, à frente do consumidor (gerador).
+    A fila é limitada: no máximo `tamanho_fila` imagens prontas ficam em memória,
+    então pastas enormes não aumentam o consumo de RAM.
+    usar_processos=True usa processos em vez de threads (só para caminhos, não objetos PIL).
+    Os itens saem na mesma ordem da origem.
+    """
+    imagens = _listar_imagens(origem)
+    classe_pool = ProcessPoolExecutor if usar_processos else ThreadPoolExecutor
+    executor = classe_pool(max_workers=max(1, int(num_workers)))
+    fila = queue.Queue(maxsize=max(1, int(tamanho_fila)))
+    parar = threading.Event()
+    fim = object()
+
+    def colocar(item):
+        # put com timeout para o produtor não ficar preso se o consumidor desistir
+        while not parar.is_set():
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produtor():
+        try:
+            for imagem in imagens:
+                futuro = executor.submit(preparar_imagem, imagem, tamanho)
+                if not colocar(futuro):
+                    futuro.cancel()
+                    return
+        except Exception as e:
+            colocar(e)
+        finally:
+            colocar(fim)
+
+    thread = threading.Thread(target=produtor, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = fila.get()
+            if item is fim:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item.result()
+    finally:
+        parar.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+def benchmark_pipeline(pasta=ASSETS_DIR, workers=None, repeticoes=20, tamanho=TAMANHO_ENTRADA):
+    """
+    Mede imagens/segundo do pipeline de decodificação com 1, 2 e N workers.
+    As imagens da pasta são repetidas `repeticoes` vezes para ter amostra suficiente.
+    Retorna {num_workers: imagens_por_segundo}.
+    """
+    caminhos = list(_listar_imagens(pasta)) * repeticoes
+    if workers is None:
+        workers = sorted({1, 2, os.cpu_count() or 1})
+
+    relatorio = {}
+    for n in workers:
+        inicio = time.perf_counter()
+        total = sum(1 for _ in pipeline_preprocessamento(caminhos, num_workers=n, tamanho=tamanho))
+        duracao = time.perf_counter() - inicio
+        relatorio[n] = total / duracao if duracao > 0 else float('inf')
+    return relatorio
+
+# --- BLOCO DE TESTE (benchmark do pipeline com as imagens de assets/) ---
+if __name__ == "__main__":
+    print("\n👁️ --- BENCHMARK PIPELINE DE IMAGENS --- 👁️")
+    for n, ips in benchmark_pipeline().items():
+        print(f"   {n:>2} worker(s): {ips:8.1f} imagens/s")
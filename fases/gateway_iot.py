@@ -0,0 +1,282 @@
+import asyncio
+import collections
+import datetime
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Funciona tanto importado pelo app (pacote 'fases') quanto rodando direto da pasta.
+try:
+    from fases import fase3_iot
+    from fases.banco_dados_agricola import (BancoDadosAgricola, gerar_dados_exemplo_fase4,
+                                            interpretar_linha_serial)
+except ImportError:
+    import fase3_iot
+    from banco_dados_agricola import (BancoDadosAgricola, gerar_dados_exemplo_fase4,
+                                      interpretar_linha_serial)
+
+# --- CONFIGURAÇÕES ---
+PORTA_PADRAO = 9750
+TAMANHO_FILA_SAIDA = 50_000   # por destino; cheia = descarta (nenhum cliente espera)
+JANELA_LATENCIAS = 100_000    # últimas latências guardadas para o p99
+
+# --- DESTINOS (FAN-OUT) ---
+class DestinoBancoDados:
+    """
+    Grava as leituras em leituras_sensores em lotes.
+    O SQLite aceita um escritor por vez, então as gravações acontecem em uma única
+    thread dedicada, fora do loop asyncio.
+    """
+
+    def __init__(self, nome_bd="dados_agricolas.db", tamanho_lote=500):
+        self.nome_bd = nome_bd
+        self.tamanho_lote = tamanho_lote
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._bd = None
+        self.gravadas = 0
+
+    def _gravar(self, lote):
+        if self._bd is None:
+            self._bd = BancoDadosAgricola(self.nome_bd)
+        data_hora = datetime.datetime.now().isoformat()
+        # observacoes = "fonte;origem": a fonte (id estável da bomba) vem primeiro
+        # para os rollups de bomba ligada; a origem (com a porta) fica para auditoria
+        self._bd.inserir_leituras_em_lote(
+            (data_hora, item['umidade'], item['ph'], item['fosforo'], item['potassio'],
+             item['status_bomba'], None, None,
+             item['fonte'] if item['fonte'] == item['origem'] else f"{item['fonte']};{item['origem']}")
+            for item in lote)
+        self.gravadas += len(lote)
+
+    async def consumir(self, fila):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = [await fila.get()]
+            while len(lote) < self.tamanho_lote and not fila.empty():
+                lote.append(fila.get_nowait())
+            try:
+                await loop.run_in_executor(self._executor, self._gravar, lote)
+            except Exception as e:
+                print(f"⚠️ Erro ao gravar lote no banco: {e}")
+            finally:
+                for _ in lote:
+                    fila.task_done()
+
+    def fechar(self):
+        def _fechar():
+            if self._bd:
+                self._bd.fechar()
+        self._executor.submit(_fechar).result()
+        self._executor.shutdown()
+
+class DestinoAlertas:
+    """Repassa só as decisões críticas para uma função de alerta (ex.: AWS SNS)."""
+
+    def __init__(self, funcao_alerta=None):
+        self.funcao_alerta = funcao_alerta or (lambda assunto, msg: print(f"🚨 {assunto}: {msg}"))
+        self._executor = ThreadPoolExecutor(max_workers=2)
+        self.enviados = 0
+
+    async def consumir(self, fila):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await fila.get()
+            try:
+                if item['decisao']['alerta_critico']:
+                    await loop.run_in_executor(self._executor, self.funcao_alerta,
+                                               f"Alerta Crítico ({item['origem']})",
+                                               item['decisao']['mensagem'])
+                    self.enviados += 1
+            except Exception as e:
+                print(f"⚠️ Erro ao enviar alerta: {e}")
+            finally:
+                fila.task_done()
+
+    def fechar(self):
+        self._executor.shutdown()
+
+# --- GATEWAY ---
+class _ProtocoloUDP(asyncio.DatagramProtocol):
+    def __init__(self, gateway):
+        self.gateway = gateway
+
+    def datagram_received(self, data, addr):
+        recebido = time.perf_counter()
+        origem = f"udp:{addr[0]}:{addr[1]}"
+        for linha in data.decode('utf-8', errors='replace').splitlines():
+            self.gateway.processar_linha(linha, origem, recebido)
+
+class GatewaySensores:
+    """
+    Gateway asyncio que recebe leituras no formato serial
+    ("umidade,ph,fosforo,potassio,status_bomba") de muitos clientes ao mesmo tempo
+    (TCP, UDP ou socket Unix), avalia cada uma com a lógica de irrigação e
+    distribui o resultado para os destinos (banco, alertas...).
+    Cada destino tem sua própria fila limitada: um destino lento descarta em vez
+    de travar a leitura dos clientes.
+    """
+
+    def __init__(self, destinos=None, tamanho_fila=TAMANHO_FILA_SAIDA):
+        self.destinos = destinos if destinos is not None else [DestinoBancoDados(), DestinoAlertas()]
+        self._filas = [asyncio.Queue(maxsize=tamanho_fila) for _ in self.destinos]
+        self._tarefas = []
+        self._servidores = []
+        self._latencias = collections.deque(maxlen=JANELA_LATENCIAS)
+        self.recebidas = 0
+        self.invalidas = 0
+        self.descartadas = 0
+        self._inicio = None
+
+    # --- Processamento ---
+    @staticmethod
+    def _fonte(observacoes, origem):
+        """
+        Id estável da bomba: o "bomba=..." enviado na linha ou, sem ele, o endereço
+        do cliente sem a porta (que muda a cada reconexão).
+        """
+        if observacoes and observacoes.startswith('bomba='):
+            return observacoes.split(';', 1)[0]
+        if origem.startswith(('tcp:', 'udp:')):
+            return 'host=' + origem[4:].rsplit(':', 1)[0]
+        return origem
+
+    def processar_linha(self, linha, origem, recebido=None):
+        """Avalia uma linha e repassa aos destinos sem nunca aguardar (put_nowait)."""
+        recebido = recebido or time.perf_counter()
+        if not linha.strip():
+            return
+        try:
+            umidade, ph, fosforo, potassio, status_bomba, observacoes = interpretar_linha_serial(linha)
+        except (ValueError, IndexError):
+            self.invalidas += 1
+            return
+
+        decisao = fase3_iot.avaliar_irrigacao({'solo_umidade': umidade})
+        item = {
+            'origem': origem, 'fonte': self._fonte(observacoes, origem),
+            'umidade': umidade, 'ph': ph, 'fosforo': fosforo,
+            'potassio': potassio, 'status_bomba': status_bomba, 'decisao': decisao
+        }
+        for fila in self._filas:
+            try:
+                fila.put_nowait(item)
+            except asyncio.QueueFull:
+                self.descartadas += 1
+        self.recebidas += 1
+        self._latencias.append(time.perf_counter() - recebido)
+
+    async def _atender_stream(self, reader, writer):
+        peer = writer.get_extra_info('peername') or writer.get_extra_info('sockname')
+        origem = f"tcp:{peer[0]}:{peer[1]}" if isinstance(peer, tuple) else f"unix:{peer}"
+        try:
+            while True:
+                linha = await reader.readline()
+                if not linha:
+                    break
+                self.processar_linha(linha.decode('utf-8', errors='replace'), origem,
+                                     time.perf_counter())
+        except (ConnectionResetError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # --- Ciclo de vida ---
+    def _iniciar_destinos(self):
+        if self._inicio is None:
+            self._inicio = time.perf_counter()
+            self._tarefas = [asyncio.create_task(d.consumir(f))
+                             for d, f in zip(self.destinos, self._filas)]
+
+    async def iniciar_tcp(self, host='127.0.0.1', porta=PORTA_PADRAO):
+        self._iniciar_destinos()
+        servidor = await asyncio.start_server(self._atender_stream, host, porta)
+        self._servidores.append(servidor)
+        return servidor
+
+    async def iniciar_unix(self, caminho):
+        self._iniciar_destinos()
+        servidor = await asyncio.start_unix_server(self._atender_stream, caminho)
+        self._servidores.append(servidor)
+        return servidor
+
+    async def iniciar_udp(self, host='127.0.0.1', porta=PORTA_PADRAO):
+        self._iniciar_destinos()
+        loop = asyncio.get_running_loop()
+        transporte, _ = await loop.create_datagram_endpoint(
+            lambda: _ProtocoloUDP(self), local_addr=(host, porta))
+        self._servidores.append(transporte)
+        return transporte
+
+    async def aguardar_destinos(self):
+        """Espera os destinos esvaziarem as filas."""
+        for fila in self._filas:
+            await fila.join()
+
+    async def parar(self):
+        for servidor in self._servidores:
+            servidor.close()
+        await self.aguardar_destinos()
+        for tarefa in self._tarefas:
+            tarefa.cancel()
+        await asyncio.gather(*self._tarefas, return_exceptions=True)
+        for destino in self.destinos:
+            destino.fechar()
+
+    def relatorio(self):
+        """Leituras/s sustentadas e latência de decisão (p50/p99 em ms)."""
+        duracao = time.perf_counter() - self._inicio if self._inicio else 0.0
+        latencias = sorted(self._latencias)
+
+        def percentil(p):
+            if not latencias:
+                return 0.0
+            return latencias[min(len(latencias) - 1, int(p * len(latencias)))] * 1000
+
+        return {
+            'recebidas': self.recebidas,
+            'invalidas': self.invalidas,
+            'descartadas': self.descartadas,
+            'leituras_por_s': self.recebidas / duracao if duracao > 0 else 0.0,
+            'latencia_p50_ms': percentil(0.50),
+            'latencia_p99_ms': percentil(0.99),
+        }
+
+# --- GERADOR DE CARGA ---
+async def gerar_carga(host='127.0.0.1', porta=PORTA_PADRAO, clientes=50, leituras_por_cliente=1000):
+    """Abre `clientes` conexões TCP simultâneas e envia leituras de gerar_dados_exemplo_fase4."""
+    async def cliente(linhas):
+        _, writer = await asyncio.open_connection(host, porta)
+        for i in range(0, len(linhas), 100):
+            writer.write(("\n".join(linhas[i:i + 100]) + "\n").encode('utf-8'))
+            await writer.drain()
+        writer.close()
+        await writer.wait_closed()
+
+    cargas = [gerar_dados_exemplo_fase4(leituras_por_cliente) for _ in range(clientes)]
+    await asyncio.gather(*(cliente(linhas) for linhas in cargas))
+    return clientes * leituras_por_cliente
+
+async def benchmark_gateway(clientes=50, leituras_por_cliente=1000, porta=PORTA_PADRAO):
+    """Sobe o gateway (banco temporário), dispara a carga e devolve o relatório."""
+    pasta = tempfile.mkdtemp()
+    destino_bd = DestinoBancoDados(os.path.join(pasta, "benchmark_gateway.db"))
+    gateway = GatewaySensores([destino_bd, DestinoAlertas(lambda assunto, msg: None)])
+    await gateway.iniciar_tcp(porta=porta)
+
+    total = await gerar_carga(porta=porta, clientes=clientes, leituras_por_cliente=leituras_por_cliente)
+    while gateway.recebidas + gateway.invalidas < total:
+        await asyncio.sleep(0.01)
+    relatorio = gateway.relatorio()
+
+    await gateway.parar()
+    relatorio['gravadas_no_banco'] = destino_bd.gravadas
+    return relatorio
+
+if __name__ == "__main__":
+    print("\n📡 --- BENCHMARK GATEWAY IoT (asyncio) --- 📡")
+    rel = asyncio.run(benchmark_gateway())
+    print(f"   Leituras recebidas: {rel['recebidas']} (inválidas: {rel['invalidas']}, descartadas: {rel['descartadas']})")
+    print(f"   Throughput sustentado: {rel['leituras_por_s']:,.0f} leituras/s")
+    print(f"   Latência de decisão: p50 {rel['latencia_p50_ms']:.3f} ms / p99 {rel['latencia_p99_ms']:.3f} ms")
+    print(f"   Gravadas no banco: {rel['gravadas_no_banco']}\n")
@@ -0,0 +1,245 @@
+import datetime
+import itertools
+import os
+import tempfile
+import time
+
+import numpy as np
+
+# Funciona tanto importado pelo app (pacote 'fases') quanto rodando direto da pasta.
+try:
+    from fases import fase3_iot
+    from fases.banco_dados_agricola import BancoDadosAgricola
+except ImportError:
+    import fase3_iot
+    from banco_dados_agricola import BancoDadosAgricola
+
+# --- CONFIGURAÇÕES ---
+PASSO_PADRAO_S = 60            # intervalo simulado entre duas leituras de cada bomba
+LINHAS_POR_GRAVACAO = 50_000   # passos são acumulados até este tamanho antes do insert
+
+# Tipos de falha (índice em NOMES_FALHAS)
+SEM_FALHA = 0
+FALHA_SUPERAQUECIMENTO = 1
+FALHA_ROLAMENTO = 2
+FALHA_SENSOR_TRAVADO = 3
+NOMES_FALHAS = ("nenhuma", "superaquecimento", "rolamento", "sensor_travado")
+
+class SimuladorFazenda:
+    """
+    Simula `num_bombas` bombas (uma por talhão) ao mesmo tempo com arrays NumPy.
+    Cada chamada de passo() avança `passo_s` segundos para todas as bombas.
+
+    As leituras são correlacionadas no tempo, não sorteadas a cada chamada:
+    - a umidade do solo cai com a evaporação (mais forte de dia), sobe com a
+      irrigação e com chuvas ocasionais;
+    - a temperatura do motor segue o ambiente (ciclo diário) e a carga da bomba
+      com atraso de primeira ordem; a vibração depende da bomba estar ligada;
+    - os sensores têm deriva de calibração (passeio aleatório) e ruído AR(1);
+    - falhas aparecem ao acaso e duram vários passos: superaquecimento e
+      rolamento crescem aos poucos até disparar a parada de emergência;
+      sensor travado repete o último valor medido.
+    A bomba é controlada em malha fechada pela mesma regra do dashboard
+    (fase3_iot.avaliar_irrigacao_vetorizado).
+    """
+
+    def __init__(self, num_bombas=5000, passo_s=PASSO_PADRAO_S, inicio=None, semente=None,
+                 prob_falha=2e-4, prob_chuva=5e-4):
+        self.num_bombas = num_bombas
+        self.passo_s = passo_s
+        self.tempo = inicio or datetime.datetime(2025, 1, 1)
+        self.prob_falha = prob_falha
+        self.prob_chuva = prob_chuva
+        self.rng = np.random.default_rng(semente)
+        n, rng = num_bombas, self.rng
+
+        # Características fixas de cada talhão/bomba
+        self.taxa_evaporacao = rng.uniform(0.6, 1.4, n)       # %/h em dia de sol
+        self.vazao_irrigacao = rng.uniform(6.0, 12.0, n)      # %/h com a bomba ligada
+        self.fuso_h = rng.uniform(-0.5, 0.5, n)               # pequena defasagem do ciclo diário
+        self.ph_base = rng.uniform(5.5, 7.2, n)
+        self.vibracao_base = rng.uniform(0.15, 0.35, n)
+
+        # Estado físico
+        self.umidade = rng.uniform(35.0, 75.0, n)
+        self.temperatura = rng.uniform(25.0, 35.0, n)
+        self.bomba_ligada = np.zeros(n, dtype=bool)
+        self.fosforo = rng.random(n) < 0.5
+        self.potassio = rng.random(n) < 0.5
+
+        # Estado dos sensores e falhas
+        self.deriva_umidade = np.zeros(n)
+        self.ruido_umidade = np.zeros(n)
+        self.umidade_medida = self.umidade.copy()
+        self.tipo_falha = np.zeros(n, dtype=np.int8)
+        self.falha_restante = np.zeros(n, dtype=np.int32)
+        self.severidade = np.zeros(n)
+
+        self.passos = 0
+        self.identificadores = [f"bomba={i:05d}" for i in range(n)]
+
+    def _atualizar_falhas(self):
+        n, rng = self.num_bombas, self.rng
+        self.falha_restante[self.falha_restante > 0] -= 1
+        terminou = (self.falha_restante == 0) & (self.tipo_falha != SEM_FALHA)
+        self.tipo_falha[terminou] = SEM_FALHA
+        self.severidade[terminou] = 0.0
+
+        novas = (self.tipo_falha == SEM_FALHA) & (rng.random(n) < self.prob_falha)
+        if novas.any():
+            k = int(novas.sum())
+            self.tipo_falha[novas] = rng.integers(1, len(NOMES_FALHAS), k)
+            self.falha_restante[novas] = rng.integers(30, 240, k)
+        # Superaquecimento e rolamento pioram aos poucos enquanto durarem
+        progressiva = (self.tipo_falha == FALHA_SUPERAQUECIMENTO) | (self.tipo_falha == FALHA_ROLAMENTO)
+        self.severidade[progressiva] = np.minimum(1.0, self.severidade[progressiva] + 0.05)
+
+    def passo(self):
+        """
+        Avança um passo para todas as bombas e devolve dict de arrays:
+        umidade, ph, fosforo, potassio, temperatura, vibracao (valores medidos),
+        status_bomba, codigo (decisão), alerta_critico e tipo_falha.
+        """
+        n, rng = self.num_bombas, self.rng
+        dt_h = self.passo_s / 3600.0
+        self._atualizar_falhas()
+
+        # Ciclo diário: intensidade do sol de 0 (noite) a 1 (meio-dia)
+        hora = (self.tempo.hour + self.tempo.minute / 60.0 + self.fuso_h) % 24
+        sol = np.clip(np.sin(np.pi * (hora - 6.0) / 12.0), 0.0, None)
+
+        # Solo
+        self.umidade -= self.taxa_evaporacao * (0.25 + sol) * dt_h
+        self.umidade += self.vazao_irrigacao * self.bomba_ligada * dt_h
+        chuva = rng.random(n) < self.prob_chuva
+        if chuva.any():
+            self.umidade[chuva] += rng.normal(12.0, 4.0, int(chuva.sum()))
+        np.clip(self.umidade, 0.0, 100.0, out=self.umidade)
+
+        # Motor: tende à temperatura alvo com constante de tempo de ~15 min
+        alvo = 20.0 + 10.0 * sol + 15.0 * self.bomba_ligada
+        alvo += 45.0 * self.severidade * (self.tipo_falha == FALHA_SUPERAQUECIMENTO)
+        self.temperatura += (alvo - self.temperatura) * (1.0 - np.exp(-self.passo_s / 900.0))
+        temperatura = self.temperatura + rng.normal(0.0, 0.3, n)
+
+        vibracao = self.vibracao_base + 0.25 * self.bomba_ligada
+        vibracao += 1.2 * self.severidade * (self.tipo_falha == FALHA_ROLAMENTO)
+        vibracao = np.abs(vibracao + rng.normal(0.0, 0.03, n))
+
+        # Sensor de umidade: deriva lenta + ruído correlacionado; travado repete o valor
+        self.deriva_umidade += rng.normal(0.0, 0.05 * np.sqrt(dt_h), n)
+        self.ruido_umidade = 0.8 * self.ruido_umidade + rng.normal(0.0, 0.4, n)
+        medida = np.clip(self.umidade + self.deriva_umidade + self.ruido_umidade, 0.0, 100.0)
+        travado = self.tipo_falha == FALHA_SENSOR_TRAVADO
+        self.umidade_medida = np.where(travado, self.umidade_medida, medida)
+
+        ph = self.ph_base + rng.normal(0.0, 0.05, n)
+        troca = rng.random(n) < 1e-3
+        self.fosforo ^= troca
+        self.potassio ^= troca & (rng.random(n) < 0.5)
+
+        # Decisão (mesma regra do dashboard) e atuação na bomba
+        decisao = fase3_iot.avaliar_irrigacao_vetorizado(
+            umidade=self.umidade_medida, vibracao=vibracao, temperatura=temperatura)
+        codigo = decisao['codigo']
+        self.bomba_ligada[codigo == fase3_iot.CODIGO_LIGAR] = True
+        self.bomba_ligada[(codigo == fase3_iot.CODIGO_DESLIGAR) |
+                          (codigo == fase3_iot.CODIGO_EMERGENCIA)] = False
+
+        self.tempo += datetime.timedelta(seconds=self.passo_s)
+        self.passos += 1
+        return {
+            'umidade': self.umidade_medida, 'ph': ph, 'fosforo': self.fosforo.copy(),
+            'potassio': self.potassio.copy(), 'temperatura': temperatura, 'vibracao': vibracao,
+            'status_bomba': self.bomba_ligada.copy(), 'codigo': codigo,
+            'alerta_critico': decisao['alerta_critico'], 'tipo_falha': self.tipo_falha.copy(),
+        }
+
+    def linhas_banco(self, leitura, data_hora):
+        """
+        Converte um passo em tuplas de leituras_sensores (formato de
+        inserir_leituras_em_lote). O id da bomba vai em observacoes e a
+        previsão de irrigação é a decisão de ligar.
+        """
+        return zip(
+            itertools.repeat(data_hora),
+            np.round(leitura['umidade'], 1).tolist(),
+            np.round(leitura['ph'], 1).tolist(),
+            leitura['fosforo'].astype(np.int8).tolist(),
+            leitura['potassio'].astype(np.int8).tolist(),
+            leitura['status_bomba'].astype(np.int8).tolist(),
+            (leitura['codigo'] == fase3_iot.CODIGO_LIGAR).astype(np.int8).tolist(),
+            itertools.repeat(None),
+            self.identificadores,
+        )
+
+def executar_simulacao(bd=None, num_bombas=5000, passos=60, passo_s=PASSO_PADRAO_S,
+                       semente=None, gravar=True, linhas_por_gravacao=LINHAS_POR_GRAVACAO, **kwargs):
+    """
+    Roda `passos` passos de um SimuladorFazenda e grava tudo em leituras_sensores
+    em lotes (inserir_leituras_em_lote), com data_hora simulada.
+    bd: instância de BancoDadosAgricola (se None e gravar=True, usa um banco temporário).
+    Retorna o relatório com leituras/minuto da simulação e do total com gravação.
+    """
+    simulador = SimuladorFazenda(num_bombas, passo_s, semente=semente, **kwargs)
+    proprio_bd = gravar and bd is None
+    if proprio_bd:
+        bd = BancoDadosAgricola(os.path.join(tempfile.mkdtemp(), "simulacao.db"))
+
+    tempo_simulacao = tempo_gravacao = 0.0
+    codigos = np.zeros(len(fase3_iot.ACOES), dtype=np.int64)
+    alertas = 0
+    pendentes, linhas_pendentes = [], 0
+
+    def gravar_pendentes():
+        nonlocal tempo_gravacao, pendentes, linhas_pendentes
+        inicio = time.perf_counter()
+        bd.inserir_leituras_em_lote(itertools.chain.from_iterable(pendentes))
+        tempo_gravacao += time.perf_counter() - inicio
+        pendentes, linhas_pendentes = [], 0
+
+    inicio_total = time.perf_counter()
+    try:
+        for _ in range(passos):
+            inicio = time.perf_counter()
+            data_hora = simulador.tempo.isoformat()
+            leitura = simulador.passo()
+            codigos += np.bincount(leitura['codigo'], minlength=len(codigos))
+            alertas += int(leitura['alerta_critico'].sum())
+            if gravar:
+                pendentes.append(simulador.linhas_banco(leitura, data_hora))
+                linhas_pendentes += num_bombas
+            tempo_simulacao += time.perf_counter() - inicio
+            if gravar and linhas_pendentes >= linhas_por_gravacao:
+                gravar_pendentes()
+        if pendentes:
+            gravar_pendentes()
+    finally:
+        if proprio_bd:
+            bd.fechar()
+    tempo_total = time.perf_counter() - inicio_total
+
+    leituras = num_bombas * passos
+    return {
+        'bombas': num_bombas,
+        'passos': passos,
+        'leituras': leituras,
+        'alertas_criticos': alertas,
+        'decisoes': dict(zip(fase3_iot.ACOES, codigos.tolist())),
+        'falhas_ativas': int((simulador.tipo_falha != SEM_FALHA).sum()),
+        'tempo_simulacao_s': tempo_simulacao,
+        'tempo_gravacao_s': tempo_gravacao,
+        'leituras_por_minuto_simulacao': leituras / tempo_simulacao * 60 if tempo_simulacao else 0.0,
+        'leituras_por_minuto': leituras / tempo_total * 60 if tempo_total else 0.0,
+    }
+
+if __name__ == "__main__":
+    print("\n🚜 --- SIMULAÇÃO DE CARGA (5000 bombas x 60 passos) --- 🚜")
+    rel = executar_simulacao(num_bombas=5000, passos=60, semente=42)
+    print(f"   Leituras geradas: {rel['leituras']:,} (alertas críticos: {rel['alertas_criticos']:,}, "
+          f"falhas ativas no fim: {rel['falhas_ativas']})")
+    for acao, qtd in rel['decisoes'].items():
+        print(f"     {acao}: {qtd:,}")
+    print(f"   Só simulação + decisão: {rel['leituras_por_minuto_simulacao']:,.0f} leituras/min")
+    print(f"   Com gravação em leituras_sensores: {rel['leituras_por_minuto']:,.0f} leituras/min")
+    print(f"   (simulação {rel['tempo_simulacao_s']:.2f}s, gravação {rel['tempo_gravacao_s']:.2f}s)\n")
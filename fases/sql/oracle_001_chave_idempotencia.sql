@@ -0,0 +1,10 @@
+-- Migração 001 (Oracle): chave de idempotência da tabela insumos.
+-- A sincronização da outbox (fase2_db.SincronizadorOracle) usa MERGE por esta
+-- coluna para que um lote reenviado não duplique linhas. Sem ela, a
+-- sincronização fica parada e o erro aparece no Dashboard.
+-- Rodar uma única vez, com um usuário que tenha permissão de ALTER na tabela:
+--   sqlplus usuario/senha@host:1521/servico @fases/sql/oracle_001_chave_idempotencia.sql
+
+ALTER TABLE insumos ADD (chave_idempotencia VARCHAR2(36));
+
+CREATE UNIQUE INDEX uk_insumos_chave ON insumos (chave_idempotencia);
@@ -0,0 +1,7 @@
+-- Migração 002 (Oracle): índice para o filtro "buscar por nome" do Dashboard.
+-- O filtro usa a faixa UPPER(nome) >= :1 AND UPPER(nome) < :2 (fase2_db._filtros);
+-- com este índice de função o Oracle lê só a faixa, sem varrer a tabela.
+-- Rodar uma única vez:
+--   sqlplus usuario/senha@host:1521/servico @fases/sql/oracle_002_indice_nome_upper.sql
+
+CREATE INDEX ix_insumos_nome_upper ON insumos (UPPER(nome));
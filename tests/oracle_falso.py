@@ -0,0 +1,152 @@
+"""
+Substituto local do cx_Oracle para os testes do fase2_db (configurar_driver_oracle).
+Imita só o que o fase2_db usa: makedsn, SessionPool (acquire/release/drop/close),
+conexão (ping/cursor/commit/close) e cursor (execute/executemany com batcherrors).
+A tabela insumos fica em memória, indexada pela chave de idempotência.
+"""
+import threading
+
+
+class ErroOracle(Exception):
+    pass
+
+
+class ErroLote:
+    """Mesmo formato dos itens de cursor.getbatcherrors()."""
+
+    def __init__(self, offset, message):
+        self.offset = offset
+        self.message = message
+
+
+class CursorFalso:
+    def __init__(self, conexao):
+        self._conexao = conexao
+        self._resultado = None
+        self._erros = []
+
+    def execute(self, sql, parametros=None):
+        driver = self._conexao.driver
+        driver.comandos.append(sql)
+        if "user_tab_columns" in sql:
+            self._resultado = (1 if driver.tem_chave else 0,)
+        elif sql.lstrip().upper().startswith(("ALTER", "CREATE")):
+            raise ErroOracle("ORA-01031: insufficient privileges")
+        else:
+            raise ErroOracle(f"SQL não suportado pelo driver falso: {sql[:40]}")
+
+    def fetchone(self):
+        return self._resultado
+
+    def executemany(self, sql, linhas, batcherrors=False):
+        driver = self._conexao.driver
+        driver.comandos.append(sql)
+        if driver.falhar_execucao:
+            raise ErroOracle("ORA-03113: end-of-file on communication channel")
+        self._erros = []
+        for i, linha in enumerate(linhas):
+            chave, nome = linha[0], linha[1]
+            if nome in driver.recusar:
+                erro = ErroLote(i, f"ORA-12899: valor recusado para {nome}")
+                if not batcherrors:
+                    raise ErroOracle(erro.message)
+                self._erros.append(erro)
+            else:
+                self._conexao.pendentes[chave] = tuple(linha[1:])
+
+    def getbatcherrors(self):
+        return list(self._erros)
+
+
+class ConexaoFalsa:
+    def __init__(self, driver):
+        self.driver = driver
+        self.pendentes = {}
+        self.quebrada = False
+
+    def ping(self):
+        if self.quebrada or not self.driver.disponivel:
+            raise ErroOracle("ORA-03114: not connected to ORACLE")
+
+    def cursor(self):
+        return CursorFalso(self)
+
+    def commit(self):
+        # MERGE por chave: uma chave repetida não cria outra linha
+        for chave, linha in self.pendentes.items():
+            self.driver.insumos.setdefault(chave, linha)
+        self.pendentes = {}
+
+    def close(self):
+        pass
+
+
+class PoolFalso:
+    def __init__(self, driver, minimo, maximo):
+        self.driver = driver
+        self.max = maximo
+        self.livres = [ConexaoFalsa(driver) for _ in range(minimo)]
+        self.em_uso = set()
+        self.fechado = False
+        self._lock = threading.Lock()
+
+    @property
+    def opened(self):
+        return len(self.livres) + len(self.em_uso)
+
+    @property
+    def busy(self):
+        return len(self.em_uso)
+
+    def acquire(self):
+        self.driver.tentativas += 1
+        if not self.driver.disponivel:
+            raise ErroOracle("ORA-12170: TNS:Connect timeout occurred")
+        with self._lock:
+            if self.livres:
+                conn = self.livres.pop()
+            elif self.opened < self.max:
+                conn = ConexaoFalsa(self.driver)
+            else:
+                raise ErroOracle("ORA-24418: Cannot open further sessions")
+            self.em_uso.add(conn)
+            return conn
+
+    def release(self, conn):
+        with self._lock:
+            self.em_uso.discard(conn)
+            self.livres.append(conn)
+
+    def drop(self, conn):
+        with self._lock:
+            self.em_uso.discard(conn)
+
+    def close(self, force=False):
+        self.fechado = True
+
+
+class DriverOracleFalso:
+    """
+    Passe uma instância para fase2_db.configurar_driver_oracle().
+    disponivel: False simula o banco fora do ar (acquire falha).
+    tem_chave: se a coluna insumos.chave_idempotencia existe.
+    recusar: nomes que o banco recusa linha a linha (batcherrors).
+    """
+
+    def __init__(self, disponivel=True, tem_chave=True, recusar=()):
+        self.disponivel = disponivel
+        self.tem_chave = tem_chave
+        self.recusar = set(recusar)
+        self.falhar_execucao = False
+        self.insumos = {}      # chave de idempotência -> (nome, tipo, quantidade, validade)
+        self.comandos = []
+        self.pools = []
+        self.tentativas = 0    # chamadas a acquire() (para ver o disjuntor poupando a rede)
+
+    def makedsn(self, host, porta, service_name=None):
+        return f"{host}:{porta}/{service_name}"
+
+    def SessionPool(self, user, password, dsn, min=1, max=4, increment=1, threaded=False):
+        pool = PoolFalso(self, min, max)
+        self.pools.append(pool)
+        return pool
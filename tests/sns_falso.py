@@ -0,0 +1,54 @@
+"""
+Substituto local do cliente SNS do boto3 para os testes do fase5_cloud.
+Imita só o que o fase5_cloud usa: publish e publish_batch (até 10 entradas).
+Cada mensagem aceita fica em `publicadas` com o instante do envio, para
+conferir a taxa e a ordem.
+"""
+import threading
+import time
+import uuid
+
+
+class ErroSNS(Exception):
+    pass
+
+
+class ClienteSNSFalso:
+    """
+    Passe uma instância como `cliente` do DespachanteAlertas/JornalAlertas.
+    falhas_iniciais: quantas chamadas falham (sem conexão) antes de o SNS "voltar".
+    """
+
+    def __init__(self, falhas_iniciais=0):
+        self.falhas_iniciais = falhas_iniciais
+        self.publicadas = []   # (instante, tópico, assunto, mensagem)
+        self.chamadas = 0
+        self._lock = threading.Lock()
+
+    @property
+    def mensagens(self):
+        with self._lock:
+            return [mensagem for _, _, _, mensagem in self.publicadas]
+
+    def _conectar(self):
+        self.chamadas += 1
+        if self.chamadas <= self.falhas_iniciais:
+            raise ErroSNS("Could not connect to the endpoint URL")
+
+    def publish(self, TopicArn, Message, Subject=None):
+        with self._lock:
+            self._conectar()
+            self.publicadas.append((time.monotonic(), TopicArn, Subject, Message))
+        return {'MessageId': uuid.uuid4().hex}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        if len(PublishBatchRequestEntries) > 10:
+            raise ErroSNS("TooManyEntriesInBatchRequest")
+        sucesso = []
+        with self._lock:
+            self._conectar()
+            agora = time.monotonic()
+            for entrada in PublishBatchRequestEntries:
+                self.publicadas.append((agora, TopicArn, entrada.get('Subject'), entrada['Message']))
+                sucesso.append({'Id': entrada['Id'], 'MessageId': uuid.uuid4().hex})
+        return {'Successful': sucesso, 'Failed': []}
@@ -0,0 +1,67 @@
+import datetime
+import sqlite3
+
+import pytest
+
+from fases.banco_dados_agricola import BancoDadosAgricola
+
+INICIO = datetime.datetime(2026, 3, 1, 23, 0)
+
+
+@pytest.fixture
+def banco(tmp_path):
+    bd = BancoDadosAgricola(str(tmp_path / "leituras.db"))
+    yield bd, sqlite3.connect(str(tmp_path / "leituras.db"))
+    bd.fechar()
+
+
+def _lote(n, fontes):
+    # Leituras a cada 60 s atravessando a meia-noite, bomba alternando por fonte
+    return [((INICIO + datetime.timedelta(minutes=i)).isoformat(), 40.0 + i % 20, 6.5, 1, 0,
+             (i // len(fontes)) % 2, None, None, fontes[i % len(fontes)]) for i in range(n)]
+
+
+def _rollups(conn):
+    return sorted((r[0], r[1]) + tuple(round(v, 6) if isinstance(v, float) else v for v in r[2:])
+                  for r in conn.execute('SELECT * FROM rollup_leituras'))
+
+
+def _reconstruir(bd, conn):
+    for tabela in ('rollup_leituras', 'rollup_fontes', 'rollup_controle'):
+        conn.execute(f'DELETE FROM {tabela}')
+    conn.commit()
+    bd.atualizar_rollups()
+
+
+def test_fonte_estavel_entre_reconexoes(banco):
+    bd, conn = banco
+    # Gateway antigo: a porta muda a cada reconexão do mesmo cliente
+    bd.inserir_leituras_em_lote(_lote(120, ['tcp:10.0.0.1:%d' % p for p in (4000, 4001, 4002)]))
+    assert conn.execute('SELECT fonte FROM rollup_fontes').fetchall() == [('host=10.0.0.1',)]
+
+
+def test_atualizar_e_deletar_recalculam_rollups(banco):
+    bd, conn = banco
+    bd.inserir_leituras_em_lote(_lote(180, ['bomba=00001', 'bomba=00002', '']))
+    ids = [r[0] for r in conn.execute('SELECT id FROM leituras_sensores ORDER BY id')]
+
+    for id_leitura in ids[10:40:3]:
+        assert bd.deletar_leitura(id_leitura)
+    for id_leitura in ids[50:90:4]:
+        assert bd.atualizar_leitura(id_leitura, status_bomba=1, umidade=90.0)
+    assert bd.atualizar_leitura(ids[100], data_hora=(INICIO + datetime.timedelta(days=1)).isoformat())
+    assert bd.deletar_leitura(ids[-1])
+
+    incremental = _rollups(conn)
+    _reconstruir(bd, conn)
+    assert incremental == _rollups(conn)
+
+
+def test_leitura_avulsa_entra_na_consulta(banco):
+    bd, conn = banco
+    bd.inserir_leituras_em_lote(_lote(10, ['bomba=00001']))
+    bd.inserir_leitura(umidade=55.0, ph=6.0, fosforo=1, potassio=0, status_bomba=0)
+    marca = lambda: conn.execute("SELECT valor FROM rollup_controle WHERE chave = 'ultimo_id'").fetchone()[0]
+    assert marca() == '10'  # inserção avulsa não atualiza os rollups
+    bd.obter_serie(resolucao_s=3600)
+    assert marca() == '11'
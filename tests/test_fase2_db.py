@@ -0,0 +1,163 @@
+import time
+
+import pytest
+
+from fases import fase2_db
+from oracle_falso import DriverOracleFalso
+
+
+@pytest.fixture
+def banco_local(tmp_path, monkeypatch):
+    """Banco local temporário, sem driver Oracle."""
+    monkeypatch.setattr(fase2_db, 'LOCAL_DB_PATH', str(tmp_path / 'insumos_local.db'))
+    monkeypatch.setattr(fase2_db, '_CONEXAO_LOCAL', None)
+    monkeypatch.setattr(fase2_db, '_MARCAS_PAGINA', {})
+    monkeypatch.setattr(fase2_db, '_driver_oracle', None)
+    fase2_db.invalidar_cache()
+    yield fase2_db._conectar_local()
+    if fase2_db._CONEXAO_LOCAL is not None:
+        fase2_db._CONEXAO_LOCAL.close()
+
+
+@pytest.fixture
+def driver(banco_local, monkeypatch):
+    """Banco local temporário + driver Oracle falso, sem threads em segundo plano."""
+    monkeypatch.setattr(fase2_db, '_POOL_ORACLE', None)
+    monkeypatch.setattr(fase2_db, '_CIRCUITO', fase2_db.CircuitoOracle(limite_falhas=2, tempo_aberto_s=0.2))
+    monkeypatch.setattr(fase2_db, '_SINCRONIZADOR', fase2_db.SincronizadorOracle(backoff_base_s=60.0))
+    monkeypatch.setattr(fase2_db, 'iniciar_sincronizacao', lambda: None)
+    falso = DriverOracleFalso()
+    fase2_db.configurar_driver_oracle(falso)
+    return falso
+
+
+def _outbox():
+    return fase2_db._conectar_local().execute(
+        "SELECT nome, tentativas, proxima_tentativa, ultimo_erro FROM outbox_insumos ORDER BY id").fetchall()
+
+
+def test_disjuntor_abre_e_meio_abre(driver):
+    driver.disponivel = False
+    assert fase2_db.conectar_oracle() is None
+    assert fase2_db.conectar_oracle() is None
+    assert fase2_db.status_oracle()['disjuntor'] == "aberto"
+
+    # Aberto: nem tenta a rede
+    tentativas = driver.tentativas
+    assert fase2_db.conectar_oracle() is None
+    assert driver.tentativas == tentativas
+
+    # Meio-aberto: uma tentativa liberada; falhando, abre de novo
+    time.sleep(0.25)
+    assert fase2_db.status_oracle()['disjuntor'] == "meio-aberto"
+    assert fase2_db.conectar_oracle() is None
+    assert driver.tentativas == tentativas + 1
+    assert fase2_db.status_oracle()['disjuntor'] == "aberto"
+
+    # Meio-aberto com o banco de volta: fecha
+    time.sleep(0.25)
+    driver.disponivel = True
+    conn = fase2_db.conectar_oracle()
+    assert conn is not None
+    assert fase2_db.status_oracle()['disjuntor'] == "fechado"
+    fase2_db.desconectar_oracle(conn)
+
+
+def test_sessoes_voltam_ao_pool(driver):
+    conexoes = [fase2_db.conectar_oracle() for _ in range(3)]
+    assert fase2_db.status_oracle()['sessoes_em_uso'] == 3
+    for conn in conexoes:
+        fase2_db.desconectar_oracle(conn)
+    info = fase2_db.status_oracle()
+    assert info['sessoes_em_uso'] == 0
+    assert info['sessoes_abertas'] == 3
+
+    # Sessão quebrada (falha no ping) é descartada, não volta ao pool
+    pool = driver.pools[-1]
+    pool.livres[-1].quebrada = True
+    assert fase2_db.conectar_oracle() is None
+    assert pool.opened == 2 and pool.busy == 0
+    conn = fase2_db.conectar_oracle()
+    assert conn is not None and not conn.quebrada
+    fase2_db.desconectar_oracle(conn)
+
+    # A sincronização também devolve a sessão que usou
+    fase2_db.inserir_insumo('milho', 'Semente', 1, '2027-01-01')
+    assert fase2_db.sincronizar_pendentes() == 1
+    assert fase2_db.status_oracle()['sessoes_em_uso'] == 0
+
+
+def test_outbox_esvazia_com_erros_por_linha(driver):
+    driver.recusar = {'ruim'}
+    for nome in ('soja', 'ruim', 'trigo'):
+        fase2_db.inserir_insumo(nome, 'Semente', 10, '2027-01-01')
+
+    assert fase2_db.sincronizar_pendentes() == 2
+    assert sorted(linha[0] for linha in driver.insumos.values()) == ['soja', 'trigo']
+    [(nome, tentativas, proxima, erro)] = _outbox()
+    assert nome == 'ruim' and tentativas == 1
+    assert proxima > time.time() and 'ORA-12899' in erro
+
+    # Em backoff: a rodada seguinte não reenvia o item recusado
+    assert fase2_db.sincronizar_pendentes() == 0
+
+    driver.recusar = set()
+    with fase2_db._LOCK_LOCAL:
+        with fase2_db._conectar_local() as conn:
+            conn.execute("UPDATE outbox_insumos SET proxima_tentativa = 0")
+    assert fase2_db.sincronizar_pendentes() == 1
+    assert _outbox() == []
+    assert len(driver.insumos) == 3
+
+
+def test_oracle_fora_do_ar_mantem_outbox_sem_duplicar(driver):
+    fase2_db.inserir_insumo('feijao', 'Semente', 5, '2027-01-01')
+    driver.falhar_execucao = True
+    assert fase2_db.sincronizar_pendentes() is None
+    assert len(_outbox()) == 1
+    assert fase2_db.status_sincronizacao()['falhas_seguidas'] == 1
+
+    driver.falhar_execucao = False
+    assert fase2_db.sincronizar_pendentes() == 1
+    assert fase2_db.sincronizar_pendentes() == 0
+    assert len(driver.insumos) == 1
+
+
+def test_sem_coluna_de_idempotencia_nao_sincroniza(driver):
+    driver.tem_chave = False
+    fase2_db.inserir_insumo('aveia', 'Semente', 2, '2027-01-01')
+    assert fase2_db.sincronizar_pendentes() is None
+    assert fase2_db.status_sincronizacao()['erro_esquema']
+    assert not any(c.lstrip().upper().startswith('ALTER') for c in driver.comandos)
+    assert len(_outbox()) == 1
+
+
+def test_paginas_por_chave_iguais_ao_offset(banco_local):
+    with banco_local:
+        banco_local.executemany(
+            "INSERT INTO insumos_local (nome, tipo, quantidade, validade) VALUES (?, ?, ?, ?)",
+            [(f"{prefixo} {i % 37:03d}", tipo, i, '2027-01-01')
+             for i in range(600) for prefixo, tipo in [('SEMENTE', 'Grão'), ('UREIA', 'Fertilizante')]])
+
+    def por_offset(nome, tipo, inicio, tamanho):
+        where, parametros = fase2_db._filtros(nome, tipo, "nome", lambda i: "?")
+        return banco_local.execute(
+            "SELECT nome, tipo, quantidade, validade FROM insumos_local" + where +
+            " ORDER BY nome, id LIMIT ? OFFSET ?", parametros + [tamanho, inicio]).fetchall()
+
+    for nome, tipo in [('se', None), (None, 'Fertilizante'), ('ure', 'Fertilizante'), (None, None)]:
+        # Em sequência, voltando e pulando (usa a marca mais próxima)
+        for pagina in [1, 2, 3, 2, 10, 7, 30, 31, 60]:
+            inicio = (pagina - 1) * 20
+            df = fase2_db._pagina_local(nome, tipo, inicio, 20)
+            assert [tuple(linha) for linha in df.itertuples(index=False)] == por_offset(nome, tipo, inicio, 20)
+
+
+def test_filtro_de_prefixo_usa_indice(banco_local):
+    where, parametros = fase2_db._filtros('sem', None, "nome", lambda i: "?")
+    plano = " ".join(linha[3] for linha in banco_local.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM insumos_local" + where, parametros))
+    assert plano.startswith("SEARCH") and "idx_insumos_nome" in plano
+    # Mesmo resultado do antigo LIKE 'SEMENTE DE%' (sem diferenciar maiúsculas)
+    assert fase2_db.contar_insumos('semente de', None) == 2
+    assert fase2_db.contar_insumos(' Semente de s', None) == 1
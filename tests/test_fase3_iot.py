@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from fases import fase3_iot
+
+
+def _escalar(umidade=50.0, vibracao=0.0, temperatura=0.0):
+    return fase3_iot.avaliar_irrigacao({
+        'solo_umidade': umidade, 'maquina_vibracao': vibracao, 'maquina_temp': temperatura
+    })['codigo']
+
+
+def test_vetorizado_igual_ao_escalar():
+    umidade = np.array([10.0, 50.0, 95.0, 50.0, np.nan])
+    vibracao = np.array([0.0, 0.0, 0.0, 99.0, 0.0])
+    temperatura = np.array([20.0, 20.0, 20.0, 20.0, 20.0])
+    res = fase3_iot.avaliar_irrigacao_vetorizado(
+        umidade=umidade, vibracao=vibracao, temperatura=temperatura)
+    esperado = [_escalar(u, v, t) for u, v, t in zip(umidade, vibracao, temperatura)]
+    assert res['codigo'].tolist() == esperado
+
+
+def test_dict_com_colunas_ausentes_usa_padroes():
+    umidade = np.array([10.0, 50.0, 95.0, 60.0])
+    res = fase3_iot.avaliar_irrigacao_vetorizado({'umidade': umidade})
+    assert res['codigo'].shape == (4,)
+    assert res['codigo'].tolist() == [_escalar(u) for u in umidade]
+    assert not res['alerta_critico'].any()
+
+    vibracao = np.array([0.0, 99.0, 0.0, 0.0])
+    res = fase3_iot.avaliar_irrigacao_vetorizado({'umidade': umidade, 'vibracao': vibracao})
+    assert res['codigo'].tolist() == [_escalar(u, v) for u, v in zip(umidade, vibracao)]
+    assert res['alerta_critico'].tolist() == [False, True, False, False]
+
+
+def test_dataframe_sem_umidade_mantem_numero_de_linhas():
+    df = pd.DataFrame({'maquina_temp': [20.0, 200.0, 20.0]})
+    res = fase3_iot.avaliar_irrigacao_vetorizado(df)
+    assert res['codigo'].tolist() == [_escalar(temperatura=t) for t in df['maquina_temp']]
@@ -0,0 +1,106 @@
+import sqlite3
+import time
+
+import pytest
+
+pytest.importorskip("boto3")
+
+from fases.fase5_cloud import DespachanteAlertas, JornalAlertas, LimitadorTaxa
+from sns_falso import ClienteSNSFalso
+
+TOPICO = "arn:aws:sns:us-east-1:000000000000:farmtech-alertas"
+
+
+def _esperar(condicao, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while not condicao():
+        if time.monotonic() > limite:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def _estados(caminho):
+    conn = sqlite3.connect(str(caminho))
+    try:
+        return conn.execute("SELECT mensagem, estado FROM alertas ORDER BY seq").fetchall()
+    finally:
+        conn.close()
+
+
+def test_limitador_libera_rajada_e_depois_segue_a_taxa():
+    limitador = LimitadorTaxa(taxa_por_s=50.0, rajada=5)
+    inicio = time.monotonic()
+    limitador.aguardar(5)
+    assert time.monotonic() - inicio < 0.05  # a rajada sai na hora
+    limitador.aguardar(5)
+    assert time.monotonic() - inicio >= 5 / 50.0 * 0.9
+    with pytest.raises(ValueError):
+        LimitadorTaxa(taxa_por_s=0)
+
+
+def test_despachante_respeita_token_bucket():
+    cliente = ClienteSNSFalso()
+    taxa, rajada = 20.0, 2
+    despachante = DespachanteAlertas(TOPICO, taxa_por_s=taxa, rajada=rajada, cliente=cliente)
+    for i in range(10):
+        assert despachante.enfileirar("Alerta", f"m{i}") == "enfileirado"
+    despachante.parar(timeout=5.0)
+
+    assert cliente.mensagens == [f"m{i}" for i in range(10)]
+    instantes = [instante for instante, _, _, _ in cliente.publicadas]
+    for enviados, instante in enumerate(instantes, start=1):
+        # Nunca mais que a rajada + o que a taxa repôs desde o primeiro envio
+        assert enviados <= rajada + taxa * (instante - instantes[0]) + 1e-6
+    assert instantes[-1] - instantes[0] >= (10 - rajada) / taxa * 0.9
+
+
+def test_coalesce_por_chave_e_resume_ao_fim_da_janela(tmp_path):
+    cliente = ClienteSNSFalso()
+    jornal = JornalAlertas(str(tmp_path / "jornal.db"), cliente=cliente, reenviar=False)
+    despachante = DespachanteAlertas(TOPICO, janela_s=0.3, taxa_por_s=1000, cliente=cliente, jornal=jornal)
+    try:
+        assert despachante.enfileirar("Solo seco", "umidade 12%", chave="bomba=1") == "enfileirado"
+        for i in range(4):
+            assert despachante.enfileirar("Solo seco", f"umidade {11 - i}%", chave="bomba=1") == "coalescido"
+        assert despachante.enfileirar("Solo seco", "umidade 20%", chave="bomba=2") == "enfileirado"
+
+        assert _esperar(lambda: len(cliente.mensagens) == 3)
+        primeiro, outra_bomba, resumo = cliente.mensagens
+        assert (primeiro, outra_bomba) == ("umidade 12%", "umidade 20%")
+        assert resumo.startswith("umidade 8% (+4 alerta(s) de bomba=1")
+        # Janela fechada: o próximo alerta da bomba sai na hora
+        assert despachante.enfileirar("Solo seco", "umidade 7%", chave="bomba=1") == "enfileirado"
+    finally:
+        despachante.parar()
+        jornal.fechar()
+
+    estados = [estado for _, estado in _estados(tmp_path / "jornal.db")]
+    assert estados.count("coalescido") == 4
+    assert estados.count("enviado") == 4
+    assert despachante.estatisticas()['coalescidos'] == 4
+
+
+def test_jornal_reenvia_em_ordem_depois_de_reiniciar(tmp_path):
+    caminho = str(tmp_path / "jornal.db")
+    # Processo que "caiu": alertas pendentes e outros ainda na fila do despachante
+    jornal = JornalAlertas(caminho, cliente=ClienteSNSFalso(falhas_iniciais=99), reenviar=False)
+    jornal.registrar(TOPICO, "Alerta", "a0")
+    jornal.registrar(TOPICO, "Alerta", "a1", estado='na_fila', uid="u1")
+    jornal.registrar(TOPICO, "Alerta", "a2")
+    jornal.registrar(TOPICO, "Alerta", "a3", estado='na_fila', uid="u3")
+    jornal.registrar(TOPICO, "Alerta", "ja_enviado", estado='na_fila', uid="u4")
+    jornal.atualizar(TOPICO, ["u4"], 'enviado')
+    jornal.registrar(TOPICO, "Alerta", "a5")
+    jornal.fechar()
+
+    # Ao reabrir, o SNS ainda falha duas vezes antes de voltar (backoff curto)
+    cliente = ClienteSNSFalso(falhas_iniciais=2)
+    jornal = JornalAlertas(caminho, cliente=cliente, taxa_por_s=1000, rajada=2, backoff_base_s=0.02)
+    try:
+        assert _esperar(lambda: len(cliente.mensagens) == 5)
+        assert cliente.mensagens == ["a0", "a1", "a2", "a3", "a5"]
+        assert _esperar(lambda: not jornal.tem_pendentes(TOPICO, incluir_fila=True))
+    finally:
+        jornal.fechar()
+    assert all(estado == 'enviado' for _, estado in _estados(caminho))
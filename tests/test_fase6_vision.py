@@ -0,0 +1,21 @@
+import numpy as np
+
+from fases import fase6_vision
+
+
+def test_modo_tiles_devolve_bgr_como_o_plot(monkeypatch):
+    previa_rgb = np.zeros((4, 4, 3), dtype=np.uint8)
+    previa_rgb[..., 0] = 255  # vermelho em RGB
+    monkeypatch.setattr(fase6_vision, "processar_em_tiles",
+                        lambda *args, **kwargs: {'previa': previa_rgb, 'mensagem': "ok"})
+
+    monkeypatch.setattr(fase6_vision, "obter_modelo", lambda: object())
+    img, msg = fase6_vision.processar_imagem("orto.tif", modo_tiles=True)
+    assert msg == "ok"
+    assert img[0, 0].tolist() == [0, 0, 255]  # vermelho em BGR
+    assert img.flags['C_CONTIGUOUS']
+
+    # Sem modelo (simulação) fica em RGB, como no caminho normal
+    monkeypatch.setattr(fase6_vision, "obter_modelo", lambda: None)
+    img, _ = fase6_vision.processar_imagem("orto.tif", modo_tiles=True)
+    assert img[0, 0].tolist() == [255, 0, 0]